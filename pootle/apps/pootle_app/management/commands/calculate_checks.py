@@ -74,7 +74,9 @@ class Command(RefreshStatsCommand):
 
         self._init_stores(stores)
         self._init_checks()
-        self.calculate_checks(check_names, unit_fk_filter, store_fk_filter)
+        self.calculate_checks(check_names, unit_fk_filter, store_fk_filter,
+                              store_filter=store_filter,
+                              workers=options.get('workers', 1))
 
         logger.info('Setting quality check stats values for all stores...')
         self._set_qualitycheck_stats(unit_fk_filter)
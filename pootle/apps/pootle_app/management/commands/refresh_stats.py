@@ -21,6 +21,7 @@
 
 import logging
 import os
+from multiprocessing import Pool
 from optparse import make_option
 
 # This must be run before importing Django.
@@ -30,6 +31,7 @@ from translate.filters.decorators import Category
 
 from django.conf import settings
 from django.core.urlresolvers import set_script_prefix
+from django.db import connection
 from django.db.models import Count, Max, Sum
 from django.utils import dateformat, timezone
 from django.utils.encoding import force_unicode, iri_to_uri
@@ -37,13 +39,18 @@ from django.utils.encoding import force_unicode, iri_to_uri
 from django_rq import get_connection, job
 
 from pootle.core.cache import get_cache
-from pootle.core.mixins.treeitem import POOTLE_REFRESH_STATS
+from pootle.core.mixins.treeitem import (POOTLE_REFRESH_STATS,
+                                         bump_stats_version)
+from pootle_misc.checks import (get_translation_project_checker,
+                                 run_given_filters)
 from pootle_misc.util import datetime_min
 from pootle_project.models import Project
 from pootle_statistics.models import Submission
+from pootle_store.fields import to_python
 from pootle_store.models import (Store, Unit, QualityCheck,
-                                 Suggestion, SuggestionStates)
+                                 Suggestion, SuggestionStates, count_words)
 from pootle_store.util import OBSOLETE, UNTRANSLATED, FUZZY, TRANSLATED
+from pootle_translationproject.models import TranslationProject
 
 from . import PootleCommand
 
@@ -51,6 +58,11 @@ from . import PootleCommand
 logger = logging.getLogger('stats')
 cache = get_cache('stats')
 
+#: Number of units read, checked and written in a single batch
+CHECKS_CHUNK_SIZE = 2000
+#: Number of units whose wordcount is recalculated in a single batch
+WORDCOUNT_CHUNK_SIZE = 5000
+
 
 class Command(PootleCommand):
     help = "Allow stats and text indices to be refreshed manually."
@@ -64,6 +76,9 @@ class Command(PootleCommand):
                     help='To recalculate wordcount for all strings'),
         make_option('--check', action='append', dest='check_names',
                     help='Check to recalculate'),
+        make_option('--workers', dest='workers', type=int, default=1,
+                    help='Number of processes used to calculate quality '
+                         'checks, one translation project at a time'),
     )
 
     option_list = PootleCommand.option_list + shared_option_list
@@ -141,38 +156,81 @@ class Command(PootleCommand):
         else:
             super(Command, self).handle_all(**options)
 
-    def calculate_checks(self, check_names, unit_fk_filter, store_fk_filter):
+    def calculate_checks(self, check_names, unit_fk_filter, store_fk_filter,
+                         store_filter=None, workers=1):
         logger.info('Calculating quality checks for all units...')
 
         QualityCheck.delete_unknown_checks()
 
-        checks = QualityCheck.objects.filter(**unit_fk_filter)
-        if check_names:
-            checks = checks.filter(name__in=check_names)
-        checks = checks.values('id', 'name', 'unit_id',
-                               'category', 'false_positive')
-        all_units_checks = {}
-        for check in checks:
-            all_units_checks.setdefault(check['unit_id'], {})[check['name']] = check
+        # Shard the work by translation project; model instances in the
+        # filter are replaced by their primary keys so shards can be sent
+        # to worker processes
+        unit_filter = dict((key, getattr(value, 'pk', value))
+                           for key, value in store_fk_filter.iteritems())
+        stores = Store.objects.with_obsolete().filter(**(store_filter or {}))
+        stores.query.clear_ordering(True)
+        tp_ids = stores.values_list('translation_project', flat=True) \
+                       .distinct()
+        shards = [(tp_id, check_names, unit_filter) for tp_id in tp_ids]
+
+        workers = min(workers or 1, len(shards))
+        if workers > 1:
+            logger.info('Calculating quality checks for %d translation '
+                        'projects using %d processes...', len(shards), workers)
+            # Forked workers must not share the parent's DB connection
+            connection.close()
+            pool = Pool(workers)
+            try:
+                results = pool.imap_unordered(calculate_tp_checks, shards)
+                unit_count = sum(results)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            unit_count = sum(map(calculate_tp_checks, shards))
+
+        logger.info("%d units processed" % unit_count)
+
+    def calculate_wordcount(self, stores):
+        """Recalculates the source wordcount of all units in `stores`.
+
+        Only the `source_wordcount` column is written, using bulk updates,
+        so no revisions, submissions or quality checks are touched.
+        """
+        logger.info('Calculating wordcount for all units...')
+
+        units = Unit.simple_objects.filter(store__in=stores)
+        units = units.values_list('id', 'source_f', 'source_wordcount')
 
         unit_count = 0
-        units = Unit.simple_objects.select_related('store')
-        units.query.clear_ordering(True)
-        for unit in units.filter(**store_fk_filter).iterator():
-            unit_count += 1
-            unit_checks = {}
-            if unit.id in all_units_checks:
-                unit_checks = all_units_checks[unit.id]
-
-            if unit.update_qualitychecks(keep_false_positives=True,
-                                         check_names=check_names,
-                                         existing=unit_checks):
-                # update unit.mtime
-                # TODO: add new action type `quality checks were updated`?
-                Unit.simple_objects.filter(id=unit.id).update(mtime=timezone.now())
-
-            if unit_count % 10000 == 0:
-                logger.info("%d units processed" % unit_count)
+        changed_count = 0
+        last_id = 0
+        while True:
+            chunk = list(units.filter(id__gt=last_id).order_by('id')
+                              [:WORDCOUNT_CHUNK_SIZE])
+            if not chunk:
+                break
+
+            last_id = chunk[-1][0]
+            unit_count += len(chunk)
+
+            changed = {}
+            for unit_id, source, old_wordcount in chunk:
+                # Same rule as `Unit.update_wordcount()`: units can't have
+                # a zero wordcount or they would disappear from stats
+                wordcount = count_words(to_python(source).strings) or 1
+                if wordcount != old_wordcount:
+                    changed.setdefault(wordcount, []).append(unit_id)
+
+            for wordcount, unit_ids in changed.iteritems():
+                changed_count += len(unit_ids)
+                Unit.simple_objects.filter(id__in=unit_ids) \
+                                   .update(source_wordcount=wordcount)
+
+            logger.info("%d units processed" % unit_count)
+
+        logger.info("%d units processed, %d changed" %
+                    (unit_count, changed_count))
 
     def process(self, **options):
         calculate_checks = options.get('calculate_checks', False)
@@ -196,20 +254,12 @@ class Command(PootleCommand):
         self._init_checks()
 
         if calculate_checks:
-            self.calculate_checks(check_names, unit_fk_filter, store_fk_filter)
+            self.calculate_checks(check_names, unit_fk_filter, store_fk_filter,
+                                  store_filter=store_filter,
+                                  workers=options.get('workers', 1))
 
         if calculate_wordcount:
-            logger.info('Calculating wordcount for all units...')
-            unit_count = 0
-            for i, store in enumerate(stores.iterator(), start=1):
-                logger.info("calculate wordcount for %s" % store.pootle_path)
-                for unit in store.unit_set.iterator():
-                    unit_count += 1
-                    unit.update_wordcount()
-                    unit.save()
-
-                if i % 20 == 0:
-                    logger.info("%d units processed" % unit_count)
+            self.calculate_wordcount(stores)
 
         logger.info('Setting quality check stats values for all stores...')
         self._set_qualitycheck_stats(unit_fk_filter)
@@ -459,6 +509,112 @@ class Command(PootleCommand):
         """Unregister current path when stats for this path were refreshed"""
         r_con = get_connection()
         r_con.delete(POOTLE_REFRESH_STATS)
+        bump_stats_version()
+
+
+def calculate_tp_checks(shard):
+    """Recalculates quality checks for the units of a translation project.
+
+    This is run for every shard by :meth:`Command.calculate_checks`, either
+    in-process or within a worker process.
+
+    :param shard: a tuple ``(tp_id, check_names, unit_filter)``.
+    :return: the number of processed units.
+    """
+    tp_id, check_names, unit_filter = shard
+
+    translation_project = TranslationProject.objects.get(id=tp_id)
+    checker = get_translation_project_checker(translation_project)
+
+    unit_filter = dict(unit_filter, store__translation_project=tp_id)
+    units = Unit.simple_objects.filter(**unit_filter)
+    units = units.values('id', 'store', 'source_f', 'target_f', 'locations')
+
+    unit_count = 0
+    changed_count = 0
+    last_id = 0
+    while True:
+        chunk = list(units.filter(id__gt=last_id).order_by('id')
+                          [:CHECKS_CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1]['id']
+        unit_ids = [unit['id'] for unit in chunk]
+
+        checks = QualityCheck.objects.filter(unit__in=unit_ids)
+        if check_names:
+            checks = checks.filter(name__in=check_names)
+
+        existing_checks = {}
+        for check in checks.values('id', 'name', 'unit'):
+            existing_checks.setdefault(check['unit'], {}) \
+                           [check['name']] = check['id']
+
+        new_checks = []
+        stale_check_ids = []
+        changed_unit_ids = []
+        untranslated_ids = []
+        for values in chunk:
+            unit = Unit(store_id=values.pop('store'), **values)
+
+            # no checks if unit is untranslated, whatever their names
+            if not unit.target:
+                untranslated_ids.append(unit.id)
+                continue
+
+            existing = existing_checks.get(unit.id, {})
+            if check_names:
+                qc_failures = run_given_filters(checker, unit, check_names)
+            else:
+                qc_failures = checker.run_filters(unit, categorised=True)
+
+            changed = False
+            for name in qc_failures.iterkeys():
+                if existing.pop(name, None) is not None:
+                    continue
+
+                new_checks.append(QualityCheck(
+                    unit_id=unit.id, name=name,
+                    message=qc_failures[name]['message'],
+                    category=qc_failures[name]['category'],
+                ))
+                changed = True
+
+            # remaining checks are no longer active
+            if existing:
+                stale_check_ids.extend(existing.itervalues())
+                changed = True
+
+            if changed:
+                changed_unit_ids.append(unit.id)
+
+        if untranslated_ids:
+            untranslated_checks = QualityCheck.objects.filter(
+                unit__in=untranslated_ids,
+            )
+            checked_ids = set(untranslated_checks.values_list('unit',
+                                                              flat=True))
+            if checked_ids:
+                untranslated_checks.delete()
+                changed_unit_ids.extend(checked_ids)
+        if stale_check_ids:
+            QualityCheck.objects.filter(id__in=stale_check_ids).delete()
+        if new_checks:
+            QualityCheck.objects.bulk_create(new_checks)
+        if changed_unit_ids:
+            # update unit.mtime
+            # TODO: add new action type `quality checks were updated`?
+            Unit.simple_objects.filter(id__in=changed_unit_ids) \
+                               .update(mtime=timezone.now())
+            Unit.refresh_check_flags(changed_unit_ids)
+
+        unit_count += len(chunk)
+        changed_count += len(changed_unit_ids)
+        logger.info("%s: %d units processed, %d changed" %
+                    (translation_project.pootle_path, unit_count,
+                     changed_count))
+
+    return unit_count
 
 
 @job('default', timeout=18000)
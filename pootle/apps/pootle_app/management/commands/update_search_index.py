@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from pootle_app.management.commands import PootleCommand
+from pootle_store.models import Unit
+from pootle_store.search import get_search_backend
+
+
+class Command(PootleCommand):
+    help = "Rebuild the index used to search units in the editor."
+
+    def handle_all_stores(self, translation_project, **options):
+        get_search_backend().index(Unit.simple_objects.filter(
+            store__translation_project=translation_project,
+        ))
+
+    def handle_store(self, store, **options):
+        get_search_backend().index(Unit.simple_objects.filter(store=store))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import os
+from multiprocessing import Pool
+from optparse import make_option
+
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from django.db import connection
+
+from pootle.core.tmserver import bulk_update
+from pootle_project.models import Project
+from pootle_store.models import Unit
+from pootle_store.util import TRANSLATED
+
+from . import PootleCommand
+
+
+class Command(PootleCommand):
+    help = "Load translated units into the translation memory server."
+
+    shared_option_list = (
+        make_option('--after-revision', dest='after_revision', type=int,
+                    default=0,
+                    help='Only load units changed after this revision, '
+                         'e.g. the last one loaded by a previous run'),
+        make_option('--batch-size', dest='batch_size', type=int,
+                    default=1000,
+                    help='Number of units sent to the TM server at once'),
+        make_option('--workers', dest='workers', type=int, default=1,
+                    help='Number of processes loading units, one '
+                         'translation project at a time'),
+    )
+
+    option_list = PootleCommand.option_list + shared_option_list
+
+    def handle_all(self, **options):
+        project_query = Project.objects.enabled()
+        if self.projects:
+            project_query = project_query.filter(code__in=self.projects)
+
+        shards = []
+        for project in project_query.iterator():
+            tp_query = project.translationproject_set \
+                              .order_by('language__code')
+            if self.languages:
+                tp_query = tp_query.filter(language__code__in=self.languages)
+
+            shards.extend(
+                (tp_id, options['after_revision'], options['batch_size'])
+                for tp_id in tp_query.values_list('id', flat=True)
+            )
+
+        workers = min(options['workers'] or 1, len(shards))
+        if workers > 1:
+            # Forked workers must not share the parent's DB connection
+            connection.close()
+            pool = Pool(workers)
+            try:
+                results = list(pool.imap_unordered(update_tp_tmserver,
+                                                   shards))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = map(update_tp_tmserver, shards)
+
+        unit_count = sum(count for count, revision in results)
+        last_revision = max([options['after_revision']] +
+                            [revision for count, revision in results])
+        self.stdout.write('%d units loaded, up to revision %d' %
+                          (unit_count, last_revision))
+
+
+def update_tp_tmserver(shard):
+    """Loads the translated units of a translation project into the TM
+    server, in batches.
+
+    :param shard: a tuple ``(tp_id, after_revision, batch_size)``.
+    :return: a tuple with the number of loaded units and the highest
+        revision among them.
+    """
+    tp_id, after_revision, batch_size = shard
+
+    units = Unit.objects.filter(
+        store__translation_project=tp_id,
+        state=TRANSLATED,
+        revision__gt=after_revision,
+    ).select_related(
+        'store__translation_project__project',
+        'store__translation_project__language',
+        'submitted_by',
+    )
+
+    unit_count = 0
+    last_revision = after_revision
+    last_id = 0
+    while True:
+        chunk = list(units.filter(id__gt=last_id).order_by('id')
+                          [:batch_size])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        language = chunk[0].store.translation_project.language.code
+        bulk_update(language, [unit.get_tm_entry() for unit in chunk])
+
+        unit_count += len(chunk)
+        last_revision = max([last_revision] +
+                            [unit.revision for unit in chunk])
+        logging.info(u"%s: %d units loaded",
+                     chunk[0].store.translation_project.pootle_path,
+                     unit_count)
+
+    return unit_count, last_revision
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+def set_effective_permissions(apps, schema_editor):
+    PermissionSet = apps.get_model('pootle_app', 'PermissionSet')
+    EffectivePermission = apps.get_model('pootle_app', 'EffectivePermission')
+
+    EffectivePermission.objects.bulk_create([
+        EffectivePermission(
+            permission_set_id=permission_set.id,
+            user_id=permission_set.user_id,
+            directory_id=permission_set.directory_id,
+            codenames=u' '.join(sorted(
+                permission_set.positive_permissions.values_list('codename',
+                                                                flat=True)
+            )),
+        )
+        for permission_set in PermissionSet.objects.iterator()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pootle_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EffectivePermission',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('codenames', models.TextField(blank=True)),
+                ('directory', models.ForeignKey(to='pootle_app.Directory')),
+                ('permission_set', models.OneToOneField(related_name='effective_permission', to='pootle_app.PermissionSet')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='effectivepermission',
+            unique_together=set([('user', 'directory')]),
+        ),
+        migrations.RunPython(set_effective_permissions),
+    ]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def set_directory_closure(apps, schema_editor):
+    Directory = apps.get_model('pootle_app', 'Directory')
+    DirectoryClosure = apps.get_model('pootle_app', 'DirectoryClosure')
+
+    directories = dict(Directory.objects.values_list('pootle_path', 'id'))
+    links = []
+    for pootle_path, directory_id in directories.iteritems():
+        # Ancestor paths, from the directory itself up to the root
+        path_parts = pootle_path.split('/')[:-1]
+        for depth in xrange(len(path_parts)):
+            end = len(path_parts) - depth
+            ancestor_path = '/'.join(path_parts[:end]) + '/'
+            if ancestor_path in directories:
+                links.append(DirectoryClosure(
+                    ancestor_id=directories[ancestor_path],
+                    descendant_id=directory_id,
+                    depth=depth,
+                ))
+
+    DirectoryClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_app', '0003_directory_path_parts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryClosure',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(related_name='descendant_links', to='pootle_app.Directory')),
+                ('descendant', models.ForeignKey(related_name='ancestor_links', to='pootle_app.Directory')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='directoryclosure',
+            unique_together=set([('ancestor', 'descendant')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='directoryclosure',
+            index_together=set([('descendant', 'depth')]),
+        ),
+        migrations.RunPython(set_directory_closure),
+    ]
@@ -22,11 +22,15 @@
 
 from django.core.urlresolvers import reverse
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.functional import cached_property
 
+from pootle.core.browser import get_children_namespace
+from pootle.core.cache import bump_cache_version, get_request_or_compute
 from pootle.core.mixins import CachedTreeItem
 from pootle.core.url_helpers import (get_editor_filter, split_pootle_path,
-                                     to_tp_relative_path)
+                                     split_tp_path, to_tp_relative_path)
 from pootle_misc.baseurl import l
 
 class DirectoryManager(models.Manager):
@@ -43,6 +47,15 @@ class DirectoryManager(models.Manager):
         return super(DirectoryManager, self).get_queryset() \
                                             .select_related('parent')
 
+    def get_by_path(self, pootle_path):
+        """Returns the directory at `pootle_path`, looked up once per
+        request.
+        """
+        return get_request_or_compute(
+            ('Directory', pootle_path),
+            lambda: self.get(pootle_path=pootle_path),
+        )
+
     @cached_property
     def root(self):
         return self.get(pootle_path='/')
@@ -60,6 +73,15 @@ class Directory(models.Model, CachedTreeItem):
     pootle_path = models.CharField(max_length=255, null=False, db_index=True)
     obsolete = models.BooleanField(default=False)
 
+    # Parts of `pootle_path`, so directories can be looked up across
+    # languages with indexes
+    language_code = models.CharField(max_length=50, null=True,
+            db_index=True, editable=False)
+    project_code = models.CharField(max_length=255, null=True,
+            db_index=True, editable=False)
+    tp_path = models.CharField(max_length=255, null=True, db_index=True,
+            editable=False)
+
     is_dir = True
 
     objects = DirectoryManager()
@@ -74,7 +96,19 @@ class Directory(models.Model, CachedTreeItem):
     def stores(self):
         """Queryset with all descending stores."""
         from pootle_store.models import Store
-        return Store.objects.filter(pootle_path__startswith=self.pootle_path)
+        return Store.objects.filter(parent__ancestor_links__ancestor=self)
+
+    @property
+    def ancestors(self):
+        """Queryset with this directory and all its ancestors."""
+        return Directory.objects.filter(descendant_links__descendant=self)
+
+    @property
+    def descendants(self):
+        """Queryset with this directory and all its descendant
+        directories.
+        """
+        return Directory.objects.filter(ancestor_links__ancestor=self)
 
     @property
     def is_template_project(self):
@@ -105,12 +139,12 @@ class Directory(models.Model, CachedTreeItem):
             if self.is_translationproject():
                 return self.translationproject
             else:
-                aux_dir = self
-                while (not aux_dir.is_translationproject() and
-                       aux_dir.parent is not None):
-                    aux_dir = aux_dir.parent
+                from pootle_translationproject.models import \
+                    TranslationProject
 
-                return aux_dir.translationproject
+                return TranslationProject.objects.get(
+                    directory__descendant_links__descendant=self,
+                )
     ############################ Methods ######################################
 
     def __unicode__(self):
@@ -124,12 +158,31 @@ class Directory(models.Model, CachedTreeItem):
             self.pootle_path = self.parent.pootle_path + self.name + '/'
         else:
             self.pootle_path = '/'
+        (self.language_code, self.project_code,
+         self.tp_path) = split_tp_path(self.pootle_path)
 
-        if not self.id:
+        created = not self.id
+        if created:
             self.init_cache()
 
         super(Directory, self).save(*args, **kwargs)
 
+        if created:
+            self.add_closure()
+
+    def add_closure(self):
+        """Links this directory to itself and to all its ancestors."""
+        links = [DirectoryClosure(ancestor=self, descendant=self, depth=0)]
+        if self.parent is not None:
+            links.extend([
+                DirectoryClosure(ancestor_id=ancestor_id, descendant=self,
+                                 depth=depth + 1)
+                for ancestor_id, depth in DirectoryClosure.objects.filter(
+                    descendant=self.parent,
+                ).values_list('ancestor', 'depth')
+            ])
+        DirectoryClosure.objects.bulk_create(links)
+
     def get_absolute_url(self):
         return l(self.pootle_path)
 
@@ -197,10 +250,10 @@ class Directory(models.Model, CachedTreeItem):
         if path not in (None, ''):
             pootle_path = '%s%s' % (self.pootle_path, path)
             try:
-                return Directory.objects.get(pootle_path=pootle_path)
+                return Directory.objects.get_by_path(pootle_path)
             except Directory.DoesNotExist as e:
                 try:
-                    return Store.objects.get(pootle_path=pootle_path)
+                    return Store.objects.get_by_path(pootle_path)
                 except Store.DoesNotExist:
                     raise e
         else:
@@ -215,23 +268,12 @@ class Directory(models.Model, CachedTreeItem):
         """Returns a list of ancestor directories excluding
         :cls:`~pootle_translationproject.models.TranslationProject` and above.
         """
-        path_parts = self.pootle_path.split('/')
-        parents = []
+        trail = self.ancestors.order_by('pootle_path')
         if only_dirs:
             # skip language, and translation_project directories
-            start = 4
-        else:
-            start = 1
+            trail = trail.filter(tp_path__gt='')
 
-        for i in xrange(start, len(path_parts)):
-            path = '/'.join(path_parts[:i]) + '/'
-            parents.append(path)
-
-        if parents:
-            return Directory.objects.filter(pootle_path__in=parents) \
-                                    .order_by('pootle_path')
-
-        return Directory.objects.none()
+        return trail
 
     def is_language(self):
         """does this directory point at a language"""
@@ -284,3 +326,28 @@ class Directory(models.Model, CachedTreeItem):
         self.obsolete = True
         self.save()
         self.clear_all_cache(parents=False, children=False)
+
+
+class DirectoryClosure(models.Model):
+    """Links every directory to itself and to each of its ancestors, so
+    subtrees and trails are fetched with a single indexed query.
+    """
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        index_together = [('descendant', 'depth')]
+        app_label = "pootle_app"
+
+    ancestor = models.ForeignKey(Directory, related_name='descendant_links')
+    descendant = models.ForeignKey(Directory, related_name='ancestor_links')
+    #: Number of levels between `ancestor` and `descendant`
+    depth = models.PositiveIntegerField()
+
+
+@receiver([post_delete, post_save])
+def invalidate_children_rows(sender, instance, **kwargs):
+    if instance.__class__.__name__ not in ['Directory', 'Store']:
+        return
+
+    if instance.parent_id is not None:
+        bump_cache_version(get_children_namespace(instance.parent_id))
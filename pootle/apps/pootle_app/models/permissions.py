@@ -24,9 +24,13 @@ from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
-from django.core.cache import cache
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from django.utils.encoding import iri_to_uri
 
+from pootle.core.cache import (bump_cache_version, get_local_or_compute,
+                               get_request_or_compute)
+
 
 def get_permission_contenttype():
     content_type = ContentType.objects.filter(name='pootle',
@@ -55,42 +59,87 @@ def get_pootle_permissions(codenames=None):
     return dict((permission.codename, permission) for permission in permissions)
 
 
+def get_trail_paths(pootle_path):
+    """Returns the paths of the directories leading to `pootle_path`,
+    starting from the root directory.
+    """
+    path_parts = pootle_path.split('/')
+    return ['/'.join(path_parts[:i]) + '/' for i in xrange(1, len(path_parts))]
+
+
+def get_project_path(pootle_path):
+    """Returns the path of the project directory whose permissions apply
+    to `pootle_path` when none are set below the language level, if any.
+    """
+    path_parts = filter(None, pootle_path.split('/'))
+    if len(path_parts) > 1 and path_parts[0] != 'projects':
+        return '/projects/%s/' % path_parts[1]
+
+    return None
+
+
+def get_permissions_for_paths(usernames, pootle_paths):
+    """Returns the permissions of each of `usernames` in each of
+    `pootle_paths`, looked up in a single query.
+
+    :return: a dictionary mapping `(username, pootle_path)` tuples to
+        dictionaries keyed by permission codename, or to `None` if no
+        permission set applies.
+    """
+    lookup_paths = set()
+    for pootle_path in pootle_paths:
+        lookup_paths.update(get_trail_paths(pootle_path))
+        lookup_paths.add(get_project_path(pootle_path))
+
+    effective_permissions = EffectivePermission.objects.filter(
+        user__username__in=usernames,
+        directory__pootle_path__in=filter(None, lookup_paths),
+    ).values_list('user__username', 'directory__pootle_path', 'codenames')
+    codenames = dict(((username, path), dict.fromkeys(names.split(), True))
+                     for username, path, names in effective_permissions)
+
+    result = {}
+    for username in usernames:
+        for pootle_path in pootle_paths:
+            permissions = None
+            permissions_path = None
+            for path in reversed(get_trail_paths(pootle_path)):
+                if (username, path) in codenames:
+                    permissions = codenames[(username, path)]
+                    permissions_path = path
+                    break
+
+            project_path = get_project_path(pootle_path)
+            if (project_path is not None and
+                (permissions is None or
+                 len(filter(None, permissions_path.split('/'))) < 2)):
+                # Active permission at language level or higher, check
+                # project level permission
+                permissions = codenames.get((username, project_path),
+                                            permissions)
+
+            result[(username, pootle_path)] = permissions
+
+    return result
+
+
+def get_permissions_namespace(username):
+    return iri_to_uri('Permissions:%s' % username)
+
+
 def get_permissions_by_username(username, directory):
     pootle_path = directory.pootle_path
-    path_parts = filter(None, pootle_path.split('/'))
-    key = iri_to_uri('Permissions:%s' % username)
-    permissions_cache = cache.get(key, {})
-
-    if pootle_path not in permissions_cache:
-        try:
-            permissionset = PermissionSet.objects.filter(
-                directory__in=directory.trail(only_dirs=False),
-                user__username=username) \
-                        .order_by('-directory__pootle_path')[0]
-        except IndexError:
-            permissionset = None
-
-        if (len(path_parts) > 1 and path_parts[0] != 'projects' and
-            (permissionset is None or
-            len(filter(None, permissionset.directory.pootle_path.split('/'))) < 2)):
-                # Active permission at language level or higher, check project
-                # level permission
-                try:
-                    project_path = '/projects/%s/' % path_parts[1]
-                    permissionset = PermissionSet.objects \
-                            .get(directory__pootle_path=project_path,
-                                 user__username=username)
-                except PermissionSet.DoesNotExist:
-                    pass
-
-        if permissionset:
-            permissions_cache[pootle_path] = permissionset.to_dict()
-        else:
-            permissions_cache[pootle_path] = None
 
-        cache.set(key, permissions_cache, settings.OBJECT_CACHE_TIMEOUT)
+    def get_permissions():
+        permissions = get_permissions_for_paths([username], [pootle_path])
+        return permissions[(username, pootle_path)]
 
-    return permissions_cache[pootle_path]
+    return get_request_or_compute(
+        ('permissions', username, pootle_path),
+        lambda: get_local_or_compute(get_permissions_namespace(username),
+                                     iri_to_uri(pootle_path), get_permissions,
+                                     settings.OBJECT_CACHE_TIMEOUT),
+    )
 
 
 def get_matching_permissions(user, directory, check_default=True):
@@ -112,6 +161,51 @@ def get_matching_permissions(user, directory, check_default=True):
     return permissions
 
 
+def get_matching_permissions_for_paths(user, pootle_paths,
+                                       check_default=True):
+    """Returns the permissions of `user` in each of `pootle_paths`, like
+    :func:`get_matching_permissions` does for a single directory, but using
+    a single query.
+
+    :return: a dictionary mapping paths to dictionaries keyed by
+        permission codename.
+    """
+    usernames = ['nobody']
+    if user.is_authenticated():
+        usernames[:0] = [user.username, 'default']
+    permissions = get_permissions_for_paths(usernames, pootle_paths)
+
+    result = {}
+    for pootle_path in pootle_paths:
+        for username in usernames:
+            path_permissions = permissions[(username, pootle_path)]
+            if path_permissions is not None:
+                break
+
+            if username == user.username and not check_default:
+                path_permissions = {}
+                break
+
+        result[pootle_path] = path_permissions or {}
+
+    return result
+
+
+def filter_paths_by_permission(user, permission_codename, pootle_paths,
+                               check_default=True):
+    """Returns the subset of `pootle_paths` where `user` has the
+    ``permission_codename`` permission, using a single query.
+    """
+    if user.is_superuser:
+        return set(pootle_paths)
+
+    permissions = get_matching_permissions_for_paths(user, pootle_paths,
+                                                     check_default)
+    return set(path for path, codenames in permissions.iteritems()
+               if "administrate" in codenames or
+                  permission_codename in codenames)
+
+
 def check_user_permission(user, permission_codename, directory,
                           check_default=True):
     """Checks if the current user has the permission the perform
@@ -144,7 +238,10 @@ def check_permission(permission_codename, request):
         if path_obj is None:
             return True  # Always allow to view language pages
 
-        return path_obj.is_accessible_by(request.user)
+        return get_request_or_compute(
+            ('is_accessible_by', request.user.username, path_obj.pootle_path),
+            lambda: path_obj.is_accessible_by(request.user),
+        )
 
     return ("administrate" in request.permissions or
             permission_codename in request.permissions)
@@ -189,12 +286,73 @@ class PermissionSet(models.Model):
         super(PermissionSet, self).save(*args, **kwargs)
         # FIXME: can we use `post_save` signals or invalidate caches in
         # model managers, please?
-        key = iri_to_uri('Permissions:%s' % self.user.username)
-        cache.delete(key)
+        update_effective_permission(self)
+        bump_cache_version(get_permissions_namespace(self.user.username))
 
     def delete(self, *args, **kwargs):
         super(PermissionSet, self).delete(*args, **kwargs)
         # FIXME: can we use `post_delete` signals or invalidate caches in
         # model managers, please?
-        key = iri_to_uri('Permissions:%s' % self.user.username)
-        cache.delete(key)
+        bump_cache_version(get_permissions_namespace(self.user.username))
+
+
+class EffectivePermission(models.Model):
+    """Positive permission codenames of a :cls:`PermissionSet`, kept
+    denormalized so the permissions of many paths can be looked up with a
+    single query.
+    """
+
+    class Meta:
+        unique_together = ('user', 'directory')
+        app_label = "pootle_app"
+
+    permission_set = models.OneToOneField(PermissionSet,
+                                          related_name='effective_permission')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL)
+    directory = models.ForeignKey('pootle_app.Directory')
+    codenames = models.TextField(blank=True)
+
+
+def update_effective_permission(permission_set):
+    codenames = permission_set.positive_permissions \
+                              .values_list('codename', flat=True)
+    EffectivePermission.objects.update_or_create(
+        permission_set=permission_set,
+        defaults={
+            'user_id': permission_set.user_id,
+            'directory_id': permission_set.directory_id,
+            'codenames': u' '.join(sorted(codenames)),
+        },
+    )
+
+
+@receiver(m2m_changed, sender=PermissionSet.positive_permissions.through)
+def positive_permissions_changed(sender, instance, action, reverse,
+                                 **kwargs):
+    if reverse and action == 'pre_clear':
+        # The links will be gone by `post_clear`, so remember which
+        # permission sets are affected while they can still be queried
+        instance._cleared_permission_set_ids = list(
+            PermissionSet.objects.filter(positive_permissions=instance)
+                                 .values_list('id', flat=True)
+        )
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        permission_sets = [instance]
+    else:
+        if action == 'post_clear':
+            pks = getattr(instance, '_cleared_permission_set_ids', [])
+            instance._cleared_permission_set_ids = []
+        else:
+            pks = kwargs.get('pk_set') or []
+        permission_sets = PermissionSet.objects.filter(pk__in=pks)
+
+    for permission_set in permission_sets:
+        update_effective_permission(permission_set)
+        bump_cache_version(
+            get_permissions_namespace(permission_set.user.username)
+        )
@@ -24,7 +24,6 @@ import os
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.http import HttpResponse
 from django.shortcuts import render
 from django.utils.translation import ugettext as _, ungettext
@@ -34,6 +33,7 @@ from django_rq.workers import Worker
 from redis.exceptions import ConnectionError
 
 from pootle import depcheck
+from pootle.core.cache import get_or_compute
 from pootle.core.decorators import admin_required
 from pootle.core.markup import get_markup_filter
 from pootle_misc.aggregate import sum_column
@@ -278,42 +278,47 @@ def _format_numbers(dict):
         dict[k] = formatted_number
 
 
-def server_stats():
+def get_server_stats():
     User = get_user_model()
-    result = cache.get("server_stats")
-    if result is None:
-        result = {}
-        result['user_count'] = max(User.objects.filter(is_active=True).count()-2, 0)
-        # 'default' and 'nobody' might be counted
-        # FIXME: the special users should not be retuned with is_active
-        result['submission_count'] = Submission.objects.count()
-        result['pending_count'] = Suggestion.objects.pending().count()
-        cache.set("server_stats", result, 86400)
+    result = {}
+    result['user_count'] = max(User.objects.filter(is_active=True).count()-2, 0)
+    # 'default' and 'nobody' might be counted
+    # FIXME: the special users should not be retuned with is_active
+    result['submission_count'] = Submission.objects.count()
+    result['pending_count'] = Suggestion.objects.pending().count()
+    return result
+
+
+def server_stats():
+    result = dict(get_or_compute("server_stats", get_server_stats, 86400))
     _format_numbers(result)
     return result
 
 
+def get_server_stats_more():
+    User = get_user_model()
+
+    result = {}
+    unit_query = Unit.objects.filter(state__gte=TRANSLATED).exclude(
+        store__translation_project__project__code__in=('pootle', 'tutorial', 'terminology')).exclude(
+        store__translation_project__language__code='templates').order_by()
+    result['store_count'] = unit_query.values('store').distinct().count()
+    result['project_count'] = unit_query.values('store__translation_project__project').distinct().count()
+    result['language_count'] = unit_query.values('store__translation_project__language').distinct().count()
+    sums = sum_column(unit_query, ('source_wordcount',), count=True)
+    result['string_count'] = sums['count']
+    result['word_count'] = sums['source_wordcount'] or 0
+    result['user_active_count'] = (
+        User.objects.exclude(submission=None) |
+        User.objects.exclude(suggestions=None)
+    ).order_by().count()
+    return result
+
+
 @admin_required
 def server_stats_more(request):
-    result = cache.get("server_stats_more")
-    if result is None:
-        User = get_user_model()
-
-        result = {}
-        unit_query = Unit.objects.filter(state__gte=TRANSLATED).exclude(
-            store__translation_project__project__code__in=('pootle', 'tutorial', 'terminology')).exclude(
-            store__translation_project__language__code='templates').order_by()
-        result['store_count'] = unit_query.values('store').distinct().count()
-        result['project_count'] = unit_query.values('store__translation_project__project').distinct().count()
-        result['language_count'] = unit_query.values('store__translation_project__language').distinct().count()
-        sums = sum_column(unit_query, ('source_wordcount',), count=True)
-        result['string_count'] = sums['count']
-        result['word_count'] = sums['source_wordcount'] or 0
-        result['user_active_count'] = (
-            User.objects.exclude(submission=None) |
-            User.objects.exclude(suggestions=None)
-        ).order_by().count()
-        cache.set("server_stats_more", result, 86400)
+    result = dict(get_or_compute("server_stats_more", get_server_stats_more,
+                                 86400))
     _format_numbers(result)
     stat_strings = {
         'store_count': _('Files'),
@@ -22,20 +22,20 @@
 from collections import OrderedDict
 
 from django.conf import settings
-from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import models
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
+from pootle.core.cache import bump_cache_version, get_local_or_compute
 from pootle.core.mixins import TreeItem
 from pootle.core.url_helpers import get_editor_filter
 from pootle.i18n.gettext import tr_lang, language_dir
 
 
 # FIXME: Generate key dynamically
-CACHE_KEY = 'pootle-languages'
+CACHE_NAMESPACE = 'pootle-languages'
 
 
 class LanguageManager(models.Manager):
@@ -64,14 +64,13 @@ class LiveLanguageManager(models.Manager):
             ).distinct()
 
     def cached_dict(self):
-        languages = cache.get(CACHE_KEY)
-        if not languages:
-            languages = OrderedDict(
+        return get_local_or_compute(
+            CACHE_NAMESPACE, 'cached_dict',
+            lambda: OrderedDict(
                 self.order_by('fullname').values_list('code', 'fullname')
-            )
-            cache.set(CACHE_KEY, languages, settings.OBJECT_CACHE_TIMEOUT)
-
-        return languages
+            ),
+            settings.OBJECT_CACHE_TIMEOUT,
+        )
 
 
 class Language(models.Model, TreeItem):
@@ -178,4 +177,4 @@ def invalidate_language_list_cache(sender, instance, **kwargs):
     if instance.__class__.__name__ not in ['Language', 'TranslationProject']:
         return
 
-    cache.delete(CACHE_KEY)
+    bump_cache_version(CACHE_NAMESPACE)
@@ -36,6 +36,15 @@ category_names = {
     Category.COSMETIC: _("Cosmetic"),
 }
 
+#: Bits representing each check category in `Unit.check_categories`
+category_bits = {
+    Category.NO_CATEGORY: 1,
+    Category.EXTRACTION: 2,
+    Category.COSMETIC: 4,
+    Category.FUNCTIONAL: 8,
+    Category.CRITICAL: 16,
+}
+
 
 check_names = {
     'accelerators': _(u"Accelerators"),  # fixme duplicated
@@ -228,11 +237,20 @@ potential_placeholders_regex = re.compile(u"(%s)" % fmt, re.U)
 
 
 def get_checker(unit):
+    return get_translation_project_checker(unit.store.translation_project)
+
+
+def get_translation_project_checker(translation_project):
+    """Returns the quality checker used for units in `translation_project`.
+
+    Building a checker is expensive, so callers processing many units of
+    the same translation project should call this once and reuse it.
+    """
     checker_class = getattr(settings, 'QUALITY_CHECKER', '')
     if checker_class:
         return import_func(checker_class)()
     else:
-        return unit.store.translation_project.checker
+        return translation_project.checker
 
 
 class SkipCheck(Exception):
@@ -968,15 +986,26 @@ def run_given_filters(checker, unit, check_names=[]):
     return failures
 
 
+_qualitychecks = None
+
+
 def get_qualitychecks():
-    sc = ENChecker()
-    for filt in sc.defaultfilters:
-        if filt not in excluded_filters:
-            # don't use an empty string because of
-            # http://bugs.python.org/issue18190
-            getattr(sc, filt)(u'_', u'_')
+    """Returns the categories of the quality checks, which are worked out
+    once per process.
+    """
+    global _qualitychecks
+
+    if _qualitychecks is None:
+        sc = ENChecker()
+        for filt in sc.defaultfilters:
+            if filt not in excluded_filters:
+                # don't use an empty string because of
+                # http://bugs.python.org/issue18190
+                getattr(sc, filt)(u'_', u'_')
 
-    return sc.categories
+        _qualitychecks = sc.categories
+
+    return _qualitychecks
 
 
 def get_qualitycheck_schema(path_obj=None):
@@ -1008,6 +1037,31 @@ def get_qualitychecks_by_category(category):
     return filter(lambda x: checks[x] == category, checks)
 
 
+def get_category_mask(names):
+    """Returns the `category_bits` mask of the categories whose checks are
+    exactly the checks in `names`.
+
+    :return: the mask, or `None` if `names` don't make up whole categories.
+    """
+    checks = get_qualitychecks()
+    names = set(names)
+
+    mask = 0
+    category_checks = set()
+    for category in set(checks.get(name) for name in names):
+        if category not in category_bits:
+            return None
+
+        mask |= category_bits[category]
+        category_checks.update(name for name in checks
+                               if checks[name] == category)
+
+    if not mask or category_checks != names:
+        return None
+
+    return mask
+
+
 def _generic_check(str1, str2, regex, message):
     def get_fingerprint(str, is_source=False, translation=''):
         chunks = regex.split(str)
@@ -22,6 +22,7 @@
 from django.conf import settings
 
 from pootle.__version__ import sver
+from pootle.core.cache import get_request_or_compute
 from pootle_language.models import Language
 from pootle_project.models import Project
 from staticpages.models import LegalPage
@@ -33,11 +34,16 @@ def _agreement_context(request):
     nocheck = filter(lambda x: request_path.startswith(x),
                      settings.LEGALPAGE_NOCHECK_PREFIXES)
 
-    if (request.user.is_authenticated() and not nocheck and
-        LegalPage.objects.pending_user_agreement(request.user).exists()):
-        return True
+    if not request.user.is_authenticated() or nocheck:
+        return False
 
-    return False
+    def has_pending_agreement():
+        return LegalPage.objects.pending_user_agreement(request.user).exists()
+
+    return get_request_or_compute(
+        ('pending_user_agreement', request.user.username),
+        has_pending_agreement,
+    )
 
 
 def pootle_context(request):
@@ -55,7 +61,12 @@ def pootle_context(request):
             'DEBUG': settings.DEBUG,
         },
         'custom': settings.CUSTOM_TEMPLATE_CONTEXT,
-        'ALL_LANGUAGES': Language.live.cached_dict(),
-        'ALL_PROJECTS': Project.objects.cached_dict(request.user),
+        'ALL_LANGUAGES': get_request_or_compute(
+            'ALL_LANGUAGES', Language.live.cached_dict,
+        ),
+        'ALL_PROJECTS': get_request_or_compute(
+            ('ALL_PROJECTS', request.user.username),
+            lambda: Project.objects.cached_dict(request.user),
+        ),
         'display_agreement': _agreement_context(request),
     }
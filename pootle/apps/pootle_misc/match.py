@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 #
 # Copyright 2012 Zuza Software Foundation
-# Copyright 2013-2014 Evernote Corporation
+# Copyright 2013-2015 Evernote Corporation
 #
 # This file is part of Pootle.
 #
@@ -19,72 +19,112 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
+"""Terminology matching for the editor.
+
+Terms are indexed in a trie keyed by their lowercased words, so looking up
+the terms of a text only walks the trie from each of its words, whatever
+the size of the glossary.
+"""
+
 import re
+from collections import namedtuple
+
+
+#: Words are runs of alphanumeric characters
+WORD_RE = re.compile(u"\w+", re.U)
+
+#: Disambiguating context given after terms, e.g. `file (noun)`
+CONTEXT_RE = re.compile(u"\s+\(.*\)\s*$", re.U)
+
+
+Term = namedtuple('Term', ('source', 'target'))
+
+
+class TrieNode(object):
+    __slots__ = ('children', 'terms')
+
+    def __init__(self):
+        self.children = {}
+        self.terms = []
+
+
+def get_words(text):
+    """Returns the lowercased words of `text`."""
+    return [word.lower() for word in WORD_RE.findall(text)]
+
+
+class Matcher(object):
+    """Finds the terms used in a text.
+
+    Words of the text match term words they start with, so inflected forms
+    like plurals still match (`files` matches the term `file`).
+
+    :param units: translated terminology units.
+    :param min_length: length below which terms are ignored.
+    :param max_length: length above which terms are ignored.
+    """
+
+    def __init__(self, units, min_length=3, max_length=500):
+        self.min_length = min_length
+        self.root = TrieNode()
+
+        for unit in units:
+            source = CONTEXT_RE.sub(u"", unicode(unit.source))
+            if not min_length <= len(source) <= max_length:
+                continue
+
+            words = get_words(source)
+            if words:
+                self.add(words, Term(source, unicode(unit.target)))
+
+    def add(self, words, term):
+        node = self.root
+        for word in words:
+            node = node.children.setdefault(word, TrieNode())
+
+        if term not in node.terms:
+            node.terms.append(term)
+
+    def get_nodes(self, node, word):
+        """Returns the children of `node` keyed by a prefix of `word`."""
+        children = node.children
+        return [children[word[:i]] for i in xrange(1, len(word) + 1)
+                if word[:i] in children]
+
+    def matches(self, text):
+        """Returns the terms used in `text`, in order of appearance.
+
+        Where terms overlap the longest one is picked, along with all its
+        translations.
+        """
+        if len(text) < self.min_length:
+            return []
+
+        words = get_words(text)
+        found = []
+        for start in xrange(len(words)):
+            nodes = [self.root]
+            end = start
+            while nodes and end < len(words):
+                nodes = [child for node in nodes
+                         for child in self.get_nodes(node, words[end])]
+                end += 1
+                for node in nodes:
+                    if node.terms:
+                        found.append((start, -end, node.terms))
+
+        found.sort(key=lambda x: x[:2])
+
+        result = []
+        last_end = 0
+        last_span = None
+        for start, end, terms in found:
+            end = -end
+            if start < last_end and (start, end) != last_span:
+                continue
+
+            result.extend(term for term in terms if term not in result)
+            last_end = end
+            last_span = (start, end)
 
-from translate.search import match, terminology
-
-delimiters = re.compile(u"[\W]+", re.U)
-
-class Matcher(match.terminologymatcher):
-    def __init__(self, store, max_candidates=10, min_similarity=75,
-                 max_length=500, comparer=None):
-        comparer = TerminologyComparer(max_length)
-        super(Matcher, self).__init__(store, max_candidates,
-                                      min_similarity=10,
-                                      max_length=max_length,
-                                      comparer=comparer)
-
-    def inittm(self, store):
-        match.matcher.inittm(self, store)
-        for cand in self.candidates.units:
-            cand.source = cand.source.lower()
-
-
-class TerminologyComparer(terminology.TerminologyComparer):
-
-    def __init__(self, max_len=500):
-        self.match_info = {}
-        self.MAX_LEN = max_len
-
-    def similarity(self, text, term, stoppercentage=40):
-        text_list = delimiters.split(text)
-        term_list = delimiters.split(term)
-        #text_list = text.split()
-        #term_list = term.split()
-        match_info = {}
-        matched_count = 0
-        match_gap = 0
-        pos = 0
-        term_count = len(term_list)
-        matched_index = 0
-
-        for i, term_word in enumerate(term_list):
-            for j, text_word in enumerate(text_list[matched_index:],
-                                          start=matched_index):
-                text_word_len = len(text_word)
-                text_word = text_word[:len(term_word)]
-                if text_word == term_word:
-                    if matched_count == 0:
-                        match_info = {'pos': pos}
-                    matched_count += 1
-                    matched_index = j + 1
-                    break
-                else:
-                    if matched_count > 0:
-                        match_gap += 1
-
-                    if match_gap > 2:
-                        matched_count = 0
-                        match_gap = 0
-                        matched_index = 0
-
-                pos += text_word_len + 1
-
-            if matched_count == 0:
-                break
-
-        if matched_count == term_count:
-            self.match_info[term] = match_info
-            return 100
-        else:
-            return 0
+        return result
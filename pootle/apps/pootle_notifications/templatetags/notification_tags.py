@@ -32,7 +32,7 @@ register = template.Library()
 @register.inclusion_tag('notifications/_latest.html', takes_context=True)
 def render_latest_news(context, path, num):
     try:
-        directory = Directory.objects.get(pootle_path='/%s' % path)
+        directory = Directory.objects.get_by_path('/%s' % path)
         user = context['user']
         User = get_user_model()
         can_view = check_user_permission(User.get(user), "view", directory)
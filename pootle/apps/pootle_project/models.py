@@ -25,11 +25,10 @@ import os
 from collections import OrderedDict
 
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.urlresolvers import reverse
-from django.db import connection, models
+from django.db import models
 from django.db.models import Q
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
@@ -40,11 +39,12 @@ from django.utils.translation import ugettext_lazy as _
 from translate.filters import checks
 from translate.lang.data import langcode_re
 
-from pootle.core.cache import make_method_key
+from pootle.core.cache import (bump_cache_version, get_local_or_compute,
+                               get_request_or_compute, make_method_key)
 from pootle.core.mixins import CachedTreeItem
 from pootle.core.models import VirtualResource
 from pootle.core.url_helpers import (get_editor_filter, get_path_sortkey,
-                                     split_pootle_path, to_tp_relative_path)
+                                     split_pootle_path)
 from pootle_app.models.directory import Directory
 from pootle_app.models.permissions import PermissionSet
 from pootle_store.filetypes import filetype_choices, factory_classes
@@ -53,6 +53,9 @@ from pootle_store.util import absolute_real_path
 
 RESERVED_PROJECT_CODES = ('admin', 'translate', 'settings')
 
+#: Cache family of the projects accessible by users
+ACCESSIBLE_PROJECTS_NAMESPACE = 'projects:accessible'
+
 
 class ProjectManager(models.Manager):
 
@@ -72,16 +75,15 @@ class ProjectManager(models.Manager):
         """
         cache_key = make_method_key('Project', 'cached_dict',
                                     {'is_admin': user.is_superuser})
-        projects = cache.get(cache_key)
-        if not projects:
-            logging.debug('Cache miss for %s', cache_key)
-            projects = OrderedDict(
+
+        return get_local_or_compute(
+            ACCESSIBLE_PROJECTS_NAMESPACE, cache_key,
+            lambda: OrderedDict(
                 self.for_user(user).order_by('fullname')
                                    .values_list('code', 'fullname')
-            )
-            cache.set(cache_key, projects, settings.OBJECT_CACHE_TIMEOUT)
-
-        return projects
+            ),
+            settings.OBJECT_CACHE_TIMEOUT,
+        )
 
     def enabled(self):
         return self.filter(disabled=False)
@@ -221,13 +223,21 @@ class Project(models.Model, CachedTreeItem, ProjectURLMixin):
         :param user: The ``User`` instance to get accessible projects for.
         """
         username = 'nobody' if user.is_anonymous() else user.username
-        key = iri_to_uri('projects:accessible:%s' % username)
-        user_projects = cache.get(key, None)
 
-        if user_projects is not None:
-            return user_projects
+        def get_accessible_projects():
+            return get_local_or_compute(ACCESSIBLE_PROJECTS_NAMESPACE,
+                                        iri_to_uri(username),
+                                        lambda: cls._accessible_by_user(user),
+                                        settings.OBJECT_CACHE_TIMEOUT)
+
+        return get_request_or_compute(('accessible_by_user', username),
+                                      get_accessible_projects)
+
+    @classmethod
+    def _accessible_by_user(cls, user):
+        logging.debug(u'Computing accessible projects for %s', user)
 
-        logging.debug(u'Cache miss for %s', key)
+        username = 'nobody' if user.is_anonymous() else user.username
 
         if user.is_anonymous():
             allow_usernames = [username]
@@ -276,10 +286,7 @@ class Project(models.Model, CachedTreeItem, ProjectURLMixin):
             user_projects = \
                 (user_projects.union(allow_projects)).difference(forbid_projects)
 
-        user_projects = list(user_projects)
-        cache.set(key, user_projects, settings.OBJECT_CACHE_TIMEOUT)
-
-        return user_projects
+        return list(user_projects)
 
     ############################ Properties ###################################
 
@@ -321,23 +328,17 @@ class Project(models.Model, CachedTreeItem, ProjectURLMixin):
 
         logging.debug(u'Cache miss for %s', cache_key)
 
-        resources_path = ''.join(['/%/', self.code, '/%'])
-
-        sql_query = '''
-        SELECT pootle_path
-        FROM pootle_store_store
-        WHERE pootle_path LIKE %s
-          UNION
-        SELECT pootle_path
-        FROM pootle_app_directory
-        WHERE pootle_path LIKE %s;
-        '''
-        cursor = connection.cursor()
-        cursor.execute(sql_query, [resources_path, resources_path])
-        results = cursor.fetchall()
-
-        # Calculate TP-relative paths and sort them
-        resources = sorted({to_tp_relative_path(result[0]) for result in results},
+        from pootle_store.models import Store
+
+        store_paths = Store.objects.with_obsolete().filter(
+            project_code=self.code,
+        ).values_list('tp_path', flat=True)
+        dir_paths = Directory.objects.with_obsolete().filter(
+            project_code=self.code,
+        ).values_list('tp_path', flat=True)
+
+        # Sort TP-relative paths
+        resources = sorted(set(store_paths) | set(dir_paths),
                            key=get_path_sortkey)
 
         cache.set(cache_key, resources, settings.OBJECT_CACHE_TIMEOUT)
@@ -533,9 +534,9 @@ def invalidate_resources_cache(sender, instance, **kwargs):
         (not kwargs['created'] or kwargs['raw'])):
         return
 
-    lang, proj, dir, fn = split_pootle_path(instance.pootle_path)
-    if proj is not None:
-        cache.delete(make_method_key(Project, 'resources', proj))
+    if instance.project_code is not None:
+        cache.delete(make_method_key(Project, 'resources',
+                                     instance.project_code))
 
 
 @receiver([post_delete, post_save])
@@ -545,13 +546,5 @@ def invalidate_accessible_projects_cache(sender, instance, **kwargs):
         ['Project', 'TranslationProject', 'PermissionSet']):
         return
 
-    # FIXME: use Redis directly to clear these caches effectively
-
-    cache.delete_many([
-        make_method_key('Project', 'cached_dict', {'is_admin': False}),
-        make_method_key('Project', 'cached_dict', {'is_admin': True}),
-    ])
-
-    User = get_user_model()
-    users_list = User.objects.values_list('username', flat=True)
-    cache.delete_many(map(lambda x: 'projects:accessible:%s' % x, users_list))
+    # Drop the accessible projects of all users at once
+    bump_cache_version(ACCESSIBLE_PROJECTS_NAMESPACE)
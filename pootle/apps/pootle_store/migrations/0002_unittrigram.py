@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitTrigram',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('column', models.SmallIntegerField()),
+                ('trigram', models.IntegerField()),
+                ('unit', models.ForeignKey(to='pootle_store.Unit')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterIndexTogether(
+            name='unittrigram',
+            index_together=set([('column', 'trigram')]),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def set_unit_filter_flags(apps, schema_editor):
+    from translate.filters.decorators import Category
+
+    from pootle_misc.checks import category_bits
+
+    Unit = apps.get_model('pootle_store', 'Unit')
+
+    Unit.objects.filter(
+        suggestion__state='pending',
+    ).update(has_pending_suggestion=True)
+
+    Unit.objects.filter(
+        qualitycheck__category=Category.CRITICAL,
+        qualitycheck__false_positive=False,
+    ).update(has_critical_check=True)
+
+    for category, bit in category_bits.iteritems():
+        Unit.objects.filter(
+            qualitycheck__category=category,
+            qualitycheck__false_positive=False,
+        ).update(check_categories=models.F('check_categories').bitor(bit))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_store', '0002_unittrigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='check_categories',
+            field=models.SmallIntegerField(default=0, editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='has_critical_check',
+            field=models.BooleanField(default=False, db_index=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='has_pending_suggestion',
+            field=models.BooleanField(default=False, db_index=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.RunPython(set_unit_filter_flags),
+    ]
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_store', '0003_unit_filter_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TMEntry',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('unit_id', models.IntegerField(unique=True)),
+                ('language', models.CharField(max_length=50, db_index=True)),
+                ('revision', models.IntegerField(default=0)),
+                ('project', models.CharField(max_length=255)),
+                ('path', models.CharField(max_length=255)),
+                ('source', models.TextField()),
+                ('source_length', models.IntegerField(db_index=True)),
+                ('target', models.TextField()),
+                ('username', models.CharField(max_length=30, blank=True)),
+                ('fullname', models.CharField(max_length=255, blank=True)),
+                ('email_md5', models.CharField(max_length=32, blank=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='TMTrigram',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('language', models.CharField(max_length=50)),
+                ('trigram', models.IntegerField()),
+                ('entry', models.ForeignKey(to='pootle_store.TMEntry')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterIndexTogether(
+            name='tmtrigram',
+            index_together=set([('language', 'trigram')]),
+        ),
+    ]
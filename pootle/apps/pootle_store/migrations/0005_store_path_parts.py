@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def set_store_path_parts(apps, schema_editor):
+    from pootle.core.url_helpers import split_tp_path
+
+    Store = apps.get_model('pootle_store', 'Store')
+
+    for pk, pootle_path in Store.objects.values_list('id', 'pootle_path'):
+        language_code, project_code, tp_path = split_tp_path(pootle_path)
+        Store.objects.filter(id=pk).update(language_code=language_code,
+                                           project_code=project_code,
+                                           tp_path=tp_path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_store', '0004_tm_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='language_code',
+            field=models.CharField(max_length=50, null=True, editable=False, db_index=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='project_code',
+            field=models.CharField(max_length=255, null=True, editable=False, db_index=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='tp_path',
+            field=models.CharField(max_length=255, null=True, editable=False, db_index=True),
+            preserve_default=True,
+        ),
+        migrations.RunPython(set_store_path_parts),
+    ]
@@ -42,6 +42,7 @@ from django.utils.translation import ugettext_lazy as _
 from translate.filters.decorators import Category
 from translate.storage import base
 
+from pootle.core.cache import get_request_or_compute
 from pootle.core.log import (TRANSLATION_ADDED, TRANSLATION_CHANGED,
                              TRANSLATION_DELETED, UNIT_ADDED, UNIT_DELETED,
                              UNIT_OBSOLETE, UNIT_RESURRECTED,
@@ -51,11 +52,14 @@ from pootle.core.log import (TRANSLATION_ADDED, TRANSLATION_CHANGED,
 from pootle.core.mixins import CachedMethods, CachedTreeItem
 from pootle.core.models import Revision
 from pootle.core.storage import PootleFileSystemStorage
-from pootle.core.tmserver import (update as update_tmserver,
+from pootle.core.tmserver import (delete as delete_from_tmserver,
+                                  update as update_tmserver,
                                   search as get_tmsuggestions)
-from pootle.core.url_helpers import get_editor_filter, split_pootle_path
+from pootle.core.url_helpers import (get_editor_filter, split_pootle_path,
+                                     split_tp_path)
 from pootle_misc.aggregate import max_column
-from pootle_misc.checks import check_names, run_given_filters, get_checker
+from pootle_misc.checks import (category_bits, check_names,
+                                run_given_filters, get_checker)
 from pootle_misc.util import datetime_min, import_func
 from pootle_statistics.models import (SubmissionFields,
                                       SubmissionTypes, Submission)
@@ -63,6 +67,7 @@ from pootle_statistics.models import (SubmissionFields,
 from .fields import (TranslationStoreField, MultiStringField,
                      PLURAL_PLACEHOLDER, SEPARATOR)
 from .filetypes import factory_classes
+from .search import get_search_backend
 from .util import (calc_total_wordcount, calc_translated_wordcount,
                    calc_fuzzy_wordcount, OBSOLETE, UNTRANSLATED,
                    FUZZY, TRANSLATED, get_change_str)
@@ -117,7 +122,47 @@ class QualityCheck(models.Model):
     def delete_unknown_checks(cls):
         unknown_checks = QualityCheck.objects \
             .exclude(name__in=check_names.keys())
+        unit_ids = set(unknown_checks.values_list('unit', flat=True))
         unknown_checks.delete()
+        Unit.refresh_check_flags(unit_ids)
+
+################# Search index ##############
+
+class UnitTrigram(models.Model):
+    """Hashed trigram found in a text column of a unit, used by
+    :class:`pootle_store.search.TrigramSearchBackend`."""
+    unit = models.ForeignKey("pootle_store.Unit", db_index=True)
+    column = models.SmallIntegerField()
+    trigram = models.IntegerField()
+
+    class Meta:
+        index_together = [('column', 'trigram')]
+
+
+class TMEntry(models.Model):
+    """Translation stored by :class:`pootle.core.tmserver.LocalTMBackend`."""
+    unit_id = models.IntegerField(unique=True)
+    language = models.CharField(max_length=50, db_index=True)
+    revision = models.IntegerField(default=0)
+    project = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    source = models.TextField()
+    source_length = models.IntegerField(db_index=True)
+    target = models.TextField()
+    username = models.CharField(max_length=30, blank=True)
+    fullname = models.CharField(max_length=255, blank=True)
+    email_md5 = models.CharField(max_length=32, blank=True)
+
+
+class TMTrigram(models.Model):
+    """Hashed trigram found in the source text of a translation memory
+    entry."""
+    entry = models.ForeignKey("pootle_store.TMEntry", db_index=True)
+    language = models.CharField(max_length=50)
+    trigram = models.IntegerField()
+
+    class Meta:
+        index_together = [('language', 'trigram')]
 
 ################# Suggestion ################
 
@@ -226,6 +271,29 @@ def stringcount(string):
         return 1
 
 
+def get_units_path_filter(pootle_path):
+    """Returns the lookups matching the units of the stores that fall below
+    the `pootle_path` umbrella.
+    """
+    lang, proj, dir_path, filename = split_pootle_path(pootle_path)
+
+    # /projects/<project_code>/translate/*
+    if lang is None and proj is not None:
+        lookups = {'store__project_code': proj}
+        if filename:
+            lookups['store__tp_path'] = dir_path + filename
+        elif dir_path:
+            lookups['store__tp_path__startswith'] = dir_path
+        return lookups
+    # /projects/translate/*
+    elif lang is None and proj is None:
+        return {}
+    # /<lang_code>/<project_code>/translate/*
+    # /<lang_code>/translate/*
+    else:
+        return {'store__pootle_path__startswith': pootle_path}
+
+
 class UnitManager(models.Manager):
 
     def get_queryset(self):
@@ -242,37 +310,16 @@ class UnitManager(models.Manager):
         :param pootle_path: An internal pootle path.
         :param user: The user who is accessing the units.
         """
-        lang, proj, dir_path, filename = split_pootle_path(pootle_path)
-
         units_qs = super(UnitManager, self).get_queryset().filter(
             state__gt=OBSOLETE,
             store__translation_project__project__disabled=False,
             store__translation_project__disabled=False,
         )
 
-        # /projects/<project_code>/translate/*
-        if lang is None and proj is not None:
-            if dir_path and filename:
-                units_path = ''.join(['/%/', proj, '/', dir_path, filename])
-            elif dir_path:
-                units_path = ''.join(['/%/', proj, '/', dir_path, '%'])
-            elif filename:
-                units_path = ''.join(['/%/', proj, '/', filename])
-            else:
-                units_path = ''.join(['/%/', proj, '/%'])
-        # /projects/translate/*
-        elif lang is None and proj is None:
-            units_path = '/%'
-        # /<lang_code>/<project_code>/translate/*
-        # /<lang_code>/translate/*
-        else:
-            units_path = ''.join([pootle_path, '%'])
-
-        units_qs = units_qs.extra(
-            where=[
-                'pootle_store_store.pootle_path LIKE %s',
-                'pootle_store_store.pootle_path NOT LIKE %s',
-            ], params=[units_path, '/templates/%']
+        units_qs = units_qs.filter(
+            **get_units_path_filter(pootle_path)
+        ).exclude(
+            store__language_code='templates',
         )
 
         # Non-superusers are limited to the projects they have access to
@@ -286,6 +333,12 @@ class UnitManager(models.Manager):
         return units_qs
 
 
+#: Denormalized unit flags, which are updated on their own rather than
+#: when units are saved
+UNIT_FLAG_FIELDS = ('has_pending_suggestion', 'has_critical_check',
+                    'check_categories')
+
+
 class Unit(models.Model, base.TranslationUnit):
     store = models.ForeignKey("pootle_store.Store", db_index=True)
     index = models.IntegerField(db_index=True)
@@ -313,6 +366,14 @@ class Unit(models.Model, base.TranslationUnit):
     state = models.IntegerField(null=False, default=UNTRANSLATED, db_index=True)
     revision = models.IntegerField(null=False, default=0, db_index=True, blank=True)
 
+    # Denormalized from suggestions and quality checks for fast filtering
+    has_pending_suggestion = models.BooleanField(default=False, db_index=True,
+                                                 editable=False)
+    has_critical_check = models.BooleanField(default=False, db_index=True,
+                                             editable=False)
+    # Bitset of `category_bits` for categories of active quality checks
+    check_categories = models.SmallIntegerField(default=0, editable=False)
+
     # Metadata
     creation_time = models.DateTimeField(auto_now_add=True, db_index=True,
                                          editable=False, null=True)
@@ -387,9 +448,13 @@ class Unit(models.Model, base.TranslationUnit):
         self._target_updated = False
         self._state_updated = False
         self._comment_updated = False
+        self._index_updated = False
         self._from_update_stores = False
         self._auto_translated = False
         self._encoding = 'UTF-8'
+        # State as last saved, to tell when units stop being translated
+        self._saved_state = (self.__dict__.get('state')
+                             if self.pk is not None else None)
 
     # should be called to flag the store cache for a deletion
     # before the unit will be deleted
@@ -425,6 +490,7 @@ class Unit(models.Model, base.TranslationUnit):
             path=self.store.pootle_path)
 
         self.flag_store_before_going_away()
+        self.delete_from_tmserver()
 
         super(Unit, self).delete(*args, **kwargs)
 
@@ -501,6 +567,16 @@ class Unit(models.Model, base.TranslationUnit):
             self.submitted_by = None
             self.submitted_on = None
 
+        if (not self._state.adding and not self._deferred and not args and
+            not kwargs.get('force_insert') and 'update_fields' not in kwargs):
+            # Denormalized flags are kept up to date by targeted updates
+            # where suggestions and checks change, so a stale instance
+            # mustn't overwrite them
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in UNIT_FLAG_FIELDS
+            ]
+
         super(Unit, self).save(*args, **kwargs)
 
         if hasattr(self, '_save_action') and self._save_action == UNIT_ADDED:
@@ -519,16 +595,30 @@ class Unit(models.Model, base.TranslationUnit):
 
         if self._source_updated or self._target_updated:
             self.update_qualitychecks()
+
+        if (self._source_updated or self._target_updated or
+            self._state_updated):
             if self.istranslated():
                 self.update_tmserver()
+            elif (self._saved_state == TRANSLATED or
+                  self.isobsolete() and self._saved_state != OBSOLETE):
+                # the unit is no longer translated or became obsolete
+                self.delete_from_tmserver()
+
+        # only reindex the unit when any of its searched columns changed
+        if (self._source_updated or self._target_updated or
+            self._comment_updated or self._index_updated):
+            get_search_backend().update(self)
 
         # done processing source/target update remove flag
         self._source_updated = False
         self._target_updated = False
         self._state_updated = False
         self._comment_updated = False
+        self._index_updated = False
         self._from_update_stores = False
         self._auto_translated = False
+        self._saved_state = self.state
 
         # update cache only if we are updating a single unit
         if self.store.state >= PARSED:
@@ -712,6 +802,7 @@ class Unit(models.Model, base.TranslationUnit):
             (self.developer_comment or notes)):
             self.developer_comment = notes or None
             changed = True
+            self._index_updated = True
 
         notes = unit.getnotes(origin="translator")
 
@@ -725,6 +816,7 @@ class Unit(models.Model, base.TranslationUnit):
         if self.locations != locations and (self.locations or locations):
             self.locations = locations or None
             changed = True
+            self._index_updated = True
 
         context = unit.getcontext()
         if self.context != unit.getcontext() and (self.context or context):
@@ -816,6 +908,7 @@ class Unit(models.Model, base.TranslationUnit):
             if existing:
                 self.store.mark_dirty(CachedMethods.CHECKS)
                 self.qualitycheck_set.all().delete()
+                self.update_check_flags()
                 return True
 
             return False
@@ -852,7 +945,65 @@ class Unit(models.Model, base.TranslationUnit):
             self.store.mark_dirty(CachedMethods.CHECKS)
             self.qualitycheck_set.filter(name__in=existing).delete()
 
-        return result or bool(unmute_list) or bool(existing)
+        result = result or bool(unmute_list) or bool(existing)
+        if result:
+            self.update_check_flags()
+
+        return result
+
+    @classmethod
+    def get_check_masks(cls, unit_ids):
+        """Returns a dictionary mapping `unit_ids` to the `category_bits`
+        mask of their active quality checks.
+        """
+        masks = dict.fromkeys(unit_ids, 0)
+        checks = QualityCheck.objects.filter(unit__in=unit_ids,
+                                             false_positive=False)
+        for unit_id, category in checks.values_list('unit', 'category') \
+                                       .distinct():
+            masks[unit_id] |= category_bits.get(category, 0)
+
+        return masks
+
+    @classmethod
+    def refresh_check_flags(cls, unit_ids):
+        """Recalculates the denormalized quality check flags of the units
+        with `unit_ids` using bulk updates, rather than saving them.
+        """
+        unit_ids = list(unit_ids)
+        for i in xrange(0, len(unit_ids), 1000):
+            chunk = unit_ids[i:i + 1000]
+
+            units_by_mask = {}
+            for unit_id, mask in cls.get_check_masks(chunk).iteritems():
+                units_by_mask.setdefault(mask, []).append(unit_id)
+
+            for mask, ids in units_by_mask.iteritems():
+                cls.simple_objects.filter(id__in=ids).update(
+                    check_categories=mask,
+                    has_critical_check=bool(
+                        mask & category_bits[Category.CRITICAL]
+                    ),
+                )
+
+    def _set_check_flags(self, mask):
+        self.check_categories = mask
+        self.has_critical_check = bool(mask & category_bits[Category.CRITICAL])
+
+    def update_check_flags(self):
+        """Updates the denormalized quality check flags of this unit."""
+        self._set_check_flags(Unit.get_check_masks([self.id])[self.id])
+        Unit.simple_objects.filter(id=self.id).update(
+            check_categories=self.check_categories,
+            has_critical_check=self.has_critical_check,
+        )
+
+    def update_suggestion_flag(self):
+        """Updates the denormalized pending suggestion flag of this unit."""
+        self.has_pending_suggestion = self.suggestion_set.pending().exists()
+        Unit.simple_objects.filter(id=self.id).update(
+            has_pending_suggestion=self.has_pending_suggestion,
+        )
 
     def get_qualitychecks(self):
         return self.qualitycheck_set.all()
@@ -862,7 +1013,8 @@ class Unit(models.Model, base.TranslationUnit):
 
 ##################### TranslationUnit ############################
 
-    def update_tmserver(self):
+    def get_tm_entry(self):
+        """Returns the translation memory entry for this unit."""
         obj = {
             'id': self.id,
             # 'revision' must be an integer for statistical queries to work
@@ -883,7 +1035,15 @@ class Unit(models.Model, base.TranslationUnit):
                 'email_md5': md5(self.submitted_by.email).hexdigest(),
             })
 
-        update_tmserver(self.store.translation_project.language.code, obj)
+        return obj
+
+    def update_tmserver(self):
+        update_tmserver(self.store.translation_project.language.code,
+                        self.get_tm_entry())
+
+    def delete_from_tmserver(self):
+        delete_from_tmserver(self.store.translation_project.language.code,
+                             self.id)
 
     def get_tm_suggestions(self):
         return get_tmsuggestions(self)
@@ -1145,6 +1305,7 @@ class Unit(models.Model, base.TranslationUnit):
                                   CachedMethods.LAST_ACTION)
             if touch:
                 self.save()
+            self.update_suggestion_flag()
 
         return (suggestion, True)
 
@@ -1203,6 +1364,7 @@ class Unit(models.Model, base.TranslationUnit):
                               CachedMethods.LAST_ACTION)
         # Update timestamp
         self.save()
+        self.update_suggestion_flag()
 
         if suggestion_user:
             translation_submitted.send(sender=translation_project,
@@ -1229,6 +1391,7 @@ class Unit(models.Model, base.TranslationUnit):
                               CachedMethods.LAST_ACTION)
         # Update timestamp
         self.save()
+        self.update_suggestion_flag()
 
 
     def toggle_qualitycheck(self, check_id, false_positive, user):
@@ -1239,6 +1402,7 @@ class Unit(models.Model, base.TranslationUnit):
 
         check.false_positive = false_positive
         check.save()
+        self.update_check_flags()
 
         self.store.mark_dirty(CachedMethods.CHECKS,
                               CachedMethods.LAST_ACTION)
@@ -1328,6 +1492,15 @@ class StoreManager(models.Manager):
                                             'translation_project',
                                         )
 
+    def get_by_path(self, pootle_path):
+        """Returns the store at `pootle_path`, looked up once per
+        request.
+        """
+        return get_request_or_compute(
+            ('Store', pootle_path),
+            lambda: self.get(pootle_path=pootle_path),
+        )
+
 
 class Store(models.Model, CachedTreeItem, base.TranslationStore):
     """A model representing a translation store (i.e. a PO or XLIFF file)."""
@@ -1349,6 +1522,15 @@ class Store(models.Model, CachedTreeItem, base.TranslationStore):
             db_index=True, verbose_name=_("Path"))
     name = models.CharField(max_length=128, null=False, editable=False)
 
+    # Parts of `pootle_path`, so stores can be looked up across languages
+    # with indexes
+    language_code = models.CharField(max_length=50, null=True,
+            db_index=True, editable=False)
+    project_code = models.CharField(max_length=255, null=True,
+            db_index=True, editable=False)
+    tp_path = models.CharField(max_length=255, null=True, db_index=True,
+            editable=False)
+
     file_mtime = models.DateTimeField(default=datetime_min)
     state = models.IntegerField(null=False, default=NEW, editable=False,
             db_index=True)
@@ -1428,6 +1610,8 @@ class Store(models.Model, CachedTreeItem, base.TranslationStore):
     def save(self, *args, **kwargs):
         created = not self.id
         self.pootle_path = self.parent.pootle_path + self.name
+        (self.language_code, self.project_code,
+         self.tp_path) = split_tp_path(self.pootle_path)
         if created:
             self.init_cache()
         super(Store, self).save(*args, **kwargs)
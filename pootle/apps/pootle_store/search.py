@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Unit search backends used by the editor.
+
+The backend is set by the ``POOTLE_SEARCH_BACKEND`` setting.
+"""
+
+from zlib import crc32
+
+from django.conf import settings
+from django.db.models import Count
+
+from pootle_misc.util import import_func
+
+from .fields import to_db
+
+
+#: Unit columns searched for every field of the search form
+SEARCH_FIELDS = {
+    'source': ('source_f', ),
+    'target': ('target_f', ),
+    'notes': ('translator_comment', 'developer_comment'),
+    'locations': ('locations', ),
+}
+
+#: Codes identifying the unit columns in the trigram index
+COLUMN_CODES = {
+    'source_f': 0,
+    'target_f': 1,
+    'translator_comment': 2,
+    'developer_comment': 3,
+    'locations': 4,
+}
+
+
+class DBSearchBackend(object):
+    """Searches units by looking for substrings directly in the database."""
+
+    def update(self, unit):
+        """Updates the search index after `unit` has been saved."""
+        pass
+
+    def index(self, units_queryset):
+        """Rebuilds the search index for all units in `units_queryset`."""
+        pass
+
+    def search(self, units_queryset, text, fields, exact=False):
+        """Narrows down `units_queryset` to units matching `text`.
+
+        :param fields: search form fields to look in (`source`, `target`,
+            `notes`, `locations`).
+        :param exact: when `True` units must contain the whole `text`,
+            respecting case. Otherwise they must contain all of its words,
+            ignoring case.
+        """
+        if exact:
+            terms = [text]
+        else:
+            terms = text.split()
+
+        result = units_queryset.none()
+        for field in ('source', 'target', 'notes', 'locations'):
+            if field not in fields:
+                continue
+
+            for column in SEARCH_FIELDS[field]:
+                result = result | self.filter_column(units_queryset, column,
+                                                     terms, exact)
+
+        return result
+
+    def filter_column(self, units_queryset, column, terms, exact):
+        """Narrows down `units_queryset` to units containing all `terms` in
+        `column`.
+        """
+        lookup = column + ('__contains' if exact else '__icontains')
+        for term in terms:
+            units_queryset = units_queryset.filter(**{lookup: term})
+
+        return units_queryset
+
+
+class TrigramSearchBackend(DBSearchBackend):
+    """Narrows down database searches using an index of trigrams.
+
+    Every unit column is indexed as the set of hashes of its lowercased
+    3-character substrings, kept in :class:`pootle_store.models.UnitTrigram`.
+    Only units having all the trigrams of the searched terms are then
+    matched against the actual text, so searches never scan the whole
+    unit table. Hash collisions may only add candidates, never lose them.
+    """
+
+    def update(self, unit):
+        from .models import UnitTrigram
+
+        existing = set(UnitTrigram.objects.filter(unit=unit)
+                                          .values_list('column', 'trigram'))
+        current = get_unit_trigrams(unit)
+
+        stale = {}
+        for column, trigram in existing - current:
+            stale.setdefault(column, []).append(trigram)
+        for column, trigrams in stale.iteritems():
+            UnitTrigram.objects.filter(unit=unit, column=column,
+                                       trigram__in=trigrams).delete()
+
+        UnitTrigram.objects.bulk_create([
+            UnitTrigram(unit_id=unit.id, column=column, trigram=trigram)
+            for column, trigram in current - existing
+        ])
+
+    def index(self, units_queryset):
+        from .models import UnitTrigram
+
+        units = units_queryset.values('id', *COLUMN_CODES.keys())
+        for values in units.iterator():
+            UnitTrigram.objects.filter(unit=values['id']).delete()
+            UnitTrigram.objects.bulk_create([
+                UnitTrigram(unit_id=values['id'], column=column,
+                            trigram=trigram)
+                for column, trigram in get_column_trigrams(values)
+            ])
+
+    def filter_column(self, units_queryset, column, terms, exact):
+        from .models import UnitTrigram
+
+        trigrams = set()
+        for term in terms:
+            trigrams.update(get_trigrams(term))
+
+        if trigrams:
+            candidates = UnitTrigram.objects.filter(
+                column=COLUMN_CODES[column],
+                trigram__in=trigrams,
+            ).values('unit').annotate(
+                matches=Count('id'),
+            ).filter(matches__gte=len(trigrams)).values('unit')
+            units_queryset = units_queryset.filter(id__in=candidates)
+
+        return super(TrigramSearchBackend, self).filter_column(
+            units_queryset, column, terms, exact)
+
+
+def get_trigrams(text):
+    """Returns the set of hashed trigrams of lowercased `text`."""
+    text = text.lower()
+    return set(crc32(text[i:i + 3].encode('utf-8'))
+               for i in xrange(len(text) - 2))
+
+
+def get_column_trigrams(values):
+    """Returns the set of `(column code, trigram)` tuples for the raw
+    database `values` of unit columns.
+    """
+    result = set()
+    for column, code in COLUMN_CODES.iteritems():
+        if values.get(column):
+            result.update((code, trigram)
+                          for trigram in get_trigrams(values[column]))
+
+    return result
+
+
+def get_unit_trigrams(unit):
+    values = {}
+    for column in COLUMN_CODES:
+        values[column] = to_db(getattr(unit, column))
+
+    return get_column_trigrams(values)
+
+
+_search_backend = None
+
+
+def get_search_backend():
+    """Returns the unit search backend set in the settings."""
+    global _search_backend
+
+    if _search_backend is None:
+        backend_class = getattr(settings, 'POOTLE_SEARCH_BACKEND',
+                                'pootle_store.search.DBSearchBackend')
+        _search_backend = import_func(backend_class)()
+
+    return _search_backend
@@ -36,10 +36,18 @@ urlpatterns = patterns('pootle_store.views',
         'get_overview_stats',
         name='pootle-xhr-stats-overview'),
 
+    url(r'^xhr/mt/(?P<backend>[a-z_]+)/?$',
+        'get_mt_translations',
+        name='pootle-xhr-mt'),
+
     url(r'^xhr/units/?$',
         'get_units',
         name='pootle-xhr-units'),
 
+    url(r'^xhr/units/edit/?$',
+        'get_edit_units',
+        name='pootle-xhr-units-edit-batch'),
+
     url(r'^xhr/units/(?P<uid>[0-9]+)/?$',
         'submit',
         name='pootle-xhr-units-submit'),
@@ -97,13 +97,34 @@ def calc_translated_wordcount(units):
 
 
 def find_altsrcs(unit, alt_src_langs, store=None, project=None):
-    from pootle_store.models import Unit
-
     store = store or unit.store
     project = project or store.translation_project.project
 
-    altsrcs = Unit.objects.filter(
-                    unitid_hash=unit.unitid_hash,
+    return find_altsrcs_for_units([unit], alt_src_langs,
+                                  project=project)[unit.id]
+
+
+def find_altsrcs_for_units(units, alt_src_langs, project):
+    """Finds the translations of `units` into the alternative source
+    languages `alt_src_langs`, in a single query.
+
+    All `units` must belong to `project`.
+
+    :return: A dictionary mapping each unit id to the list of its
+        alternative source units.
+    """
+    from pootle_store.models import Unit
+
+    units_by_hash = {}
+    for unit in units:
+        units_by_hash.setdefault(unit.unitid_hash, []).append(unit)
+
+    altsrcs = dict((unit.id, []) for unit in units)
+    if not units_by_hash:
+        return altsrcs
+
+    alt_units = Unit.objects.filter(
+                    unitid_hash__in=units_by_hash.keys(),
                     store__translation_project__project=project,
                     store__translation_project__language__in=alt_src_langs,
                     state=TRANSLATED) \
@@ -111,8 +132,13 @@ def find_altsrcs(unit, alt_src_langs, store=None, project=None):
                                 'store', 'store__translation_project',
                                 'store__translation_project__language')
 
-    if project.get_treestyle() == 'nongnu':
-        altsrcs = filter(lambda x: x.store.path == store.path, altsrcs)
+    is_nongnu = project.get_treestyle() == 'nongnu'
+    for alt_unit in alt_units:
+        for unit in units_by_hash[alt_unit.unitid_hash]:
+            if is_nongnu and alt_unit.store.path != unit.store.path:
+                continue
+
+            altsrcs[unit.id].append(alt_unit)
 
     return altsrcs
 
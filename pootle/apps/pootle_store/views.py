@@ -20,45 +20,61 @@
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from hashlib import md5
 from itertools import groupby
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.core.urlresolvers import reverse
 from django.db.models import Max, Q
 from django.http import HttpResponse, Http404
 from django.shortcuts import redirect, render
 from django.template import loader, RequestContext
-from django.utils.translation import to_locale, ugettext as _
+from django.utils.encoding import iri_to_uri
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language, to_locale, ugettext as _
 from django.utils.translation.trans_real import parse_accept_lang_header
 from django.utils import timezone
 from django.views.decorators.cache import never_cache
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 
 from translate.filters.decorators import Category
 from translate.lang import data
 
+from pootle.core import mt
 from pootle.core.dateparse import parse_datetime
 from pootle.core.decorators import (get_path_obj, get_resource,
                                     permission_required)
 from pootle.core.exceptions import Http400
-from pootle_app.models.permissions import check_user_permission
-from pootle_misc.checks import check_names
+from pootle.core.mixins.treeitem import get_stats_version
+from pootle.core.paginator import (CursorPaginator, InvalidCursor,
+                                   delta_encode, get_row_id)
+from pootle.core.tmserver import search_many as search_tm_units
+from pootle.core.url_helpers import split_pootle_path
+from pootle.i18n.gettext import language_dir
+from pootle_app.models.permissions import (
+    check_user_permission, get_matching_permissions,
+    get_matching_permissions_for_paths,
+)
+from pootle_misc.checks import category_bits, check_names, get_category_mask
 from pootle_misc.forms import make_search_form
 from pootle_misc.util import ajax_required, jsonify, to_int, get_date_interval
 from pootle_statistics.models import (Submission, SubmissionFields,
                                       SubmissionTypes)
 
-from .decorators import get_unit_context
+from .decorators import get_permission_message, get_unit_context
 from .fields import to_python
 from .forms import (unit_comment_form_factory, unit_form_factory,
                     highlight_whitespace)
-from .models import Unit, SuggestionStates
+from .models import QualityCheck, Store, Suggestion, SuggestionStates, Unit
+from .search import get_search_backend
 from .signals import translation_submitted
 from .templatetags.store_tags import (highlight_diffs, pluralize_source,
                                       pluralize_target)
 from .util import (UNTRANSLATED, FUZZY, TRANSLATED, STATES_MAP,
-                   find_altsrcs)
+                   find_altsrcs_for_units)
 
 
 #: Mapping of allowed sorting criteria.
@@ -84,20 +100,31 @@ ALLOWED_SORTS = {
 #: `order_by(field)`
 SIMPLY_SORTED = ['units']
 
+#: Maximum number of units whose editing widgets are returned at once
+MAX_EDIT_UNITS = 20
+
+#: Fields uniquely identifying units in their default ordering, used to
+#: paginate units with keyset cursors
+UNIT_KEYSET_ORDERING = ('store__pootle_path', 'index', 'id')
+
 
 def get_alt_src_langs(request, user, translation_project):
+    from pootle_language.models import Language
+
     language = translation_project.language
     project = translation_project.project
     source_language = project.source_language
 
-    langs = user.alt_src_langs.exclude(
-            id__in=(language.id, source_language.id)
-        ).filter(translationproject__project=project)
+    alt_src_lang_ids = user.get_alt_src_lang_ids()
+    langs = Language.objects.filter(
+            id__in=alt_src_lang_ids,
+            translationproject__project=project,
+        ).exclude(id__in=(language.id, source_language.id))
 
-    if not user.alt_src_langs.count():
-        from pootle_language.models import Language
+    if not alt_src_lang_ids:
         accept = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
 
+        candidates = []
         for accept_lang, unused in parse_accept_lang_header(accept):
             if accept_lang == '*':
                 continue
@@ -110,89 +137,37 @@ def get_alt_src_langs(request, user, translation_project):
                 code in ('en', 'en_US', source_language.code, language.code)):
                 continue
 
-            langs = Language.objects.filter(
-                code__in=(normalized, code),
-                translationproject__project=project,
-            )
-            if langs.count():
-                break
-
-    return langs
-
-
-def get_search_query(form, units_queryset):
-    words = form.cleaned_data['search'].split()
-    result = units_queryset.none()
-
-    if 'source' in form.cleaned_data['sfields']:
-        subresult = units_queryset
-        for word in words:
-            subresult = subresult.filter(source_f__icontains=word)
-        result = result | subresult
-
-    if 'target' in form.cleaned_data['sfields']:
-        subresult = units_queryset
-        for word in words:
-            subresult = subresult.filter(target_f__icontains=word)
-        result = result | subresult
-
-    if 'notes' in form.cleaned_data['sfields']:
-        translator_subresult = units_queryset
-        developer_subresult = units_queryset
-        for word in words:
-            translator_subresult = translator_subresult.filter(
-                translator_comment__icontains=word,
-            )
-            developer_subresult = developer_subresult.filter(
-                developer_comment__icontains=word,
-            )
-        result = result | translator_subresult | developer_subresult
-
-    if 'locations' in form.cleaned_data['sfields']:
-        subresult = units_queryset
-        for word in words:
-            subresult = subresult.filter(locations__icontains=word)
-        result = result | subresult
+            candidates.append((normalized, code))
 
-    return result
+        if candidates:
+            # Look all candidates up at once, then pick the preferred one
+            codes = set(code for candidate in candidates for code in candidate)
+            project_codes = set(Language.objects.filter(
+                code__in=codes,
+                translationproject__project=project,
+            ).values_list('code', flat=True))
 
-def get_search_exact_query(form, units_queryset):
-    phrase = form.cleaned_data['search']
-    result = units_queryset.none()
-
-    if 'source' in form.cleaned_data['sfields']:
-        subresult = units_queryset.filter(source_f__contains=phrase)
-        result = result | subresult
-
-    if 'target' in form.cleaned_data['sfields']:
-        subresult = units_queryset.filter(target_f__contains=phrase)
-        result = result | subresult
-
-    if 'notes' in form.cleaned_data['sfields']:
-        translator_subresult = units_queryset
-        developer_subresult = units_queryset
-        translator_subresult = translator_subresult.filter(
-            translator_comment__contains=phrase,
-        )
-        developer_subresult = developer_subresult.filter(
-            developer_comment__contains=phrase,
-        )
-        result = result | translator_subresult | developer_subresult
-
-    if 'locations' in form.cleaned_data['sfields']:
-        subresult = units_queryset.filter(locations__contains=phrase)
-        result = result | subresult
+            for normalized, code in candidates:
+                if normalized in project_codes or code in project_codes:
+                    langs = Language.objects.filter(
+                        code__in=(normalized, code),
+                        translationproject__project=project,
+                    )
+                    break
 
-    return result
+    return langs
 
 
 def get_search_step_query(form, units_queryset):
     """Narrows down units query to units matching search string."""
-    if 'exact' in form.cleaned_data['soptions']:
+    exact = 'exact' in form.cleaned_data['soptions']
+    if exact:
         logging.debug(u"Using exact database search")
-        return get_search_exact_query(form, units_queryset)
 
-    return get_search_query(form, units_queryset)
+    return get_search_backend().search(units_queryset,
+                                       form.cleaned_data['search'],
+                                       form.cleaned_data['sfields'],
+                                       exact=exact)
 
 
 def get_step_query(request, units_queryset):
@@ -230,8 +205,8 @@ def get_step_query(request, units_queryset):
                 )
             elif unit_filter == 'suggestions':
                 match_queryset = units_queryset.filter(
-                        suggestion__state=SuggestionStates.PENDING
-                    ).distinct()
+                    has_pending_suggestion=True,
+                )
             elif unit_filter in ('my-suggestions', 'user-suggestions'):
                 match_queryset = units_queryset.filter(
                         suggestion__state=SuggestionStates.PENDING,
@@ -264,10 +239,23 @@ def get_step_query(request, units_queryset):
                 checks = request.GET['checks'].split(',')
 
                 if checks:
-                    match_queryset = units_queryset.filter(
-                        qualitycheck__false_positive=False,
-                        qualitycheck__name__in=checks,
-                    ).distinct()
+                    category_mask = get_category_mask(checks)
+                    if category_mask == category_bits[Category.CRITICAL]:
+                        match_queryset = units_queryset.filter(
+                            has_critical_check=True,
+                        )
+                    elif category_mask is not None:
+                        # Whole categories, use the denormalized bitset
+                        match_queryset = units_queryset.extra(
+                            where=['(pootle_store_unit.check_categories '
+                                   '& %s) != 0'],
+                            params=[category_mask],
+                        )
+                    else:
+                        match_queryset = units_queryset.filter(
+                            qualitycheck__false_positive=False,
+                            qualitycheck__name__in=checks,
+                        ).distinct()
 
             if modified_since is not None:
                 datetime_obj = parse_datetime(modified_since)
@@ -285,8 +273,10 @@ def get_step_query(request, units_queryset):
 
             sort_by = ALLOWED_SORTS[sort_on].get(sort_by_param, None)
             if sort_by is not None:
+                # Ties are broken by id, so units can be paginated by
+                # their sort keys
                 if sort_on in SIMPLY_SORTED:
-                    match_queryset = match_queryset.order_by(sort_by)
+                    match_queryset = match_queryset.order_by(sort_by, 'id')
                 else:
                     # Omit leading `-` sign
                     if sort_by[0] == '-':
@@ -301,7 +291,7 @@ def get_step_query(request, units_queryset):
                     # (unless PostreSQL is used and `distinct(field_name)`)
                     match_queryset = match_queryset \
                         .annotate(sort_by_field=Max(max_field)) \
-                        .order_by(sort_order)
+                        .order_by(sort_order, 'id')
 
             units_queryset = match_queryset
 
@@ -355,38 +345,104 @@ def _prepare_unit(unit):
     }
 
 
-def _path_units_with_meta(path, units):
-    """Constructs a dictionary which contains a list of `units`
-    corresponding to `path` as well as its metadata.
+#: Unit columns needed to serialize units for the editor
+UNIT_VALUES_FIELDS = ('id', 'store_id', 'source_f', 'target_f', 'state')
+
+
+def _get_stores_meta(store_ids):
+    """Returns a dictionary of the data shared by the units of each of the
+    stores with ids in `store_ids`, keyed by store id.
     """
-    meta = None
-    units_list = []
+    stores = Store.objects.filter(id__in=store_ids).values_list(
+        'id', 'pootle_path',
+        'translation_project__language__code',
+        'translation_project__language__nplurals',
+        'translation_project__project__code',
+        'translation_project__project__checkstyle',
+        'translation_project__project__source_language__code',
+    )
 
-    for unit in iter(units):
-        if meta is None:
-            # XXX: Watch out for the query count
-            store = unit.store
-            tp = store.translation_project
-            project = tp.project
-            meta = {
-                'source_lang': project.source_language.code,
-                'source_dir': project.source_language.direction,
-                'target_lang': tp.language.code,
-                'target_dir': tp.language.direction,
-                'project_code': project.code,
-                'project_style': project.checkstyle,
-            }
+    stores_meta = {}
+    for (store_id, pootle_path, language_code, nplurals, project_code,
+         checkstyle, source_language_code) in stores:
+        lang, proj, dir, fn = split_pootle_path(pootle_path)
+        stores_meta[store_id] = {
+            'pootle_path': pootle_path,
+            'url': u''.join([
+                reverse('pootle-tp-translate', args=[lang, proj, dir, fn]),
+                '#unit=',
+            ]),
+            'nplurals': nplurals,
+            'meta': {
+                'source_lang': source_language_code,
+                'source_dir': language_dir(source_language_code),
+                'target_lang': language_code,
+                'target_dir': language_dir(language_code),
+                'project_code': project_code,
+                'project_style': checkstyle,
+            },
+        }
 
-        units_list.append(_prepare_unit(unit))
+    return stores_meta
+
+
+def _prepare_unit_values(values, store_meta):
+    """Constructs a dictionary with relevant unit data out of the raw
+    database `values` of the unit, as listed in `UNIT_VALUES_FIELDS`.
+
+    This is equivalent to `_prepare_unit()`, without building model
+    instances.
+    """
+    uid, store_id, source_f, target_f, state = values
+    source = to_python(source_f)
+    target = to_python(target_f)
+
+    if len(source.strings) > 1 or source.plural:
+        sources = source.strings
+        targets = [
+            i < len(target.strings) and target.strings[i] or ''
+            for i in range(store_meta['nplurals'])
+        ]
+    else:
+        sources = [source]
+        targets = [target]
 
     return {
-        path: {
-            'meta': meta,
-            'units': units_list,
-        },
+        'id': uid,
+        'url': store_meta['url'] + unicode(uid),
+        'isfuzzy': state == FUZZY,
+        'source': sources,
+        'target': targets,
     }
 
 
+def _get_unit_groups(uids):
+    """Returns the editor data of the units with ids in `uids` and their
+    metadata, grouped by the store they belong to.
+
+    Units are serialized straight from the columns they need, keeping the
+    ordering in `uids`.
+    """
+    rows = Unit.objects.filter(id__in=uids).values_list(*UNIT_VALUES_FIELDS)
+    rows_by_id = dict((row[0], row) for row in rows)
+    rows = [rows_by_id[uid] for uid in uids if uid in rows_by_id]
+
+    stores_meta = _get_stores_meta(set(row[1] for row in rows))
+
+    unit_groups = []
+    for store_id, store_rows in groupby(rows, lambda x: x[1]):
+        store_meta = stores_meta[store_id]
+        unit_groups.append({
+            store_meta['pootle_path']: {
+                'meta': store_meta['meta'],
+                'units': [_prepare_unit_values(row, store_meta)
+                          for row in store_rows],
+            },
+        })
+
+    return unit_groups
+
+
 def _build_units_list(units, reverse=False):
     """Given a list/queryset of units, builds a list with the unit data
     contained in a dictionary ready to be returned as JSON.
@@ -402,6 +458,49 @@ def _build_units_list(units, reverse=False):
     return return_units
 
 
+def get_uids_queryset(step_queryset):
+    """Returns a queryset yielding the ids of units in `step_queryset`, in
+    its ordering.
+    """
+    sort_by_field = None
+    if step_queryset.query.order_by:
+        sort_by_field = step_queryset.query.order_by[0]
+
+    sort_on = None
+    for key, item in ALLOWED_SORTS.items():
+        if sort_by_field in item.values():
+            sort_on = key
+            break
+
+    if sort_by_field is None or sort_on == 'units':
+        return step_queryset.values_list('id', flat=True)
+
+    # Not using `values_list()` here because it doesn't know about all
+    # existing relations when `extra()` has been used before in the
+    # queryset. This affects annotated names such as those ending in
+    # `__max`, where Django thinks we're trying to lookup a field on a
+    # relationship field. That's why `sort_by_field` alias for `__max`
+    # is used here. This alias must be queried in
+    # `values('sort_by_field', 'id')` with `id` otherwise
+    # Django looks for `sort_by_field` field in the initial table.
+    # https://code.djangoproject.com/ticket/19434
+    return step_queryset.values('id', 'sort_by_field')
+
+
+def get_units_paginator(step_queryset):
+    """Returns a cursor paginator over the units in `step_queryset`.
+
+    Units are paginated by their keys in the current ordering, with the
+    unit id breaking ties of custom sorts, so windows stay cheap however
+    deep they are.
+    """
+    if not step_queryset.query.order_by:
+        return CursorPaginator(step_queryset, UNIT_KEYSET_ORDERING)
+
+    return CursorPaginator(step_queryset,
+                           (step_queryset.query.order_by[0], 'id'))
+
+
 @ajax_required
 def get_units(request):
     """Gets source and target texts and its metadata.
@@ -413,7 +512,16 @@ def get_units(request):
         consider. The user's preference will be used by default.
 
         When the `initial` GET parameter is present, a sorted list of
-        the result set ids will be returned too.
+        the result set ids will be returned too. If `paging` is `delta`,
+        that list is returned delta-encoded as `uIdsDelta` instead.
+
+        If `paging` is `cursor`, only a window of the result set ids is
+        returned, along with opaque `before` and `after` cursors which
+        can be passed back as GET parameters to retrieve the adjacent
+        windows. Initial windows are centered on the unit in `uids` or
+        on the (zero-based) `index` position when given, and they come
+        along with the `total` size of the result set and their `offset`
+        in it.
     """
     pootle_path = request.GET.get('path', None)
     if pootle_path is None:
@@ -424,45 +532,50 @@ def get_units(request):
     limit = request.profile.get_unit_rows()
 
     units_qs = Unit.objects.get_for_path(pootle_path, request.profile)
-    units_qs = units_qs.select_related(
-        'store__translation_project__project',
-        'store__translation_project__language',
-    )
     step_queryset = get_step_query(request, units_qs)
 
     is_initial_request = request.GET.get('initial', False)
-    chunk_size = request.GET.get('count', limit)
+    chunk_size = to_int(request.GET.get('count', limit)) or limit
     uids_param = filter(None, request.GET.get('uids', '').split(u','))
     uids = filter(None, map(to_int, uids_param))
+    paging = request.GET.get('paging', None)
+    before_cursor = request.GET.get('before', None)
+    after_cursor = request.GET.get('after', None)
+    index = to_int(request.GET.get('index', ''))
 
-    units = []
-    unit_groups = []
     uid_list = []
+    response = {}
 
-    if is_initial_request:
-        sort_by_field = None
-        if len(step_queryset.query.order_by) == 1:
-            sort_by_field = step_queryset.query.order_by[0]
-
-        sort_on = None
-        for key, item in ALLOWED_SORTS.items():
-            if sort_by_field in item.values():
-                sort_on = key
-                break
-
-        if sort_by_field is None or sort_on == 'units':
-            uid_list = list(step_queryset.values_list('id', flat=True))
-        else:
-            # Not using `values_list()` here because it doesn't know about all
-            # existing relations when `extra()` has been used before in the
-            # queryset. This affects annotated names such as those ending in
-            # `__max`, where Django thinks we're trying to lookup a field on a
-            # relationship field. That's why `sort_by_field` alias for `__max`
-            # is used here. This alias must be queried in
-            # `values('sort_by_field', 'id')` with `id` otherwise
-            # Django looks for `sort_by_field` field in the initial table.
-            # https://code.djangoproject.com/ticket/19434
-            uid_list = [u['id'] for u in step_queryset.values('id', 'sort_by_field')]
+    if (paging == 'cursor' and is_initial_request or
+        before_cursor is not None or after_cursor is not None):
+        paginator = get_units_paginator(step_queryset)
+        try:
+            if after_cursor is not None:
+                window = paginator.after(after_cursor, 2 * chunk_size)
+            elif before_cursor is not None:
+                window = paginator.before(before_cursor, 2 * chunk_size)
+            elif len(uids) == 1:
+                window = paginator.around(uids[0], chunk_size)
+            elif index is not None:
+                window = paginator.at(max(index, 0), chunk_size)
+            else:
+                window = paginator.first(2 * chunk_size)
+        except InvalidCursor:
+            raise Http400(_('Invalid cursor.'))
+        except Unit.DoesNotExist:
+            raise Http404  # `uid` not found in the result set
+
+        uids = window.ids
+        response['uIds'] = window.ids
+        response['cursors'] = {
+            'before': window.before,
+            'after': window.after,
+        }
+        if window.offset is not None:
+            response['offset'] = window.offset
+            response['total'] = paginator.count()
+    elif is_initial_request:
+        uid_list = map(get_row_id, get_uids_queryset(step_queryset))
 
         if len(uids) == 1:
             try:
@@ -477,18 +590,17 @@ def get_units(request):
             count = 2 * chunk_size
             uids = uid_list[:count]
 
-    if not units and uids:
-        units = step_queryset.filter(id__in=uids)
-
-    units_by_path = groupby(units, lambda x: x.store.pootle_path)
-    for pootle_path, units in units_by_path:
-        unit_groups.append(_path_units_with_meta(pootle_path, units))
+    elif uids:
+        # Only units in the result set can be requested, in its ordering
+        uids = map(get_row_id,
+                   get_uids_queryset(step_queryset.filter(id__in=uids)))
 
-    response = {
-        'unitGroups': unit_groups,
-    }
+    response['unitGroups'] = _get_unit_groups(uids)
     if uid_list:
-        response['uIds'] = uid_list
+        if paging == 'delta':
+            response['uIdsDelta'] = delta_encode(uid_list)
+        else:
+            response['uIds'] = uid_list
 
     return HttpResponse(jsonify(response), content_type="application/json")
 
@@ -519,35 +631,103 @@ def get_more_context(request, unit):
     return HttpResponse(response, status=rcode, content_type="application/json")
 
 
-@never_cache
-@get_unit_context('view')
-def timeline(request, unit):
-    """Returns a JSON-encoded string including the changes to the unit
-    rendered in HTML.
-    """
-    timeline = Submission.objects.filter(unit=unit, field__in=[
+def _get_timeline_submissions(unit):
+    """Returns the submissions shown in the timeline of `unit`."""
+    submissions = Submission.objects.filter(unit=unit, field__in=[
         SubmissionFields.TARGET, SubmissionFields.STATE,
         SubmissionFields.COMMENT, SubmissionFields.NONE
     ]).exclude(
         field=SubmissionFields.COMMENT,
         creation_time=unit.commented_on
     ).order_by("id")
-    timeline = timeline.select_related("submitter__user",
-                                       "translation_project__language")
+    return submissions.select_related("submitter__user",
+                                      "translation_project__language",
+                                      "quality_check")
 
-    User = get_user_model()
-    entries_group = []
-    context = {}
+
+def _get_timeline_entry(item):
+    entry = {
+        'field': item.field,
+        'field_name': SubmissionFields.NAMES_MAP[item.field],
+    }
+
+    if item.field == SubmissionFields.STATE:
+        entry['old_value'] = STATES_MAP[int(to_python(item.old_value))]
+        entry['new_value'] = STATES_MAP[int(to_python(item.new_value))]
+    elif item.quality_check:
+        check_name = item.quality_check.name
+        entry.update({
+            'check_name': check_name,
+            'check_display_name': check_names[check_name],
+            'checks_url': reverse('pootle-staticpages-display',
+                                  args=['help/quality-checks']),
+            'action': {
+                        SubmissionTypes.MUTE_CHECK: 'Muted',
+                        SubmissionTypes.UNMUTE_CHECK: 'Unmuted'
+                      }.get(item.type, '')
+        })
+    else:
+        entry['new_value'] = to_python(item.new_value)
+
+    return entry
+
+
+def _render_timeline_entry_group(entry_group, language):
+    return loader.render_to_string('editor/units/xhr_timeline_entry.html', {
+        'entry_group': entry_group,
+        'language': language,
+    })
+
+
+def get_timeline_entries(unit):
+    """Returns the timeline entry groups of `unit` rendered in HTML, most
+    recent first.
+
+    Rendered groups are cached along with the unit's revision, so an
+    unchanged timeline is returned without accessing the DB, and only
+    the submissions made since are rendered when the unit changes.
+    """
+    cache_key = iri_to_uri('timeline:%d:%s' % (unit.id, get_language()))
+    version = (unit.revision, unit.mtime)
+
+    timeline = cache.get(cache_key)
+    if (timeline is not None and timeline['version'] == version and
+        timeline['commented_on'] == unit.commented_on):
+        return timeline['entries_html'][::-1]
+
+    is_full_timeline = (timeline is None or
+                        timeline['last_group'] is None or
+                        timeline['commented_on'] != unit.commented_on)
+    if is_full_timeline:
+        timeline = {
+            'commented_on': unit.commented_on,
+            'entries_html': [],
+            'last_group': None,
+            'last_id': 0,
+            'language': None,
+        }
+
+    submissions = _get_timeline_submissions(unit) \
+        .filter(id__gt=timeline['last_id'])
 
     # Group by submitter id and creation_time because
     # different submissions can have same creation time
+    has_created_group = False
+    entries_html = timeline['entries_html']
+    last_group = timeline['last_group']
     for key, values in \
-        groupby(timeline,
+        groupby(submissions,
                 key=lambda x: "%d\001%s" % (x.submitter.id, x.creation_time)):
 
-        entry_group = {
-            'entries': [],
-        }
+        if last_group is not None and last_group['key'] == key:
+            # Same entry group as the last one, render it again
+            entry_group = last_group
+            entries_html.pop()
+        else:
+            entry_group = {
+                'key': key,
+                'entries': [],
+            }
 
         for item in values:
             # Only add creation_time information for the whole entry group once
@@ -556,39 +736,24 @@ def timeline(request, unit):
             # Only add submitter information for the whole entry group once
             entry_group.setdefault('submitter', item.submitter)
 
-            context.setdefault('language', item.translation_project.language)
-
-            entry = {
-                'field': item.field,
-                'field_name': SubmissionFields.NAMES_MAP[item.field],
-            }
+            if timeline['language'] is None:
+                timeline['language'] = item.translation_project.language
 
-            if item.field == SubmissionFields.STATE:
-                entry['old_value'] = STATES_MAP[int(to_python(item.old_value))]
-                entry['new_value'] = STATES_MAP[int(to_python(item.new_value))]
-            elif item.quality_check:
-                check_name = item.quality_check.name
-                entry.update({
-                    'check_name': check_name,
-                    'check_display_name': check_names[check_name],
-                    'checks_url': reverse('pootle-staticpages-display',
-                                          args=['help/quality-checks']),
-                    'action': {
-                                SubmissionTypes.MUTE_CHECK: 'Muted',
-                                SubmissionTypes.UNMUTE_CHECK: 'Unmuted'
-                              }.get(item.type, '')
-                })
-            else:
-                entry['new_value'] = to_python(item.new_value)
+            entry_group['entries'].append(_get_timeline_entry(item))
+            timeline['last_id'] = item.id
 
-            entry_group['entries'].append(entry)
+        if (is_full_timeline and not entries_html and
+            entry_group['datetime'] == unit.creation_time):
+            entry_group['created'] = True
+            has_created_group = True
 
-        entries_group.append(entry_group)
+        entries_html.append(_render_timeline_entry_group(
+            entry_group, timeline['language'],
+        ))
+        last_group = entry_group
 
-    if (len(entries_group) > 0 and
-        entries_group[0]['datetime'] == unit.creation_time):
-        entries_group[0]['created'] = True
-    else:
+    if is_full_timeline and not has_created_group:
+        User = get_user_model()
         created = {
             'created': True,
             'submitter': User.objects.get_system_user(),
@@ -596,12 +761,27 @@ def timeline(request, unit):
 
         if unit.creation_time:
             created['datetime'] = unit.creation_time
-        entries_group[:0] = [created]
+        entries_html[:0] = [_render_timeline_entry_group(
+            created, timeline['language'],
+        )]
+
+    timeline['last_group'] = last_group
+    timeline['version'] = version
+    cache.set(cache_key, timeline, settings.POOTLE_CACHE_TIMEOUT)
 
     # Let's reverse the chronological order
-    entries_group.reverse()
+    return entries_html[::-1]
 
-    context['entries_group'] = entries_group
+
+@never_cache
+@get_unit_context('view')
+def timeline(request, unit):
+    """Returns a JSON-encoded string including the changes to the unit
+    rendered in HTML.
+    """
+    context = {
+        'entries_html': map(mark_safe, get_timeline_entries(unit)),
+    }
 
     if request.is_ajax():
         # The client will want to confirm that the response is relevant for
@@ -688,20 +868,82 @@ def save_comment(request, unit):
     return HttpResponse(response, status=rcode, content_type="application/json")
 
 
-@never_cache
-@ajax_required
-@get_unit_context('view')
-def get_edit_unit(request, unit):
-    """Given a store path ``pootle_path`` and unit id ``uid``, gathers all the
-    necessary information to build the editing widget.
+def _get_edit_context(request, translation_project, directory,
+                      permissions=None):
+    """Returns the context shared by edit widgets of units in `directory`
+    of `translation_project`.
 
-    :return: A templatised editing widget is returned within the ``editor``
-             variable and paging information is also returned if the page
-             number has changed.
+    :param permissions: the user's permission codenames in `directory`,
+        if they were already looked up.
+    """
+    user = request.profile
+    if user.is_superuser:
+        permissions = ['administrate']
+    elif permissions is None:
+        permissions = get_matching_permissions(user, directory)
+    is_admin = 'administrate' in permissions
+
+    return {
+        'cantranslate': is_admin or 'translate' in permissions,
+        'cansuggest': is_admin or 'suggest' in permissions,
+        'canreview': is_admin or 'review' in permissions,
+        'is_admin': is_admin,
+        'alt_src_langs': get_alt_src_langs(request, user,
+                                           translation_project),
+    }
+
+
+def _get_units_edit_data(units, edit_context):
+    """Looks up the related data shown in the editing widgets of `units`,
+    at once for all of them.
+
+    All `units` must belong to the same translation project.
+
+    :return: A dictionary mapping each unit id to its alternative source
+        units (`altsrcs`), terminology matches (`terms`), quality checks
+        (`checks`), pending suggestions (`suggestions`) and TM suggestions
+        (`tm_suggestions`).
+    """
+    translation_project = units[0].store.translation_project
+    project = translation_project.project
+
+    # Alternative source languages only depend on the TP
+    altsrcs = find_altsrcs_for_units(units, edit_context['alt_src_langs'],
+                                     project)
+    tm_suggestions = search_tm_units(units)
+    matcher = translation_project.gettermmatcher()
+
+    units_data = dict((unit.id, {
+        'altsrcs': altsrcs[unit.id],
+        'terms': matcher.matches(unit.source) if matcher is not None else [],
+        'checks': [],
+        'suggestions': [],
+        'tm_suggestions': tm_suggestions[unit.id],
+    }) for unit in units)
+
+    for check in QualityCheck.objects.filter(unit__in=units_data.keys()):
+        units_data[check.unit_id]['checks'].append(check)
+
+    suggestions = Suggestion.objects.pending() \
+                                    .filter(unit__in=units_data.keys()) \
+                                    .select_related('user')
+    for suggestion in suggestions:
+        units_data[suggestion.unit_id]['suggestions'].append(suggestion)
+
+    return units_data
+
+
+def _get_edit_unit_json(request, unit, edit_context, unit_data):
+    """Gathers all the necessary information to build the editing widget
+    of `unit`.
+
+    :param unit_data: the related data of `unit`, as looked up by
+        :func:`_get_units_edit_data`.
     """
     json = {}
 
-    translation_project = request.translation_project
+    store = unit.store
+    translation_project = store.translation_project
     language = translation_project.language
 
     if unit.hasplural():
@@ -714,10 +956,8 @@ def get_edit_unit(request, unit):
     comment_form_class = unit_comment_form_factory(language)
     comment_form = comment_form_class({}, instance=unit, request=request)
 
-    store = unit.store
     directory = store.parent
     user = request.profile
-    alt_src_langs = get_alt_src_langs(request, user, translation_project)
     project = translation_project.project
 
     template_vars = {
@@ -731,12 +971,16 @@ def get_edit_unit(request, unit):
         'project': project,
         'language': language,
         'source_language': translation_project.project.source_language,
-        'cantranslate': check_user_permission(user, "translate", directory),
-        'cansuggest': check_user_permission(user, "suggest", directory),
-        'canreview': check_user_permission(user, "review", directory),
-        'is_admin': check_user_permission(user, 'administrate', directory),
-        'altsrcs': find_altsrcs(unit, alt_src_langs, store=store,
-                                project=project),
+        'cantranslate': edit_context['cantranslate'],
+        'cansuggest': edit_context['cansuggest'],
+        'canreview': edit_context['canreview'],
+        'is_admin': edit_context['is_admin'],
+        'altsrcs': unit_data['altsrcs'],
+        'terms': unit_data['terms'],
+        'checks': unit_data['checks'],
+        'has_active_checks': any(not check.false_positive
+                                 for check in unit_data['checks']),
+        'suggestions': unit_data['suggestions'],
     }
 
     if translation_project.project.is_terminology or store.is_terminology:
@@ -745,11 +989,9 @@ def get_edit_unit(request, unit):
         t = loader.get_template('editor/units/edit.html')
     c = RequestContext(request, template_vars)
     json['editor'] = t.render(c)
-    json['tm_suggestions'] = unit.get_tm_suggestions()
+    json['tm_suggestions'] = unit_data['tm_suggestions']
     json['is_obsolete'] = unit.isobsolete()
 
-    rcode = 200
-
     # Return context rows if filtering is applied but
     # don't return any if the user has asked not to have it
     current_filter = request.GET.get('filter', 'all')
@@ -764,19 +1006,157 @@ def get_edit_unit(request, unit):
             ctx_qty = int(request.COOKIES.get('ctxQty', 1))
             json['ctx'] = _filter_ctx_units(store.units, unit, ctx_qty)
 
+    return json
+
+
+@never_cache
+@ajax_required
+@get_unit_context('view')
+def get_edit_unit(request, unit):
+    """Given a store path ``pootle_path`` and unit id ``uid``, gathers all the
+    necessary information to build the editing widget.
+
+    :return: A templatised editing widget is returned within the ``editor``
+             variable and paging information is also returned if the page
+             number has changed.
+    """
+    edit_context = _get_edit_context(request, request.translation_project,
+                                     unit.store.parent)
+    unit_data = _get_units_edit_data([unit], edit_context)[unit.id]
+    json = _get_edit_unit_json(request, unit, edit_context, unit_data)
+
+    rcode = 200
     response = jsonify(json)
     return HttpResponse(response, status=rcode, content_type="application/json")
 
 
+@never_cache
+@ajax_required
+def get_edit_units(request):
+    """Gathers the editing widgets for several units at once, so clients
+    can prefetch the units they are about to edit.
+
+    :return: An object in JSON notation which maps each of the ids given
+        in the ``uids`` GET parameter to the same data returned by
+        :func:`get_edit_unit`. Units which don't exist are left out.
+    """
+    from pootle_project.models import Project
+
+    uids_param = filter(None, request.GET.get('uids', '').split(u','))
+    uids = filter(None, map(to_int, uids_param))[:MAX_EDIT_UNITS]
+    if not uids:
+        raise Http400(_('Arguments missing.'))
+
+    User = get_user_model()
+    request.profile = User.get(request.user)
+
+    units = list(Unit.objects.filter(id__in=uids).select_related(
+        'store__translation_project__project__source_language',
+        'store__translation_project__language',
+        'store__parent',
+    ))
+
+    # Permissions of all the projects and directories involved are looked
+    # up at once
+    user_projects = Project.accessible_by_user(request.user)
+    directory_paths = set()
+    for unit in units:
+        directory_paths.add(unit.store.parent.pootle_path)
+        directory_paths.add(unit.store.translation_project.pootle_path)
+    directory_permissions = get_matching_permissions_for_paths(
+        request.profile, list(directory_paths),
+    )
+
+    edit_contexts = {}
+    units_by_tp = {}
+    translation_projects = {}
+    for unit in units:
+        translation_project = unit.store.translation_project
+        directory = unit.store.parent
+
+        # Share TP instances so their cached state (e.g. the terminology
+        # matcher) is reused across units
+        if translation_project.id in translation_projects:
+            translation_project = translation_projects[translation_project.id]
+            unit.store.translation_project = translation_project
+        else:
+            translation_projects[translation_project.id] = translation_project
+
+        if translation_project.id not in edit_contexts:
+            if (not request.user.is_superuser and
+                translation_project.project.code not in user_projects):
+                raise PermissionDenied(get_permission_message('view'))
+            edit_contexts[translation_project.id] = {}
+            units_by_tp[translation_project.id] = []
+
+        tp_contexts = edit_contexts[translation_project.id]
+        if directory.id not in tp_contexts:
+            tp_contexts[directory.id] = _get_edit_context(
+                request, translation_project, directory,
+                permissions=directory_permissions[directory.pootle_path],
+            )
+
+        units_by_tp[translation_project.id].append(unit)
+
+    units_json = {}
+    for tp_units in units_by_tp.itervalues():
+        translation_project = tp_units[0].store.translation_project
+        # Unit forms check the permissions of the current TP, as when
+        # editing units one by one
+        request.translation_project = translation_project
+        request.permissions = \
+            directory_permissions[translation_project.pootle_path]
+        tp_contexts = edit_contexts[translation_project.id]
+        units_data = _get_units_edit_data(tp_units,
+                                          tp_contexts.values()[0])
+
+        for unit in tp_units:
+            units_json[unit.id] = _get_edit_unit_json(
+                request, unit, tp_contexts[unit.store.parent_id],
+                units_data[unit.id],
+            )
+
+    return HttpResponse(jsonify({'units': units_json}),
+                        content_type="application/json")
+
+
 @get_unit_context('view')
 def permalink_redirect(request, unit):
     return redirect(request.build_absolute_uri(unit.get_translate_url()))
 
 
+def get_stats_etag(request, *args, **kwargs):
+    """Returns the ETag of the stats of the current resource.
+
+    It is derived from the versions of the cached stats, which change
+    every time the resource's stats are recalculated or all stats are
+    refreshed in bulk, so stats don't need to be computed to know whether
+    they changed. The dirty flag is included as well, because stats
+    change once the pending updates are processed.
+    """
+    from pootle_project.models import Project
+
+    resource_obj = request.resource_obj
+    is_dirty = getattr(resource_obj, 'is_dirty', lambda: False)()
+    cached_version = getattr(resource_obj, 'get_cached_version',
+                             lambda: 0)()
+    user_projects = Project.accessible_by_user(request.user)
+
+    validator = u':'.join(map(unicode, [
+        request.pootle_path,
+        cached_version,
+        get_stats_version(),
+        int(is_dirty),
+        u','.join(sorted(user_projects)),
+    ]))
+    return md5(validator.encode('utf-8')).hexdigest()
+
+
 @ajax_required
 @get_path_obj
 @permission_required('view')
 @get_resource
+@condition(etag_func=get_stats_etag)
 def get_qualitycheck_stats(request, *args, **kwargs):
     failing_checks = request.resource_obj.get_checks()
     response = jsonify(failing_checks)
@@ -787,12 +1167,47 @@ def get_qualitycheck_stats(request, *args, **kwargs):
 @get_path_obj
 @permission_required('view')
 @get_resource
+@condition(etag_func=get_stats_etag)
 def get_overview_stats(request, *args, **kwargs):
     stats = request.resource_obj.get_stats()
     response = jsonify(stats)
     return HttpResponse(response, content_type="application/json")
 
 
+@ajax_required
+def get_mt_translations(request, backend):
+    """Translates the `q` texts from the `source` language into the `target`
+    language with the `backend` MT service.
+
+    :return: a JSON object with the list of `translations`.
+    """
+    if not request.user.is_authenticated():
+        raise PermissionDenied(_('You must log in to use machine '
+                                 'translation.'))
+
+    name = backend.upper()
+    if mt.get_backend(name) is None:
+        raise Http404
+
+    source_lang = request.GET.get('source', None)
+    target_lang = request.GET.get('target', None)
+    texts = request.GET.getlist('q')
+    if not source_lang or not target_lang or not texts:
+        raise Http400(_('Arguments missing.'))
+
+    try:
+        translations = mt.translate(name, source_lang, target_lang, texts)
+    except mt.MTRateLimitExceeded as e:
+        return HttpResponse(jsonify({'msg': unicode(e)}), status=429,
+                            content_type="application/json")
+    except mt.MTError as e:
+        return HttpResponse(jsonify({'msg': unicode(e)}), status=502,
+                            content_type="application/json")
+
+    response = jsonify({'translations': translations})
+    return HttpResponse(response, content_type="application/json")
+
+
 @ajax_required
 @get_unit_context('translate')
 def submit(request, unit):
@@ -863,7 +1278,8 @@ def submit(request, unit):
                                                    unit.store.parent)
                 ctx = {
                     'canreview': can_review,
-                    'unit': unit
+                    'unit': unit,
+                    'checks': unit.get_qualitychecks(),
                 }
                 template = loader.get_template('editor/units/xhr_checks.html')
                 context = RequestContext(request, ctx)
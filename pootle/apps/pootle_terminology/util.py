@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2009-2011 Zuza Software Foundation
+# Copyright 2013-2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from django_rq import job
+from rq import get_current_job
+
+from pootle.core.models import Revision
+from pootle.core.tmserver import bulk_update as update_tmserver
+from pootle_misc.checks import get_translation_project_checker
+from pootle_statistics.models import (Submission, SubmissionFields,
+                                      SubmissionTypes)
+from pootle_store.models import (QualityCheck, Store, Suggestion,
+                                 SuggestionStates, Unit, PARSED, LOCKED,
+                                 count_words)
+from pootle_store.search import get_search_backend
+from pootle_store.util import FUZZY, TRANSLATED, UNTRANSLATED
+from pootle_translationproject.models import TranslationProject
+
+
+#: Cache key for the ID of the extraction job of a translation project
+EXTRACT_JOB_KEY = 'pootle:terminology:extract:%s'
+
+
+def create_termunit(term, unit, targets, locations, sourcenotes, transnotes,
+                    filecounts):
+    termunit = Unit()
+    termunit.source = term
+    termunit.setid(term)
+
+    if unit is not None:
+        termunit.merge(unit)
+
+    termunit.pending_suggestions = []
+
+    for target in targets.keys():
+        if target != termunit.target:
+            termunit.pending_suggestions.append(target)
+
+    for location in locations:
+        termunit.addlocation(location)
+
+    for sourcenote in sourcenotes:
+        termunit.addnote(sourcenote, "developer")
+
+    for filename, count in filecounts.iteritems():
+        termunit.addnote('(poterminology) %s (%d)\n' % (filename, count),
+                         'translator')
+
+    return termunit
+
+
+def get_terminology_filename(translation_project):
+    try:
+        # See if a terminology store already exists
+        return translation_project.stores.filter(
+            name__startswith='pootle-terminology.',
+        ).values_list('name', flat=True)[0]
+    except IndexError:
+        pass
+
+    return 'pootle-terminology.' + translation_project.project.localfiletype
+
+
+def set_progress(current_job, processed, total):
+    """Records the progress of `current_job`, if running as an RQ job."""
+    if current_job is not None:
+        current_job.meta['progress'] = {
+            'processed': processed,
+            'total': total,
+        }
+        current_job.save()
+
+
+def save_termunits(store, termunits):
+    """Inserts the extracted `termunits` into `store`, along with their
+    pending suggestions, using bulk inserts.
+
+    The fields `Unit.save()` would otherwise compute are set here, and its
+    side effects (initial submissions, quality checks, TM and search index
+    updates) are carried out in bulk as well.
+    """
+    User = get_user_model()
+    system = User.objects.get_system_user()
+    revision = Revision.incr()
+    now = timezone.now()
+
+    for index, unit in enumerate(termunits):
+        unit.store = store
+        unit.index = index
+        unit.source_hash = md5(unit.source_f.encode('utf-8')).hexdigest()
+        unit.source_length = len(unit.source_f)
+        unit.update_wordcount()
+        unit.target_wordcount = count_words(unit.target_f.strings)
+        unit.target_length = len(unit.target_f)
+        if not filter(None, unit.target_f.strings):
+            unit.state = UNTRANSLATED
+        elif unit.state == UNTRANSLATED:
+            unit.state = TRANSLATED
+        if unit.state == TRANSLATED:
+            unit.submitted_by = system
+            unit.submitted_on = now
+        unit.revision = revision
+        unit.has_pending_suggestion = bool(
+            [target for target in unit.pending_suggestions
+             if filter(None, target)]
+        )
+
+    Unit.objects.bulk_create(termunits)
+
+    # Primary keys aren't set by `bulk_create()` in every database
+    unit_ids = dict(store.unit_set.values_list('index', 'id'))
+    for unit in termunits:
+        unit.id = unit_ids[unit.index]
+
+    translation_project = store.translation_project
+    Submission.objects.bulk_create([
+        Submission(
+            creation_time=now,
+            translation_project=translation_project,
+            submitter=system,
+            unit_id=unit.id,
+            store=store,
+            type=SubmissionTypes.UNIT_CREATE,
+            field=SubmissionFields.TARGET,
+            new_value=unit.target,
+        )
+        for unit in termunits if unit.state in (FUZZY, TRANSLATED)
+    ])
+
+    # New units have no checks yet, so failing ones are just inserted
+    checker = get_translation_project_checker(translation_project)
+    checks = []
+    for unit in termunits:
+        if not unit.target:
+            continue
+
+        qc_failures = checker.run_filters(unit, categorised=True)
+        for name, failure in qc_failures.iteritems():
+            checks.append(QualityCheck(
+                unit_id=unit.id, name=name,
+                message=failure['message'],
+                category=failure['category'],
+            ))
+    if checks:
+        QualityCheck.objects.bulk_create(checks)
+        Unit.refresh_check_flags(set(check.unit_id for check in checks))
+
+    translated = [unit for unit in termunits if unit.state == TRANSLATED]
+    if translated:
+        update_tmserver(translation_project.language.code,
+                        [unit.get_tm_entry() for unit in translated])
+
+    suggestions = []
+    for unit in termunits:
+        for target in unit.pending_suggestions:
+            if not filter(None, target):
+                continue
+
+            suggestion = Suggestion(
+                unit_id=unit.id,
+                user=system,
+                state=SuggestionStates.PENDING,
+                creation_time=now,
+            )
+            suggestion.target = target
+            suggestions.append(suggestion)
+    Suggestion.objects.bulk_create(suggestions)
+
+    Submission.objects.bulk_create([
+        Submission(
+            creation_time=now,
+            translation_project=store.translation_project,
+            submitter=system,
+            unit_id=suggestion.unit_id,
+            store=store,
+            type=SubmissionTypes.SUGG_ADD,
+            suggestion=suggestion,
+        )
+        for suggestion in Suggestion.objects.filter(unit__store=store)
+    ])
+
+    get_search_backend().index(store.unit_set.all())
+
+
+@job('default', timeout=18000)
+def extract_terminology(tp_id):
+    """RQ job generating the glossary of common keywords and phrases of a
+    translation project.
+
+    Stores are processed one at a time, and the progress is kept in the
+    job's ``meta``.
+
+    :return: the number of extracted terms.
+    """
+    from translate.tools.poterminology import TerminologyExtractor
+
+    translation_project = TranslationProject.objects.get(id=tp_id)
+    current_job = get_current_job()
+
+    extractor = TerminologyExtractor(
+        accelchars=translation_project.checker.config.accelmarkers,
+        sourcelanguage=str(translation_project.project.source_language.code)
+    )
+
+    source_words = 0
+    stores = translation_project.stores.all()
+    total = stores.count()
+    for processed, store in enumerate(stores.iterator(), 1):
+        if not store.is_terminology:
+            extractor.processunits(store.units.iterator(), store.pootle_path)
+        source_words += store._get_total_wordcount()
+        set_progress(current_job, processed, total)
+
+    terms = extractor.extract_terms(create_termunit=create_termunit)
+    termunits = extractor.filter_terms(terms, nonstopmin=2)
+
+    # Calculate maximum terms
+    maxunits = int(source_words * 0.02)
+    maxunits = min(max(settings.MIN_AUTOTERMS, maxunits),
+                   settings.MAX_AUTOTERMS)
+
+    with transaction.atomic():
+        store, created = Store.objects.get_or_create(
+            parent=translation_project.directory,
+            translation_project=translation_project,
+            name=get_terminology_filename(translation_project),
+        )
+
+        # Lock file
+        oldstate = store.state
+        store.state = LOCKED
+        store.save()
+
+        if not created:
+            store.units.delete()
+
+        #FIXME: what to do with score?
+        save_termunits(store, [unit for score, unit in termunits[:maxunits]])
+
+        # Unlock file
+        store.state = oldstate
+        if store.state < PARSED:
+            store.state = PARSED
+        store.save()
+
+    store.update_all_cache()
+
+    return len(termunits)
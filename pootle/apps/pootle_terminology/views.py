@@ -19,65 +19,41 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
-from django.conf import settings
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
-from django.db import transaction
 from django.shortcuts import redirect, render
 
+from django_rq.queues import get_queue
+
 from pootle.core.decorators import get_path_obj, permission_required
 from pootle.core.url_helpers import split_pootle_path
 from pootle_app.views.admin import util
-from pootle_store.models import Store, Unit, PARSED, LOCKED
+from pootle_store.models import Store, Unit
 
 from .forms import term_unit_form_factory
+from .util import (EXTRACT_JOB_KEY, extract_terminology,
+                   get_terminology_filename)
 
 
-def create_termunit(term, unit, targets, locations, sourcenotes, transnotes,
-                    filecounts):
-    termunit = Unit()
-    termunit.source = term
-    termunit.setid(term)
-
-    if unit is not None:
-        termunit.merge(unit)
-
-    termunit.pending_suggestions = []
-
-    for target in targets.keys():
-        if target != termunit.target:
-            termunit.pending_suggestions.append(target)
-
-    for location in locations:
-        termunit.addlocation(location)
-
-    for sourcenote in sourcenotes:
-        termunit.addnote(sourcenote, "developer")
-
-    for filename, count in filecounts.iteritems():
-        termunit.addnote('(poterminology) %s (%d)\n' % (filename, count),
-                         'translator')
-
-    return termunit
-
-
-def get_terminology_filename(translation_project):
-    try:
-        # See if a terminology store already exists
-        return translation_project.stores.filter(
-            name__startswith='pootle-terminology.',
-        ).values_list('name', flat=True)[0]
-    except IndexError:
-        pass
+def get_extract_job(translation_project):
+    """Returns the terminology extraction job started for
+    `translation_project`, if any.
+    """
+    job_id = cache.get(EXTRACT_JOB_KEY % translation_project.pootle_path)
+    if job_id is None:
+        return None
 
-    return 'pootle-terminology.' + translation_project.project.localfiletype
+    return get_queue('default').fetch_job(job_id)
 
 
-@transaction.atomic
 @get_path_obj
 @permission_required('administrate')
 def extract(request, translation_project):
     """Generate glossary of common keywords and phrases from translation
     project.
+
+    Extraction runs as an RQ job: posting the form starts it, and the page
+    then reloads itself to report its progress until it's finished.
     """
     ctx = {
         'page': 'admin-terminology',
@@ -87,66 +63,27 @@ def extract(request, translation_project):
         'project': translation_project.project,
         'directory': translation_project.directory,
     }
-    terminology_filename = get_terminology_filename(translation_project)
-
-    if request.method == 'POST' and request.POST['extract']:
-        from translate.tools.poterminology import TerminologyExtractor
-        extractor = TerminologyExtractor(
-            accelchars=translation_project.checker.config.accelmarkers,
-            sourcelanguage=str(translation_project.project.source_language.code)
-        )
-
-        for store in translation_project.stores.iterator():
-            if store.is_terminology:
-                continue
-            extractor.processunits(store.units, store.pootle_path)
-
-        terms = extractor.extract_terms(create_termunit=create_termunit)
-        termunits = extractor.filter_terms(terms, nonstopmin=2)
+    path_args = split_pootle_path(translation_project.pootle_path)[:2]
+    job_key = EXTRACT_JOB_KEY % translation_project.pootle_path
+    job = get_extract_job(translation_project)
 
-        store, created = Store.objects.get_or_create(
-            parent=translation_project.directory,
-            translation_project=translation_project,
-            name=terminology_filename,
-        )
+    if job is not None and job.is_finished:
+        cache.delete(job_key)
+        return redirect(reverse('pootle-terminology-manage', args=path_args))
 
-        # Lock file
-        oldstate = store.state
-        store.state = LOCKED
-        store.save()
-
-        if not created:
-            store.units.delete()
-
-        # Calculate maximum terms
-        source_words = sum(store._get_total_wordcount()
-                           for store in translation_project.stores.iterator())
-        maxunits = int(source_words * 0.02)
-        maxunits = min(max(settings.MIN_AUTOTERMS, maxunits),
-                       settings.MAX_AUTOTERMS)
-        for index, (score, unit) in enumerate(termunits[:maxunits]):
-            unit.store = store
-            unit.index = index
-            #FIXME: what to do with score?
-            unit.save()
-            for suggestion in unit.pending_suggestions:
-                # Touch=True which saves unit on every call
-                unit.add_suggestion(suggestion)
-
-        # Unlock file
-        store.state = oldstate
-        if store.state < PARSED:
-            store.state = PARSED
-        store.save()
+    running = job is not None and not (job.is_finished or job.is_failed)
+    if request.method == 'POST' and request.POST['extract'] and not running:
+        job = extract_terminology.delay(translation_project.id)
+        cache.set(job_key, job.id, job.timeout)
+        return redirect(reverse('pootle-terminology-extract',
+                                args=path_args))
 
+    if job is not None:
         ctx.update({
-            'store': store,
-            'termcount': len(termunits),
+            'job_status': job.get_status(),
+            'job_progress': job.meta.get('progress'),
         })
 
-        path_args = split_pootle_path(translation_project.pootle_path)[:2]
-        return redirect(reverse('pootle-terminology-manage', args=path_args))
-
     return render(request, "translation_projects/terminology/extract.html", ctx)
 
 
@@ -43,7 +43,7 @@ from pootle_misc.checks import excluded_filters, ENChecker
 from pootle_project.models import Project
 from pootle_store.models import (Store, Unit, PARSED)
 from pootle_store.util import (absolute_real_path, relative_real_path,
-                               OBSOLETE)
+                               OBSOLETE, TRANSLATED)
 
 
 class TranslationProjectNonDBState(object):
@@ -216,8 +216,7 @@ class TranslationProject(models.Model, CachedTreeItem):
                 self._non_db_state = self._non_db_state_cache[self.id]
             except KeyError:
                 self._non_db_state = TranslationProjectNonDBState(self)
-                self._non_db_state_cache[self.id] = \
-                        TranslationProjectNonDBState(self)
+                self._non_db_state_cache[self.id] = self._non_db_state
 
         return self._non_db_state
 
@@ -421,9 +420,9 @@ class TranslationProject(models.Model, CachedTreeItem):
 
         if mtime != self.non_db_state.termmatchermtime:
             from pootle_misc.match import Matcher
-            self.non_db_state.termmatcher = Matcher(
-                    terminology_stores.iterator(),
-            )
+            terms = Unit.objects.filter(store__in=terminology_stores,
+                                        state=TRANSLATED)
+            self.non_db_state.termmatcher = Matcher(terms.iterator())
             self.non_db_state.termmatchermtime = mtime
 
         return self.non_db_state.termmatcher
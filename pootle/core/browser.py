@@ -19,8 +19,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.utils.http import urlquote
 from django.utils.translation import ugettext_lazy as _
 
+from translate.filters.decorators import Category
+
+from pootle.core.cache import get_or_compute, make_versioned_key
+from pootle.core.url_helpers import get_editor_filter, split_pootle_path
+from pootle_misc.checks import get_qualitychecks_by_category
+
+
+#: Cache family of the rows of the children of a directory, by its ID
+CHILDREN_NAMESPACE = 'browser:children:%s'
+
 
 HEADING_CHOICES = [
     {
@@ -166,17 +179,72 @@ def make_project_list_item(project):
     return item
 
 
+def get_url_prefixes(directory):
+    """Returns the prefixes of the URLs of the children of `directory`,
+    so URLs are reversed once for all of them.
+    """
+    lang, proj, dir_path, filename = split_pootle_path(directory.pootle_path)
+    return {
+        'browse': directory.get_absolute_url(),
+        'overview': reverse('pootle-tp-overview',
+                            args=[lang, proj, dir_path, '']),
+        'translate': reverse('pootle-tp-translate',
+                             args=[lang, proj, dir_path, '']),
+    }
+
+
+def make_child_item(child, prefixes, critical_filter, is_dir):
+    """Template variables for the row of a child directory or store, built
+    out of the URL `prefixes` of its parent.
+    """
+    if is_dir:
+        href = prefixes['browse'] + child.name + '/'
+        translate_url = prefixes['translate'] + urlquote(child.name) + '/'
+    else:
+        href = prefixes['overview'] + urlquote(child.name)
+        translate_url = prefixes['translate'] + urlquote(child.name)
+
+    return {
+        'href': href,
+        'href_all': translate_url,
+        'href_todo': translate_url + get_editor_filter(state='incomplete'),
+        'href_sugg': translate_url + get_editor_filter(state='suggestions'),
+        'href_critical': translate_url + critical_filter,
+        'title': child.name,
+        'code': child.code,
+        'is_disabled': False,
+        'icon': 'folder' if is_dir else 'file',
+    }
+
+
+def get_children_namespace(directory_id):
+    return CHILDREN_NAMESPACE % directory_id
+
+
 def get_children(directory):
     """Returns a list of children directories and stores for this
     ``directory``.
 
     The elements of the list are dictionaries which keys are populated after
-    in the templates.
+    in the templates. The list is cached until a child of ``directory`` is
+    saved or deleted.
     """
-    directories = [make_directory_item(child_dir)
-                   for child_dir in directory.child_dirs.iterator()]
+    def make_children():
+        prefixes = get_url_prefixes(directory)
+        critical = ','.join(get_qualitychecks_by_category(Category.CRITICAL))
+        critical_filter = get_editor_filter(check=critical)
+
+        directories = [
+            make_child_item(child_dir, prefixes, critical_filter, True)
+            for child_dir in directory.child_dirs.iterator()
+        ]
+
+        stores = [
+            make_child_item(child_store, prefixes, critical_filter, False)
+            for child_store in directory.child_stores.iterator()
+        ]
 
-    stores = [make_store_item(child_store)
-              for child_store in directory.child_stores.iterator()]
+        return directories + stores
 
-    return directories + stores
+    key = make_versioned_key(get_children_namespace(directory.id), 'rows')
+    return get_or_compute(key, make_children, settings.OBJECT_CACHE_TIMEOUT)
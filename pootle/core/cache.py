@@ -18,6 +18,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
+import threading
+import time
+from collections import OrderedDict
 
 from django.conf import settings
 from django.core.cache import caches, cache as default_cache
@@ -27,6 +30,24 @@ from django.core.exceptions import ImproperlyConfigured
 
 PERSISTENT_STORES = ('redis', 'stats')
 
+#: Seconds a lock for computing a cached value is held at most
+COMPUTE_LOCK_TIMEOUT = 30
+
+#: Seconds to wait for a value being computed by another process
+COMPUTE_WAIT_TIMEOUT = 5
+
+#: Seconds a process relies on the cache family versions it last read
+LOCAL_VERSION_TIMEOUT = 5
+
+#: Maximum number of values kept in process memory
+LOCAL_CACHE_SIZE = 1000
+
+
+_local_lock = threading.Lock()
+_local_versions = {}
+_local_cache = OrderedDict()
+_request_cache = threading.local()
+
 
 def make_method_key(model, method, key):
     """Creates a cache key for model's `method` method.
@@ -54,6 +75,200 @@ def make_key(*args, **kwargs):
     ])
 
 
+def get_cache_version(namespace):
+    """Returns the current version of the `namespace` cache family.
+
+    Versions start from the current time, so keys built while an evicted
+    version was current are never read again.
+    """
+    version_key = 'cache-version:%s' % namespace
+    version = default_cache.get(version_key)
+    if version is None:
+        default_cache.add(version_key, int(time.time() * 1000), None)
+        version = default_cache.get(version_key)
+
+    return version
+
+
+def get_local_version(namespace):
+    """Returns the version of the `namespace` cache family, read from the
+    cache at most once every ``LOCAL_VERSION_TIMEOUT`` seconds.
+
+    Other processes' invalidations are thus seen by this process with at
+    most that delay, while its own invalidations are seen at once.
+    """
+    now = time.time()
+    version, read_at = _local_versions.get(namespace, (None, 0))
+    if now - read_at > LOCAL_VERSION_TIMEOUT:
+        version = get_cache_version(namespace)
+        _local_versions[namespace] = (version, now)
+
+    return version
+
+
+def bump_cache_version(namespace):
+    """Invalidates all the keys of the `namespace` cache family at once."""
+    version_key = 'cache-version:%s' % namespace
+    try:
+        default_cache.incr(version_key)
+    except ValueError:
+        default_cache.set(version_key, int(time.time() * 1000), None)
+    _local_versions.pop(namespace, None)
+
+    values = getattr(_request_cache, 'values', None)
+    if values is not None:
+        values.clear()
+
+
+def make_versioned_key(namespace, key):
+    """Creates a cache key for `key` in the `namespace` cache family, which
+    is invalidated by :func:`bump_cache_version`.
+    """
+    return u'%s:%d:%s' % (namespace, get_local_version(namespace), key)
+
+
+def get_lock_key(key):
+    return u'lock:%s' % key
+
+
+def acquire_lock(key, timeout=COMPUTE_LOCK_TIMEOUT, cache=None):
+    """Tries to take the short-lived lock of `key`.
+
+    :return: `True` if the lock was free and is now held by the caller.
+    """
+    cache = cache or default_cache
+    return cache.add(get_lock_key(key), 1, timeout)
+
+
+def release_lock(key, cache=None):
+    cache = cache or default_cache
+    cache.delete(get_lock_key(key))
+
+
+def get_entry(key, cache=None):
+    """Returns the `(value, stale_at)` entry cached under `key`.
+
+    Values stored under `key` some other way (e.g. before it was handled
+    by :func:`get_or_compute`) are treated as missing.
+    """
+    cache = cache or default_cache
+
+    entry = cache.get(key)
+    if (isinstance(entry, tuple) and len(entry) == 2 and
+        (entry[1] is None or isinstance(entry[1], float))):
+        return entry
+
+    return None
+
+
+def get_or_compute(key, compute, timeout, cache=None, stale_timeout=None,
+                   lock_timeout=COMPUTE_LOCK_TIMEOUT):
+    """Returns the value cached under `key`, calling `compute()` to set it
+    when it is missing or older than `timeout` seconds.
+
+    Only the process holding the lock of `key` calls `compute()`. While
+    it does, other processes get the stale value, which is kept for
+    `stale_timeout` more seconds (`timeout` by default), or wait for the
+    new value if there is none.
+    """
+    cache = cache or default_cache
+
+    entry = get_entry(key, cache=cache)
+    if entry is not None:
+        value, stale_at = entry
+        if stale_at is None or time.time() < stale_at:
+            return value
+
+        if not acquire_lock(key, lock_timeout, cache=cache):
+            return value
+
+        locked = True
+    else:
+        locked = acquire_lock(key, lock_timeout, cache=cache)
+        if not locked:
+            deadline = time.time() + COMPUTE_WAIT_TIMEOUT
+            while time.time() < deadline:
+                time.sleep(0.05)
+                entry = get_entry(key, cache=cache)
+                if entry is not None:
+                    return entry[0]
+
+    try:
+        value = compute()
+        if timeout is None:
+            cache.set(key, (value, None), None)
+        else:
+            if stale_timeout is None:
+                stale_timeout = timeout
+            cache.set(key, (value, time.time() + timeout),
+                      timeout + stale_timeout)
+    finally:
+        if locked:
+            release_lock(key, cache=cache)
+
+    return value
+
+
+def get_local_or_compute(namespace, key, compute, timeout):
+    """Returns the value of `key` in the `namespace` cache family, from
+    process memory when possible.
+
+    Values missing from process memory are read from the cache, and
+    computed with :func:`get_or_compute` when missing there too. Values
+    are told apart by the version of their family, so process memory
+    only needs a size bound, and least recently used values are evicted
+    first.
+    """
+    versioned_key = make_versioned_key(namespace, key)
+    with _local_lock:
+        if versioned_key in _local_cache:
+            value = _local_cache.pop(versioned_key)
+            _local_cache[versioned_key] = value
+            return value
+
+    value = get_or_compute(versioned_key, compute, timeout)
+
+    with _local_lock:
+        _local_cache[versioned_key] = value
+        while len(_local_cache) > LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+    return value
+
+
+def start_request_cache():
+    """Starts memoizing values for the request handled by the current
+    thread.
+    """
+    _request_cache.values = {}
+
+
+def clear_request_cache():
+    """Discards the values memoized for the request handled by the
+    current thread, and stops memoizing them.
+    """
+    _request_cache.values = None
+
+
+def get_request_or_compute(key, compute):
+    """Returns the value of `key` for the current request, computed with
+    `compute` only the first time it is needed.
+
+    Values are only memoized within requests handled by
+    :cls:`pootle.middleware.cache.RequestCache`, and any invalidation made
+    with :func:`bump_cache_version` discards them. Elsewhere, e.g. in
+    management commands and jobs, they are always computed.
+    """
+    values = getattr(_request_cache, 'values', None)
+    if values is None:
+        return compute()
+
+    if key not in values:
+        values[key] = compute()
+
+    return values[key]
+
+
 def get_cache(cache=None):
     """Return ``cache`` or the 'default' cache if ``cache`` is not specified or
     ``cache`` is not configured.
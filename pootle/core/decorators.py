@@ -24,7 +24,6 @@ from functools import wraps
 from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
-from django.db import connection
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.utils.translation import ugettext as _
@@ -144,10 +143,7 @@ def set_resource(request, path_obj, dir_path, filename):
         resource_path = resource_path + filename
 
         try:
-            store = Store.objects.select_related(
-                'translation_project',
-                'parent',
-            ).get(pootle_path=pootle_path)
+            store = Store.objects.get_by_path(pootle_path)
             directory = store.parent
         except Store.DoesNotExist:
             is_404 = True
@@ -155,7 +151,7 @@ def set_resource(request, path_obj, dir_path, filename):
     if directory is None and not is_404:
         if dir_path:
             try:
-                directory = Directory.objects.get(pootle_path=pootle_path)
+                directory = Directory.objects.get_by_path(pootle_path)
             except Directory.DoesNotExist:
                 is_404 = True
         else:
@@ -194,42 +190,34 @@ def set_project_resource(request, path_obj, dir_path, filename):
     :param dir_path: Path relative to the root of `path_obj`.
     :param filename: Optional filename.
     """
-    query_ctx_path = ''.join(['/%/', path_obj.code, '/'])
-    query_pootle_path = query_ctx_path + dir_path
-
     obj_directory = getattr(path_obj, 'directory', path_obj)
     ctx_path = obj_directory.pootle_path
     resource_path = dir_path
     pootle_path = ctx_path + dir_path
 
-    # List of disabled TP paths
-    disabled_tps = TranslationProject.objects.disabled().filter(
+    # Languages of disabled TPs
+    disabled_languages = TranslationProject.objects.disabled().filter(
         project__code=path_obj.code,
-    ).values_list('pootle_path', flat=True)
-    disabled_tps = list(disabled_tps)
-    disabled_tps.append('/templates/')
-    disabled_tps_regex = '^%s' % u'|'.join(disabled_tps)
-    sql_not_regex = 'NOT REGEXP'
-    if connection.vendor == 'postgresql':
-        sql_not_regex = '!~'
+    ).values_list('language__code', flat=True)
+    disabled_languages = list(disabled_languages)
+    disabled_languages.append('templates')
 
     if filename:
-        query_pootle_path = query_pootle_path + filename
         pootle_path = pootle_path + filename
         resource_path = resource_path + filename
 
-        resources = Store.objects.extra(
-            where=[
-                'pootle_store_store.pootle_path LIKE %s',
-                'pootle_store_store.pootle_path ' + sql_not_regex + ' %s',
-            ], params=[query_pootle_path, disabled_tps_regex]
+        resources = Store.objects.filter(
+            project_code=path_obj.code,
+            tp_path=resource_path,
+        ).exclude(
+            language_code__in=disabled_languages,
         ).select_related('translation_project__language')
     else:
-        resources = Directory.objects.extra(
-            where=[
-                'pootle_app_directory.pootle_path LIKE %s',
-                'pootle_app_directory.pootle_path ' + sql_not_regex + ' %s',
-            ], params=[query_pootle_path, disabled_tps_regex]
+        resources = Directory.objects.filter(
+            project_code=path_obj.code,
+            tp_path=resource_path,
+        ).exclude(
+            language_code__in=disabled_languages,
         ).select_related('parent')
 
     if not resources.exists():
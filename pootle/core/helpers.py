@@ -108,7 +108,9 @@ def get_translation_context(request, is_terminology=False):
 
         'previous_url': get_previous_url(request),
 
-        'MT_BACKENDS': settings.MT_BACKENDS,
+        # API keys stay on the server, which sends the MT requests
+        'MT_BACKENDS': [backend for backend, api_key
+                        in settings.MT_BACKENDS],
         'AMAGAMA_URL': settings.AMAGAMA_URL,
     }
 
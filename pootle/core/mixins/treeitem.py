@@ -36,7 +36,7 @@ from django.utils.encoding import force_unicode, iri_to_uri
 from django_rq import job
 from django_rq.queues import get_connection
 
-from pootle.core.cache import get_cache
+from pootle.core.cache import acquire_lock, get_cache
 from pootle.core.log import log
 from pootle.core.url_helpers import get_all_pootle_paths, split_pootle_path
 from pootle_misc.checks import get_qualitychecks_by_category
@@ -45,6 +45,8 @@ from pootle_misc.util import datetime_min, dictsum
 
 POOTLE_DIRTY_TREEITEMS = 'pootle:dirty:treeitems'
 POOTLE_REFRESH_STATS = 'pootle:refresh:stats'
+POOTLE_STATS_VERSION = 'pootle:stats:version'
+POOTLE_ITEM_STATS_VERSION = 'pootle:stats:version:%s'
 
 
 logger = logging.getLogger('stats')
@@ -63,6 +65,23 @@ def statslog(function):
     return _statslog
 
 
+def get_stats_version():
+    """Returns the version of cached stats, which changes whenever stats
+    are recalculated or cleared in bulk rather than as a result of
+    unit changes.
+
+    See :meth:`CachedTreeItem.get_cached_version` for the version of the
+    stats of a single item.
+    """
+    r_con = get_connection()
+    return int(r_con.get(POOTLE_STATS_VERSION) or 0)
+
+
+def bump_stats_version():
+    r_con = get_connection()
+    r_con.incr(POOTLE_STATS_VERSION)
+
+
 class CachedMethods(object):
     """Cached method names."""
     CHECKS = 'get_checks'
@@ -82,6 +101,18 @@ class CachedMethods(object):
                 filter(lambda x: x[:2] != '__' and x != 'get_all', dir(self))]
 
 
+#: Cached methods the stats of an item are built from
+STATS_METHODS = (
+    CachedMethods.TOTAL,
+    CachedMethods.TRANSLATED,
+    CachedMethods.FUZZY,
+    CachedMethods.SUGGESTIONS,
+    CachedMethods.LAST_ACTION,
+    CachedMethods.CHECKS,
+    CachedMethods.LAST_UPDATED,
+)
+
+
 class TreeItem(object):
     def __init__(self, *args, **kwargs):
         self._children = None
@@ -283,45 +314,84 @@ class CachedTreeItem(TreeItem):
         """calculate stat value and update cached value"""
         self.set_cached_value(name, self._calc(name, from_update=True))
 
+        r_con = get_connection()
+        r_con.incr(iri_to_uri(POOTLE_ITEM_STATS_VERSION % self.get_cachekey()))
+
+    def get_cached_version(self):
+        """Returns the version of the cached stats of this item, which
+        changes every time any of them is recalculated.
+        """
+        r_con = get_connection()
+        key = iri_to_uri(POOTLE_ITEM_STATS_VERSION % self.get_cachekey())
+        return int(r_con.get(key) or 0)
+
     def get_cached(self, name, from_update=False):
         """get stat value from cache"""
         result = self.get_cached_value(name)
         if result is None:
-            logger.error(
-                "cache miss %s for %s(%s)" % (name,
-                                              self.get_cachekey(),
-                                              self.__class__),
-            )
-            if not from_update or settings.DEBUG:
-                # get initial (empty, zero) value
-                result = getattr(CachedTreeItem, '_%s' % name)()
+            result = self.get_missing(name, from_update)
 
         return result
 
+    def get_missing(self, name, from_update=False):
+        """get the value of a stat missing from cache"""
+        logger.error(
+            "cache miss %s for %s(%s)" % (name,
+                                          self.get_cachekey(),
+                                          self.__class__),
+        )
+        if not from_update:
+            self.refresh_missing(name)
+        if not from_update or settings.DEBUG:
+            # get initial (empty, zero) value
+            return getattr(CachedTreeItem, '_%s' % name)()
+
+        return None
+
+    def refresh_missing(self, name):
+        """Add a RQ job which recalculates the missing `name` stat, unless
+        another request already did it while the job is pending
+        """
+        key = iri_to_uri(self.get_cachekey() + ":" + name)
+        if acquire_lock(key, cache=cache):
+            self.register_all_dirty()
+            update_cache.delay(self, [name])
+
     def get_checks(self):
         return self.get_cached(CachedMethods.CHECKS)['checks']
 
+    def make_stats(self, values):
+        """build stats out of the `values` of cached methods"""
+        return {
+            'total': values[CachedMethods.TOTAL],
+            'translated': values[CachedMethods.TRANSLATED],
+            'fuzzy': values[CachedMethods.FUZZY],
+            'suggestions': values[CachedMethods.SUGGESTIONS],
+            'lastaction': values[CachedMethods.LAST_ACTION],
+            'critical': values[CachedMethods.CHECKS].get(
+                'unit_critical_error_count', 0),
+            'lastupdated': values[CachedMethods.LAST_UPDATED],
+            'is_dirty': self.is_dirty(),
+        }
+
     def get_stats(self, include_children=True):
         """get stats for self and - optionally - for children"""
         self.initialize_children()
 
-        result = {
-            'total': self.get_cached(CachedMethods.TOTAL),
-            'translated': self.get_cached(CachedMethods.TRANSLATED),
-            'fuzzy': self.get_cached(CachedMethods.FUZZY),
-            'suggestions': self.get_cached(CachedMethods.SUGGESTIONS),
-            'lastaction': self.get_cached(CachedMethods.LAST_ACTION),
-            'critical': self.get_error_unit_count(),
-            'lastupdated': self.get_cached(CachedMethods.LAST_UPDATED),
-            'is_dirty': self.is_dirty(),
-        }
+        items = [self]
+        if include_children:
+            items.extend(self.children)
+
+        # Read the stats of all items from cache at once
+        values = get_cached_many(items, STATS_METHODS)
+        result = self.make_stats(values[0])
 
         if include_children:
             result['children'] = {}
-            for item in self.children:
+            for item, item_values in zip(self.children, values[1:]):
                 code = (self._get_code(item) if hasattr(self, '_get_code')
                                              else item.code)
-                result['children'][code] = item.get_stats(False)
+                result['children'][code] = item.make_stats(item_values)
 
         return result
 
@@ -340,6 +410,8 @@ class CachedTreeItem(TreeItem):
         for name in cached_methods:
             self.update_cached(name)
 
+        bump_stats_version()
+
     def get_error_unit_count(self):
         check_stats = self.get_cached(CachedMethods.CHECKS)
 
@@ -386,6 +458,7 @@ class CachedTreeItem(TreeItem):
         all_cache_methods = CachedMethods.get_all()
         self.mark_dirty(*all_cache_methods)
         self.clear_dirty_cache(children=children, parents=parents)
+        bump_stats_version()
 
     ################ Update stats in Redis Queue Worker process ###############
 
@@ -484,6 +557,27 @@ class CachedTreeItem(TreeItem):
         for method_name in CachedMethods.get_all():
             method = getattr(CachedTreeItem, '_%s' % method_name)
             self.set_cached_value(method_name, method())
+        bump_stats_version()
+
+
+def get_cached_many(items, names):
+    """Returns the values of the cached methods in `names` for each of
+    `items`, read from cache in a single request.
+    """
+    keys = [[iri_to_uri(item.get_cachekey() + ":" + name) for name in names]
+            for item in items]
+    cached = cache.get_many([key for item_keys in keys for key in item_keys])
+
+    result = []
+    for item, item_keys in zip(items, keys):
+        values = {}
+        for name, key in zip(names, item_keys):
+            values[name] = cached.get(key)
+            if values[name] is None:
+                values[name] = item.get_missing(name)
+        result.append(values)
+
+    return result
 
 
 @job
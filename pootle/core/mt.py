@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Server-side proxy for the machine translation services set in the
+``MT_BACKENDS`` setting.
+
+Translations are kept in the persistent cache, so every source text is
+sent to a service only once per language pair, and requests sent to
+each service are rate limited.
+"""
+
+import json
+import time
+import urllib
+import urllib2
+from hashlib import md5
+
+from django.conf import settings
+
+from pootle.core.cache import get_cache
+from pootle_misc.util import import_func
+
+
+cache = get_cache('redis')
+
+
+#: Backend classes for the service names used in ``MT_BACKENDS``
+MT_BACKEND_CLASSES = {
+    'APERTIUM': 'pootle.core.mt.ApertiumBackend',
+    'GOOGLE_TRANSLATE': 'pootle.core.mt.GoogleTranslateBackend',
+    'STUB': 'pootle.core.mt.StubBackend',
+}
+
+
+class MTError(Exception):
+    pass
+
+
+class MTRateLimitExceeded(MTError):
+    pass
+
+
+class BaseMTBackend(object):
+    """Base class for MT services, which must implement `translate()`."""
+
+    #: Maximum number of texts sent to the service in a single request
+    batch_size = 1
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def translate(self, source_lang, target_lang, texts):
+        """Returns the list of translations of `texts`.
+
+        :raise MTError: if the service fails.
+        """
+        raise NotImplementedError
+
+    def get_json(self, url, params):
+        url = '%s?%s' % (url, urllib.urlencode(params, doseq=True))
+        try:
+            return json.load(urllib2.urlopen(url, timeout=10))
+        except (urllib2.URLError, ValueError) as e:
+            raise MTError(unicode(e))
+
+
+class StubBackend(BaseMTBackend):
+    """Local service prefixing texts with the target language, meant for
+    tests and development.
+    """
+
+    batch_size = 100
+
+    def translate(self, source_lang, target_lang, texts):
+        return [u'[%s] %s' % (target_lang, text) for text in texts]
+
+
+class GoogleTranslateBackend(BaseMTBackend):
+    """Google Translate API v2."""
+
+    url = 'https://www.googleapis.com/language/translate/v2'
+    batch_size = 100
+
+    def translate(self, source_lang, target_lang, texts):
+        response = self.get_json(self.url, {
+            'key': self.api_key,
+            'source': source_lang,
+            'target': target_lang,
+            'q': [text.encode('utf-8') for text in texts],
+        })
+
+        try:
+            return [item['translatedText']
+                    for item in response['data']['translations']]
+        except (KeyError, TypeError):
+            message = response.get('error', {}).get('message',
+                                                    'Malformed response')
+            raise MTError(message)
+
+
+class ApertiumBackend(BaseMTBackend):
+    """Apertium JSON API."""
+
+    url = 'http://api.apertium.org/json/translate'
+
+    def translate(self, source_lang, target_lang, texts):
+        params = {
+            'q': texts[0].encode('utf-8'),
+            'langpair': '%s|%s' % (source_lang, target_lang),
+        }
+        if self.api_key:
+            params['key'] = self.api_key
+
+        response = self.get_json(self.url, params)
+        if response.get('responseStatus') != 200:
+            raise MTError(response.get('responseDetails',
+                                       'Malformed response'))
+
+        return [response['responseData']['translatedText']]
+
+
+_backends = {}
+
+
+def get_backend(name):
+    """Returns the backend for the `name` MT service, or `None` if it isn't
+    enabled in the ``MT_BACKENDS`` setting.
+    """
+    if name not in _backends:
+        for backend_name, api_key in settings.MT_BACKENDS:
+            if backend_name == name and name in MT_BACKEND_CLASSES:
+                backend_class = import_func(MT_BACKEND_CLASSES[name])
+                _backends[name] = backend_class(api_key)
+                break
+        else:
+            return None
+
+    return _backends[name]
+
+
+def get_cache_key(name, source_lang, target_lang, text):
+    return 'pootle:mt:%s:%s:%s:%s' % (name, source_lang, target_lang,
+                                      md5(text.encode('utf-8')).hexdigest())
+
+
+def check_rate_limit(name):
+    """Counts a request sent to the `name` MT service.
+
+    :raise MTRateLimitExceeded: if more than ``MT_RATE_LIMIT`` requests
+        have been sent to it in the current minute.
+    """
+    limit = getattr(settings, 'MT_RATE_LIMIT', 0)
+    if not limit:
+        return
+
+    key = 'pootle:mt:rate:%s:%d' % (name, time.time() // 60)
+    cache.add(key, 0, 60)
+    if cache.incr(key) > limit:
+        raise MTRateLimitExceeded(u'Too many requests to %s' % name)
+
+
+def translate(name, source_lang, target_lang, texts):
+    """Returns the list of translations of `texts` by the `name` MT
+    service.
+
+    Only texts missing from the cache are sent to the service, in batches.
+
+    :raise MTError: if the service fails or its rate limit is exceeded.
+    """
+    backend = get_backend(name)
+    keys = dict((text, get_cache_key(name, source_lang, target_lang, text))
+                for text in texts)
+    cached = cache.get_many(keys.values())
+    translations = dict((text, cached[key]) for text, key in keys.iteritems()
+                        if key in cached)
+
+    missing = [text for text in keys if text not in translations]
+    for i in xrange(0, len(missing), backend.batch_size):
+        batch = missing[i:i + backend.batch_size]
+        check_rate_limit(name)
+        batch_translations = backend.translate(source_lang, target_lang,
+                                               batch)
+        if len(batch_translations) != len(batch):
+            raise MTError(u'%s returned %d translations for %d texts' %
+                          (name, len(batch_translations), len(batch)))
+        translations.update(zip(batch, batch_translations))
+        cache.set_many(dict((keys[text], translation) for text, translation
+                            in zip(batch, batch_translations)), None)
+
+    return [translations[text] for text in texts]
@@ -18,7 +18,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
 from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 
 def paginate(request, queryset, items=30, page=None):
@@ -34,3 +41,232 @@ def paginate(request, queryset, items=30, page=None):
     page = min(page, paginator.num_pages)
 
     return paginator.page(page)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'datetime': value.isoformat()}
+    raise TypeError(repr(value))
+
+
+def _decode_value(obj):
+    if 'datetime' in obj:
+        value = parse_datetime(obj['datetime'])
+        if value is not None:
+            return value
+    return obj
+
+
+def encode_cursor(value):
+    """Serializes `value` into an opaque, URL-safe cursor string."""
+    return urlsafe_b64encode(json.dumps(value, separators=(',', ':'),
+                                        default=_encode_value))
+
+
+def decode_cursor(cursor):
+    """Reverses :func:`encode_cursor`.
+
+    :raise InvalidCursor: if `cursor` was not produced by
+        :func:`encode_cursor`.
+    """
+    try:
+        return json.loads(urlsafe_b64decode(str(cursor)),
+                          object_hook=_decode_value)
+    except (TypeError, ValueError, UnicodeEncodeError):
+        raise InvalidCursor(cursor)
+
+
+def delta_encode(ids):
+    """Encodes a list of integer `ids` as a comma-separated string of
+    differences between consecutive ids.
+
+    Ids of nearby rows are usually close to each other, so this is much
+    more compact than the plain list.
+    """
+    deltas = []
+    previous = 0
+    for id in ids:
+        deltas.append(str(id - previous))
+        previous = id
+
+    return ','.join(deltas)
+
+
+def delta_decode(string):
+    """Reverses :func:`delta_encode`."""
+    ids = []
+    previous = 0
+    for delta in filter(None, string.split(',')):
+        previous += int(delta)
+        ids.append(previous)
+
+    return ids
+
+
+class Window(object):
+    """A window of primary keys, along with the cursors pointing to the
+    windows right before and after it (`None` if there are no more rows).
+
+    `offset` is the position of the first row of the window in the whole
+    result set, when known.
+    """
+
+    def __init__(self, ids, before=None, after=None, offset=None):
+        self.ids = ids
+        self.before = before
+        self.after = after
+        self.offset = offset
+
+
+class CursorPaginator(object):
+    """Splits the rows of `queryset` in windows navigated with cursors.
+
+    `keys` must list fields which, in order, sort and uniquely identify
+    the rows of `queryset`, the last one being the primary key. Fields
+    prefixed with ``-`` sort in descending order, and they may be
+    nullable or annotated. Cursors hold the keys of the boundary rows, so
+    any window is retrieved with bounded queries, no matter how deep in
+    the result set it is.
+    """
+
+    def __init__(self, queryset, keys):
+        self.queryset = queryset
+        self.keys = keys
+        self.fields = [key.lstrip('-') for key in keys]
+
+    def first(self, size):
+        rows = list(self._ordered()[:size + 1])
+        return self._key_window(rows[:size], False, len(rows) > size, 0)
+
+    def after(self, cursor, size):
+        key = self._decode(cursor)
+        rows = list(self._ordered(key, after=True)[:size + 1])
+        return self._key_window(rows[:size], True, len(rows) > size)
+
+    def before(self, cursor, size):
+        key = self._decode(cursor)
+        rows = self._rows_before(key, size + 1)
+        return self._key_window(rows[-size:], len(rows) > size, True)
+
+    def around(self, pk, size):
+        """Returns the window with up to `size` rows before the row with
+        `pk` primary key, that row, and up to `size` rows after it.
+
+        :raise ObjectDoesNotExist: if there's no such row in the queryset.
+        """
+        try:
+            key = self._values(self.queryset.filter(pk=pk))[0]
+        except IndexError:
+            raise self.queryset.model.DoesNotExist
+
+        before = self._rows_before(key, size + 1)
+        after = list(self._ordered(key, after=True)[:size + 1])
+        rows = before[-size:] + [key] + after[:size]
+        offset = self._ordered(key, after=False).count() - len(before[-size:])
+        return self._key_window(rows, len(before) > size, len(after) > size,
+                                offset)
+
+    def at(self, offset, size):
+        """Returns the window with up to `size` rows before the row at
+        `offset` position, that row, and up to `size` rows after it.
+        """
+        start = max(offset - size, 0)
+        rows = list(self._ordered()[start:offset + size + 2])
+        end = offset + size + 1 - start
+        return self._key_window(rows[:end], start > 0, len(rows) > end, start)
+
+    def count(self):
+        return self.queryset.count()
+
+    def _decode(self, cursor):
+        value = decode_cursor(cursor)
+        try:
+            key = value['key']
+            if len(key) == len(self.keys):
+                return key
+        except (TypeError, KeyError):
+            pass
+
+        raise InvalidCursor(cursor)
+
+    def _values(self, queryset):
+        return queryset.values_list(*self.fields)
+
+    def _ordered(self, key=None, after=True):
+        """Returns the keys of rows in order, optionally only those sorted
+        after (or before, when `after` is false) the row with `key` keys.
+        Rows before are returned in reverse order.
+        """
+        queryset = self.queryset
+        if key is not None:
+            condition = None
+            for i, field in enumerate(self.keys):
+                term = self._follows(field, key[i], after)
+                if term is None:
+                    continue
+                for previous, value in zip(self.keys[:i], key[:i]):
+                    term &= self._equals(previous, value)
+                condition = term if condition is None else condition | term
+
+            if condition is None:
+                return self._values(queryset.none())
+            queryset = queryset.filter(condition)
+
+        if after:
+            ordering = self.keys
+        else:
+            ordering = [key[1:] if key.startswith('-') else '-' + key
+                        for key in self.keys]
+
+        return self._values(queryset.order_by(*ordering))
+
+    def _equals(self, key, value):
+        if value is None:
+            return Q(**{key.lstrip('-') + '__isnull': True})
+        return Q(**{key.lstrip('-'): value})
+
+    def _follows(self, key, value, after):
+        """Returns the condition of rows sorted strictly after (or before)
+        `value` by the `key` field, or `None` if there can be none.
+        """
+        field = key.lstrip('-')
+        greater = key.startswith('-') != after
+        # Where `NULL` values go depends on the database
+        nulls_last = (connection.features.nulls_order_largest !=
+                      key.startswith('-'))
+        nulls_follow = nulls_last == after
+
+        if value is None:
+            if nulls_follow:
+                return None
+            return Q(**{field + '__isnull': False})
+
+        term = Q(**{field + ('__gt' if greater else '__lt'): value})
+        if nulls_follow:
+            term |= Q(**{field + '__isnull': True})
+        return term
+
+    def _rows_before(self, key, count):
+        rows = list(self._ordered(key, after=False)[:count])
+        rows.reverse()
+        return rows
+
+    def _key_window(self, rows, has_before, has_after, offset=None):
+        window = Window([row[-1] for row in rows], offset=offset)
+        if rows and has_before:
+            window.before = encode_cursor({'key': list(rows[0])})
+        if rows and has_after:
+            window.after = encode_cursor({'key': list(rows[-1])})
+        return window
+
+
+def get_row_id(row):
+    """Returns the primary key of a `values()` or flat `values_list()`
+    queryset `row`."""
+    if isinstance(row, dict):
+        return row['id']
+    return row
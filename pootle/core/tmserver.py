@@ -19,12 +19,42 @@
 # along with translate; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+"""Translation memory servers.
+
+The server is set by the ``ENGINE`` parameter of ``POOTLE_TM_SERVER``,
+which defaults to the Elasticsearch backend.
+"""
+
+import time
+import unicodedata
+from hashlib import md5
+
 try:
     from elasticsearch import Elasticsearch as ES
+    from elasticsearch.helpers import bulk
 except:
     ES = None
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+
+from translate.search.lshtein import distance
+
+from pootle_misc.util import import_func
+
+
+#: Cache key for the revision of the TM entries of a language, along with
+#: the time it was bumped
+TM_REVISION_KEY = 'pootle:tmserver:revision:%s'
+
+#: Cache key for the time the TM entries of a language last changed
+TM_CHANGED_KEY = 'pootle:tmserver:changed:%s'
+
+#: Minimum seconds between bumps of the revision of a language, unless set
+#: by the ``REVISION_INTERVAL`` parameter of the server
+TM_REVISION_INTERVAL = 10
 
 
 def get_params():
@@ -36,60 +66,510 @@ def get_params():
     return None
 
 
-es_params = get_params()
-# TODO support ENGINE param
-# Elasticsearch is the only supported engine now
-es = None
-if es_params is not None and ES is not None:
-    es = ES([{'host': es_params['HOST'], 'port': es_params['PORT']}, ])
-    if not es.indices.exists(es_params['INDEX_NAME']):
-        es.indices.create(es_params['INDEX_NAME'])
+def get_results(hits):
+    """Builds TM suggestions out of `hits`, the matching TM entries sorted
+    by relevance.
+
+    Hits with the same target are merged into the most relevant one,
+    which counts them.
+    """
+    counter = {}
+    res = []
+
+    for hit in hits:
+        if hit['target'] not in counter:
+            counter[hit['target']] = 1
+            res.append({
+                'unit_id': hit['unit_id'],
+                'source': hit['source'],
+                'target': hit['target'],
+                'project': hit['project'],
+                'path': hit['path'],
+                'username': hit['username'],
+                'fullname': hit['fullname'],
+                'email_md5': hit['email_md5'],
+            })
+        else:
+            counter[hit['target']] += 1
+
+    for item in res:
+        item['count'] = counter[item['target']]
+
+    return res
+
+
+def get_unit_results(unit, hits):
+    """Builds TM suggestions for `unit` out of `hits`, leaving out its own
+    translation.
+    """
+    return get_results([hit for hit in hits if hit['unit_id'] != unit.id])
+
+
+def normalize_source(source):
+    return unicodedata.normalize('NFC', unicode(source))
+
+
+def get_revision_interval():
+    return get_params().get('REVISION_INTERVAL', TM_REVISION_INTERVAL)
+
+
+def get_tm_revision(language):
+    """Returns the revision of the TM entries of `language`.
+
+    The revision is bumped when the entries changed since its last bump,
+    but at most once every ``REVISION_INTERVAL`` seconds, so cached hits
+    can be reused while translators are saving translations. Changes
+    made meanwhile are picked up once the interval is over.
+    """
+    revision_key = TM_REVISION_KEY % language
+    changed_key = TM_CHANGED_KEY % language
+    values = cache.get_many([revision_key, changed_key])
+    now = time.time()
+
+    if isinstance(values.get(revision_key), tuple):
+        revision, bumped_at = values[revision_key]
+    else:
+        # Don't reuse the revisions of hits which may still be cached
+        revision, bumped_at = int(now), 0
+        cache.set(revision_key, (revision, bumped_at), None)
+
+    changed_at = values.get(changed_key, 0)
+    if changed_at > bumped_at and now - bumped_at >= get_revision_interval():
+        revision += 1
+        cache.set(revision_key, (revision, now), None)
+
+    return revision
+
+
+def bump_tm_revision(language):
+    """Invalidates the cached TM hits for `language`, right away unless the
+    revision was bumped less than ``REVISION_INTERVAL`` seconds ago.
+    """
+    cache.set(TM_CHANGED_KEY % language, time.time(), None)
+    get_tm_revision(language)
+
+
+def get_results_cache_key(unit, source, revision):
+    """Returns the key for the cached TM hits of `source`, when translated
+    into the language of `unit` as of the TM `revision` of that language.
+    """
+    tp = unit.store.translation_project
+    return 'pootle:tmserver:hits:%s:%s:%d:%s' % (
+        tp.project.source_language.code, tp.language.code, revision,
+        md5(source.encode('utf-8')).hexdigest(),
+    )
+
+
+class BaseTMBackend(object):
+    """Base class for TM servers, which must implement `get_hits()`."""
+
+    def get_hits(self, language, source):
+        """Returns the TM entries of `language` matching `source`, as dicts
+        sorted by relevance, or `None` if the server is unavailable.
+        """
+        raise NotImplementedError
+
+    def get_many_hits(self, language, sources):
+        """Returns a dictionary mapping each of `sources` to its TM entries
+        in `language`, as returned by `get_hits()`.
+        """
+        return dict((source, self.get_hits(language, source))
+                    for source in sources)
+
+
+class ElasticSearchBackend(BaseTMBackend):
+    """Stores translations in an Elasticsearch index."""
+
+    def __init__(self, params):
+        self.params = params
+        self.es = None
+
+        if ES is not None:
+            self.es = ES([{'host': params['HOST'], 'port': params['PORT']}, ])
+            if not self.es.indices.exists(params['INDEX_NAME']):
+                self.es.indices.create(params['INDEX_NAME'])
+
+    def update(self, language, obj):
+        if self.es is not None:
+            self.es.index(index=self.params['INDEX_NAME'],
+                          doc_type=language,
+                          body=obj,
+                          id=obj['id'])
+
+    def delete(self, language, unit_id):
+        if self.es is not None:
+            self.es.delete(index=self.params['INDEX_NAME'],
+                           doc_type=language,
+                           id=unit_id,
+                           ignore=404)
+
+    def bulk_update(self, language, objs):
+        if self.es is not None:
+            bulk(self.es, [{
+                '_index': self.params['INDEX_NAME'],
+                '_type': language,
+                '_id': obj['id'],
+                '_source': obj,
+            } for obj in objs])
+
+    def get_hits(self, language, source):
+        if self.es is None:
+            return None
+
+        es_res = self.es.search(
+            index=self.params['INDEX_NAME'],
+            doc_type=language,
+            body={"query": {"match": {'source': source}}},
+        )
+
+        return self.get_response_hits(es_res)
+
+    def get_many_hits(self, language, sources):
+        if self.es is None:
+            return dict((source, None) for source in sources)
+
+        sources = list(sources)
+        body = []
+        for source in sources:
+            body.extend([
+                {'index': self.params['INDEX_NAME'], 'type': language},
+                {"query": {"match": {'source': source}}},
+            ])
+        es_res = self.es.msearch(body=body)
+
+        return dict((source, self.get_response_hits(response))
+                    for source, response in zip(sources, es_res['responses']))
+
+    def get_response_hits(self, es_res):
+        return [dict(hit['_source'], unit_id=int(hit['_id']))
+                for hit in es_res['hits']['hits']
+                if hit['_score'] >= self.params['MIN_SCORE']]
+
+
+class LocalTMBackend(BaseTMBackend):
+    """Stores translations in the database, along with an index of the
+    trigrams of their source texts.
+
+    Entries sharing enough trigrams with the searched text are fetched
+    first, and then ranked by their Levenshtein similarity.
+
+    Optional parameters are ``MIN_SIMILARITY`` and ``MAX_LENGTH``, which
+    default to the ``FUZZY_MATCH_MIN_SIMILARITY`` and
+    ``FUZZY_MATCH_MAX_LENGTH`` settings, and ``MAX_CANDIDATES``, the
+    number of entries to rank.
+    """
+
+    def __init__(self, params):
+        self.min_similarity = params.get('MIN_SIMILARITY',
+                                         settings.FUZZY_MATCH_MIN_SIMILARITY)
+        self.max_length = params.get('MAX_LENGTH',
+                                     settings.FUZZY_MATCH_MAX_LENGTH)
+        self.max_candidates = params.get('MAX_CANDIDATES', 50)
+
+    def get_entry_fields(self, obj):
+        """Returns the fields of the TM entry of `obj` which don't depend
+        on its source text.
+        """
+        return {
+            'revision': obj['revision'],
+            'project': obj['project'],
+            'path': obj['path'],
+            'target': unicode(obj['target']),
+            'username': obj['username'],
+            'fullname': obj['fullname'],
+            'email_md5': obj['email_md5'],
+        }
+
+    def update(self, language, obj):
+        from pootle_store.models import TMEntry
+
+        # Most updates only change translations, which can be rewritten
+        # without reindexing the trigrams of their unchanged sources
+        updated = TMEntry.objects.filter(
+            unit_id=obj['id'],
+            language=language,
+            source=unicode(obj['source']),
+        ).update(**self.get_entry_fields(obj))
+
+        if not updated:
+            self.bulk_update(language, [obj])
+
+    def bulk_update(self, language, objs):
+        """Stores the translations in `objs` at once, replacing any entries
+        previously stored for the same units.
+
+        Entries whose source text didn't change keep their trigrams.
+        """
+        from pootle_store.models import TMEntry, TMTrigram
+        from pootle_store.search import get_trigrams
+
+        unit_ids = [obj['id'] for obj in objs]
+        indexed = {}
+        entries = TMEntry.objects.filter(unit_id__in=unit_ids) \
+                                 .values_list('unit_id', 'language', 'source')
+        for unit_id, entry_language, source in entries:
+            indexed[unit_id] = (entry_language, source)
+
+        new_objs = []
+        for obj in objs:
+            if indexed.get(obj['id']) == (language, unicode(obj['source'])):
+                TMEntry.objects.filter(unit_id=obj['id']) \
+                               .update(**self.get_entry_fields(obj))
+            else:
+                new_objs.append(obj)
+
+        if not new_objs:
+            return
+
+        new_ids = [obj['id'] for obj in new_objs]
+        TMTrigram.objects.filter(entry__unit_id__in=new_ids).delete()
+        TMEntry.objects.filter(unit_id__in=new_ids).delete()
+
+        entries = []
+        for obj in new_objs:
+            source = unicode(obj['source'])
+            entries.append(TMEntry(
+                unit_id=obj['id'],
+                language=language,
+                source=source,
+                source_length=len(source),
+                **self.get_entry_fields(obj)
+            ))
+
+        try:
+            with transaction.atomic():
+                TMEntry.objects.bulk_create(entries)
+        except IntegrityError:
+            # Entries were concurrently stored for some of the units, so
+            # store them one by one, replacing the concurrent ones
+            for obj in new_objs:
+                self.store_entry(language, obj)
+            return
+
+        # Primary keys aren't set by `bulk_create()` in every database
+        entry_ids = TMEntry.objects.filter(unit_id__in=new_ids) \
+                                   .values_list('unit_id', 'id')
+        entry_ids = dict(entry_ids)
+        TMTrigram.objects.bulk_create([
+            TMTrigram(entry_id=entry_ids[entry.unit_id], language=language,
+                      trigram=trigram)
+            for entry in entries
+            for trigram in get_trigrams(entry.source)
+        ])
+
+    def store_entry(self, language, obj):
+        """Stores the translation in `obj`, replacing its current entry
+        and its trigrams if there is any.
+        """
+        from pootle_store.models import TMEntry, TMTrigram
+        from pootle_store.search import get_trigrams
+
+        source = unicode(obj['source'])
+        fields = dict(self.get_entry_fields(obj), language=language,
+                      source=source, source_length=len(source))
+        try:
+            with transaction.atomic():
+                entry = TMEntry.objects.create(unit_id=obj['id'], **fields)
+        except IntegrityError:
+            entry = TMEntry.objects.get(unit_id=obj['id'])
+            TMEntry.objects.filter(id=entry.id).update(**fields)
+            TMTrigram.objects.filter(entry=entry).delete()
+
+        TMTrigram.objects.bulk_create([
+            TMTrigram(entry_id=entry.id, language=language, trigram=trigram)
+            for trigram in get_trigrams(source)
+        ])
+
+    def delete(self, language, unit_id):
+        from pootle_store.models import TMEntry, TMTrigram
+
+        TMTrigram.objects.filter(entry__unit_id=unit_id).delete()
+        TMEntry.objects.filter(unit_id=unit_id).delete()
+
+    def get_similarity(self, a, b):
+        """Returns the similarity of `a` and `b`, as a percentage."""
+        length = max(len(a), len(b))
+        if not length:
+            return 100
+
+        # Stop computing as soon as the distance is known to be too high
+        max_distance = int((100 - self.min_similarity) * length / 100.0)
+        return 100 * (1 - float(distance(a, b, max_distance)) / length)
+
+    def get_candidates(self, language, source):
+        """Returns a queryset of the entries which may be similar enough to
+        `source`.
+
+        Candidates are at most as many edits away from `source` as the
+        minimum similarity allows for texts of its length. That bounds
+        both their length and the trigrams they must share with `source`.
+        Entries longer than `source` are allowed a few more edits when
+        their similarity is computed, so the closest matches among them
+        may be left out.
+        """
+        from pootle_store.models import TMEntry, TMTrigram
+        from pootle_store.search import get_trigrams
+
+        ratio = max(self.min_similarity, 1) / 100.0
+        max_distance = int((1 - ratio) * len(source))
+        min_length = len(source) - max_distance
+        max_length = len(source) + max_distance
+
+        trigrams = get_trigrams(source)
+        if not trigrams:
+            return TMEntry.objects.filter(language=language, source=source)
+
+        # Every edit changes at most three trigrams, which bounds the
+        # trigrams similar texts must share
+        min_matches = max(len(trigrams) - 3 * max_distance, 1)
+        matching_entries = TMTrigram.objects.filter(
+            language=language,
+            trigram__in=trigrams,
+            entry__source_length__range=(min_length, max_length),
+        ).values('entry').annotate(
+            matches=Count('id'),
+        ).filter(
+            matches__gte=min_matches,
+        ).order_by('-matches').values_list('entry', 'matches')
+
+        entry_ids = [entry_id for entry_id, matches
+                     in matching_entries[:self.max_candidates]]
+        return TMEntry.objects.filter(id__in=entry_ids)
+
+    def get_hits(self, language, source):
+        if not source or len(source) > self.max_length:
+            return []
+
+        hits = []
+        for entry in self.get_candidates(language, source):
+            similarity = self.get_similarity(source, entry.source)
+            if similarity >= self.min_similarity:
+                hits.append((similarity, entry.revision, {
+                    'unit_id': entry.unit_id,
+                    'source': entry.source,
+                    'target': entry.target,
+                    'project': entry.project,
+                    'path': entry.path,
+                    'username': entry.username,
+                    'fullname': entry.fullname,
+                    'email_md5': entry.email_md5,
+                }))
+
+        hits.sort(key=lambda x: x[:2], reverse=True)
+        return [hit for similarity, revision, hit in hits]
+
+
+_backend = None
+
+
+def get_backend():
+    """Returns the TM server backend set in the settings, or `None` if
+    there is no TM server.
+    """
+    global _backend
+
+    params = get_params()
+    if _backend is None and params is not None:
+        backend_class = params.get('ENGINE',
+                                   'pootle.core.tmserver.ElasticSearchBackend')
+        _backend = import_func(backend_class)(params)
+
+    return _backend
 
 
 def update(language, obj):
-    if es is not None:
-        es.index(index=es_params['INDEX_NAME'],
-                 doc_type=language,
-                 body=obj,
-                 id=obj['id'])
+    backend = get_backend()
+    if backend is not None:
+        backend.update(language, obj)
+        bump_tm_revision(language)
+
 
+def bulk_update(language, objs):
+    backend = get_backend()
+    if backend is not None:
+        backend.bulk_update(language, objs)
+        bump_tm_revision(language)
 
-def is_valuable_hit(unit, hit):
-    if hit['_score'] < es_params['MIN_SCORE'] or str(unit.id) == hit['_id']:
-        return False
 
-    return True
+def delete(language, unit_id):
+    """Removes the translation of the unit with `unit_id` from the TM."""
+    backend = get_backend()
+    if backend is not None:
+        backend.delete(language, unit_id)
+        bump_tm_revision(language)
 
 
 def search(unit):
-    if es is None:
+    """Returns TM suggestions for `unit`.
+
+    The TM hits for a source text are cached until the TM revision of the
+    target language changes, so they can be shared by units with the same
+    source text.
+    """
+    backend = get_backend()
+    if backend is None:
         return None
 
-    counter = {}
-    res = []
     language = unit.store.translation_project.language.code
-    es_res = es.search(index=es_params['INDEX_NAME'],
-                       doc_type=language,
-                       body={"query": {"match": {'source': unit.source}}})
-
-    for hit in es_res['hits']['hits']:
-        if is_valuable_hit(unit, hit):
-            if hit['_source']['target'] not in counter:
-                counter[hit['_source']['target']] = 1
-                res.append({
-                    'unit_id': hit['_id'],
-                    'source': hit['_source']['source'],
-                    'target': hit['_source']['target'],
-                    'project': hit['_source']['project'],
-                    'path': hit['_source']['path'],
-                    'username': hit['_source']['username'],
-                    'fullname': hit['_source']['fullname'],
-                    'email_md5': hit['_source']['email_md5'],
-                })
-            else:
-                counter[hit['_source']['target']] += 1
+    source = normalize_source(unit.source)
+    cache_key = get_results_cache_key(unit, source,
+                                      get_tm_revision(language))
+    hits = cache.get(cache_key)
+    if hits is None:
+        hits = backend.get_hits(language, source)
+        if hits is None:
+            return None
+        cache.set(cache_key, hits, settings.POOTLE_CACHE_TIMEOUT)
 
-    for item in res:
-        item['count'] = counter[item['target']]
+    return get_unit_results(unit, hits)
 
-    return res
+
+def search_many(units):
+    """Returns TM suggestions for all `units` at once, as a dictionary
+    mapping each unit id to the same results :func:`search` returns.
+
+    Cached hits are fetched in a single round trip, and the TM server is
+    only queried for source texts which weren't cached, at once for every
+    language.
+    """
+    backend = get_backend()
+    if backend is None:
+        return dict((unit.id, None) for unit in units)
+
+    languages = dict((unit.id, unit.store.translation_project.language.code)
+                     for unit in units)
+    revisions = dict((language, get_tm_revision(language))
+                     for language in set(languages.values()))
+    sources = dict((unit.id, normalize_source(unit.source)) for unit in units)
+    cache_keys = dict(
+        (unit.id, get_results_cache_key(unit, sources[unit.id],
+                                        revisions[languages[unit.id]]))
+        for unit in units
+    )
+    cached_hits = cache.get_many(cache_keys.values())
+
+    missing = {}
+    for unit in units:
+        if cache_keys[unit.id] not in cached_hits:
+            missing.setdefault(languages[unit.id], {}) \
+                   .setdefault(sources[unit.id], set()) \
+                   .add(cache_keys[unit.id])
+
+    for language, source_keys in missing.iteritems():
+        hits = backend.get_many_hits(language, source_keys.keys())
+        new_hits = dict((cache_key, source_hits)
+                        for source, source_hits in hits.iteritems()
+                        if source_hits is not None
+                        for cache_key in source_keys[source])
+        cache.set_many(new_hits, settings.POOTLE_CACHE_TIMEOUT)
+        cached_hits.update(new_hits)
+
+    results = {}
+    for unit in units:
+        hits = cached_hits.get(cache_keys[unit.id])
+        if hits is None:
+            results[unit.id] = None
+        else:
+            results[unit.id] = get_unit_results(unit, hits)
+
+    return results
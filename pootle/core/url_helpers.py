@@ -61,6 +61,21 @@ def split_pootle_path(pootle_path):
     return (language_code, project_code, dir_path, filename)
 
 
+def split_tp_path(pootle_path):
+    """Splits `pootle_path` into the parts stores and directories are
+    looked up by.
+
+    :return: A tuple containing the language code, the project code and
+        the path relative to the translation project, each of them `None`
+        when not part of `pootle_path`.
+    """
+    lang, proj, dir_path, filename = split_pootle_path(pootle_path)
+    if proj is None:
+        return (lang, None, None)
+
+    return (lang, proj, dir_path + filename)
+
+
 def to_tp_relative_path(pootle_path):
     """Returns a path relative to translation projects.
 
@@ -20,6 +20,8 @@
 
 import re
 re._MAXCACHE = 1000
+import threading
+from collections import OrderedDict
 from difflib import SequenceMatcher
 
 
@@ -113,56 +115,174 @@ def find_placeholders(aref, regex, cls=''):
             i += len(a)
 
 
-def wordcount(string):
-    string = re.sub('\n', '{\\n}', string)
-
-    chunks = [{
-        'translate': 1,
-        'string': u'%s' % string,
-    }]
-
-    # FIXME: provide line continuations to fit lines below 80 chars
-
+#: Placeholder patterns, in the order they are stripped by `wordcount()`.
+#: Earlier patterns take precedence over overlapping matches of later ones.
+placeholder_regexes = (
     # Escaped XML tags (used in some strings)
-    find_placeholders(chunks, escaped_xmltag_regex)
+    escaped_xmltag_regex,
     # XML tags
-    find_placeholders(chunks, xmltag_regex)
+    xmltag_regex,
     # Java format and it's escaped version
-    find_placeholders(chunks, java_format_regex)
+    java_format_regex,
     # Template format
-    find_placeholders(chunks, template_format_regex)
+    template_format_regex,
     # Android format
-    find_placeholders(chunks, android_format_regex)
+    android_format_regex,
     # sprintf
-    find_placeholders(chunks, sprintf_regex)
+    sprintf_regex,
     # Objective C style placeholders
-    find_placeholders(chunks, objective_c_regex)
+    objective_c_regex,
     # Dollar sign placeholders
-    find_placeholders(chunks, dollar_sign_regex)
+    dollar_sign_regex,
     # Percent sign placeholders
-    find_placeholders(chunks, persent_sign_regex)
+    persent_sign_regex,
     # '{\n}' newline marker
-    find_placeholders(chunks, newline_regex)
+    newline_regex,
     # Escaping sequences (\n, \r, \t)
-    find_placeholders(chunks, escaping_sqc_regex)
+    escaping_sqc_regex,
     # XML entities
-    find_placeholders(chunks, xml_entities_regex)
+    xml_entities_regex,
     # Product names
-    find_placeholders(chunks, product_names_regex)
+    product_names_regex,
     # Shortcuts
-    find_placeholders(chunks, shortcuts_regex)
+    shortcuts_regex,
     # Shortcut modifiers
-    find_placeholders(chunks, shortcuts_modifier_regex)
+    shortcuts_modifier_regex,
     # Surrounding quotes (including ones around placeholders)
-    #find_placeholders($chunks, re.compile(u'(^["\']+|["\']+$)', re.U))
+    #re.compile(u'(^["\']+|["\']+$)', re.U)
     # End punctuation after (or between) placeholders
-    #find_placeholders($chunks, re.compile(u'(^\.$)', re.U))
+    #re.compile(u'(^\.$)', re.U)
+)
+
 
-    # Find patterns that are not counted as words in Trados
-    # Hanging symbols (excluding a-z, _ and &)
-    find_placeholders(chunks, hanging_symbols_regex, 'dont-count')
+def _join_placeholder_regexes(regexes):
+    # Placeholders can only start with these characters; checking them
+    # first saves trying every alternative at every position
+    return re.compile(u'(?=[&<\\\\{$%%ACEFHS])(?:%s)' %
+                      u'|'.join(regex.pattern for regex in regexes), re.U)
+
+
+#: Matches anything that any of the placeholder patterns would match. Each
+#: pattern has a single group, so the group index of a match tells which
+#: pattern matched
+any_placeholder_regex = _join_placeholder_regexes(placeholder_regexes)
+#: Matches anything that the patterns taking precedence over each of the
+#: placeholder patterns would match
+higher_placeholder_regexes = [None] + [
+    _join_placeholder_regexes(placeholder_regexes[:i])
+    for i in xrange(1, len(placeholder_regexes))
+]
+newline_marker_regex = re.compile(u'\n', re.U)
+
+
+class WordCounter(object):
+    """Counts words the same way Trados 2007 does, leaving placeholders
+    out of the count.
+
+    Results are memoized in a bounded LRU cache keyed by the string, since
+    the same source strings show up over and over across languages. The
+    cache is shared by threads, so it is guarded by a lock.
+    """
+
+    def __init__(self, maxsize=50000):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, string):
+        with self._lock:
+            try:
+                count = self._cache.pop(string)
+            except KeyError:
+                pass
+            else:
+                self._cache[string] = count
+                return count
+
+        count = self.count(string)
+
+        with self._lock:
+            self._cache.pop(string, None)
+            self._cache[string] = count
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def count(self, string):
+        """Counts words in `string` without using the cache."""
+        string = newline_marker_regex.sub(u'{\\n}', u'%s' % string)
+
+        chunks = _scan_translatable(string)
+        if chunks is None:
+            chunks = [string]
+            for regex in placeholder_regexes:
+                chunks = _split_translatable(chunks, regex)
+
+        # Find patterns that are not counted as words in Trados
+        # Hanging symbols (excluding a-z, _ and &)
+        chunks = _split_translatable(chunks, hanging_symbols_regex)
+
+        return _count_words([{'translate': 1, 'string': chunk}
+                             for chunk in chunks])
+
+
+def _scan_translatable(string):
+    """Splits `string` around its placeholders in a single scan, keeping
+    the translatable parts only.
+
+    Placeholder patterns are meant to be applied one after another, so
+    the scan can only tell them apart when matches don't overlap with the
+    ones of patterns taking precedence, and no pattern matches within the
+    remaining parts on their own, e.g. anchored ones. Otherwise `None` is
+    returned, and patterns must be applied one by one.
+    """
+    chunks = []
+    pos = 0
+    for match in any_placeholder_regex.finditer(string):
+        start, end = match.span()
+        higher_regex = higher_placeholder_regexes[match.lastindex - 1]
+        if higher_regex is not None:
+            higher_match = higher_regex.search(string, start + 1)
+            if higher_match is not None and higher_match.start() < end:
+                return None
+
+        chunks.append(string[pos:start])
+        pos = end
+    chunks.append(string[pos:])
+
+    if len(chunks) > 1:
+        for chunk in chunks:
+            if any_placeholder_regex.search(chunk) is not None:
+                return None
+
+    return chunks
+
+
+def _split_translatable(chunks, regex):
+    """Splits the translatable `chunks` strings around the placeholders
+    matched by `regex`, keeping the translatable parts only.
+
+    Equivalent to :func:`find_placeholders` when only translatable chunks
+    are of interest.
+    """
+    result = []
+    for chunk in chunks:
+        # `regex` has a single group, so placeholders are at odd positions
+        result.extend(regex.split(chunk)[::2])
 
-    return _count_words(chunks)
+    return result
+
+
+wordcounter = WordCounter()
+
+
+def wordcount(string):
+    return wordcounter(string)
 
 
 def _count_words(aref):
@@ -20,6 +20,8 @@
 
 from django.utils.cache import add_never_cache_headers
 
+from pootle.core.cache import clear_request_cache, start_request_cache
+
 
 class CacheAnonymousOnly(object):
     """Imitate the deprecated `CACHE_MIDDLEWARE_ANONYMOUS_ONLY` behavior."""
@@ -29,3 +31,14 @@ class CacheAnonymousOnly(object):
             add_never_cache_headers(response)
 
         return response
+
+
+class RequestCache(object):
+    """Memoizes repeated lookups for the duration of each request."""
+
+    def process_request(self, request):
+        start_request_cache()
+
+    def process_response(self, request, response):
+        clear_request_cache()
+        return response
@@ -34,12 +34,14 @@ from django.core.urlresolvers import reverse
 from django.core.validators import RegexValidator
 from django.db import models
 from django.db.models import ProtectedError, Sum, Q
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from django.forms.models import model_to_dict
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
-from pootle.core.cache import make_method_key
+from pootle.core.cache import get_or_compute, make_method_key
 from pootle.managers import UserManager
 from pootle_language.models import Language
 from pootle_misc.util import jsonify
@@ -201,40 +203,38 @@ class User(AbstractBaseUser):
         }
         cache_key = make_method_key(cls, 'top_scorers', cache_kwargs)
 
-        top_scorers = cache.get(cache_key, None)
-        if top_scorers is not None:
-            return top_scorers
+        def get_top_scorers():
+            now = timezone.now()
+            past = now + datetime.timedelta(-days)
 
-        now = timezone.now()
-        past = now + datetime.timedelta(-days)
+            lookup_kwargs = {
+                'scorelog__creation_time__range': [past, now],
+            }
 
-        lookup_kwargs = {
-            'scorelog__creation_time__range': [past, now],
-        }
+            if language is not None:
+                lookup_kwargs.update({
+                    'scorelog__submission__translation_project__language__code':
+                        language,
+                })
 
-        if language is not None:
-            lookup_kwargs.update({
-                'scorelog__submission__translation_project__language__code':
-                    language,
-            })
+            if project is not None:
+                lookup_kwargs.update({
+                    'scorelog__submission__translation_project__project__code':
+                        project,
+                })
 
-        if project is not None:
-            lookup_kwargs.update({
-                'scorelog__submission__translation_project__project__code':
-                    project,
-            })
+            top_scorers = cls.objects.hide_meta().filter(
+                **lookup_kwargs
+            ).annotate(
+                total_score=Sum('scorelog__score_delta'),
+            ).order_by('-total_score')
 
-        top_scorers = cls.objects.hide_meta().filter(
-            **lookup_kwargs
-        ).annotate(
-            total_score=Sum('scorelog__score_delta'),
-        ).order_by('-total_score')
+            if isinstance(limit, (int, long)) and limit > 0:
+                top_scorers = top_scorers[:limit]
 
-        if isinstance(limit, (int, long)) and limit > 0:
-            top_scorers = top_scorers[:limit]
+            return list(top_scorers)
 
-        cache.set(cache_key, list(top_scorers), 60)
-        return top_scorers
+        return get_or_compute(cache_key, get_top_scorers, 60)
 
     def __unicode__(self):
         return self.username
@@ -290,6 +290,22 @@ class User(AbstractBaseUser):
     def get_unit_rows(self):
         return min(max(self.unit_rows, 5), 49)
 
+    def get_alt_src_lang_ids(self):
+        """Returns the ids of the user's alternative source languages.
+
+        They are cached until the user changes them.
+        """
+        cache_key = make_method_key(self, 'alt_src_lang_ids',
+                                    unicode(self.id))
+        alt_src_lang_ids = cache.get(cache_key, None)
+        if alt_src_lang_ids is None:
+            alt_src_lang_ids = list(self.alt_src_langs.values_list('id',
+                                                                   flat=True))
+            cache.set(cache_key, alt_src_lang_ids,
+                      settings.OBJECT_CACHE_TIMEOUT)
+
+        return alt_src_lang_ids
+
     def pending_suggestion_count(self, tp):
         """Returns the number of pending suggestions for the user in the given
         translation project.
@@ -390,3 +406,23 @@ class User(AbstractBaseUser):
         no activity, `None` is returned instead.
         """
         return Submission.objects.filter(submitter=self).latest()
+
+
+@receiver(m2m_changed, sender=User.alt_src_langs.through)
+def invalidate_alt_src_langs_cache(sender, instance, action, reverse,
+                                   pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if not reverse:
+        user_ids = [instance.id]
+    elif action == 'pre_clear':
+        user_ids = sender.objects.filter(language=instance) \
+                                 .values_list('user', flat=True)
+    else:
+        user_ids = pk_set
+
+    cache.delete_many([
+        make_method_key(User, 'alt_src_lang_ids', unicode(user_id))
+        for user_id in user_ids
+    ])
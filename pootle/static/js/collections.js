@@ -15,8 +15,13 @@ collections.UnitSet = Backbone.Collection.extend({
 
   initialize: function (model, opts) {
     this.chunkSize = opts.chunkSize;
+    // Window of the ids in the result set, along with its position in it
+    // and the cursors to the adjacent windows
     this.uIds = [];
     this.total = 0;
+    this.offset = 0;
+    this.cursors = {};
+    this.fetchingWindow = {};
   },
 
   comparator: function (unit) {
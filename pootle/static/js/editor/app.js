@@ -253,7 +253,7 @@ PTL.editor = {
 
     /* Load MT backends */
     $.each(this.settings.mt, function () {
-      var backend = this.name, key = this.key;
+      var backend = this.name;
 
       $.ajax({
         url: s(['js/mt/', backend, '.js'].join('')),
@@ -261,7 +261,7 @@ PTL.editor = {
         dataType: 'script',
         success: function () {
           setTimeout(function () {
-            PTL.editor.mt[backend].init(key);
+            PTL.editor.mt[backend].init();
           }, 0);
           $(document).on('mt_ready', 'table.translate-table',
                          PTL.editor.mt[backend].ready);
@@ -293,8 +293,10 @@ PTL.editor = {
               return;
             } else {
               uId = uIdParam;
-              // Don't retrieve initial data if there are existing results
-              isInitial = !PTL.editor.units.length;
+              // Don't retrieve initial data if there are existing results,
+              // unless the unit is out of the current window of ids
+              isInitial = (!PTL.editor.units.length ||
+                           PTL.editor.units.uIds.indexOf(uId) === -1);
             }
           }
         }
@@ -1217,9 +1219,12 @@ PTL.editor = {
 
     if (opts.initial) {
       reqData.initial = opts.initial;
+      reqData.paging = 'cursor';
 
       if (opts.uId > 0) {
         reqData.uids = opts.uId;
+      } else if (opts.index !== undefined) {
+        reqData.index = opts.index;
       }
     } else {
       // Only fetch units limited to an offset, and omit units that have
@@ -1230,8 +1235,16 @@ PTL.editor = {
           uIndex = this.units.uIds.indexOf(curUId),
           uIds, begin, end;
 
+      // Extend the window of ids when getting close to its edges
+      if (uIndex + offset >= this.units.uIds.length) {
+        this.fetchWindow('after');
+      }
+      if (uIndex - offset < 0) {
+        this.fetchWindow('before');
+      }
+
       begin = Math.max(uIndex - offset, 0);
-      end = Math.min(uIndex + offset + 1, this.units.total);
+      end = Math.min(uIndex + offset + 1, this.units.uIds.length);
 
       // Ensure we retrieve chunks of the right size
       if (opts.uId === 0) {
@@ -1239,7 +1252,7 @@ PTL.editor = {
           begin = Math.max(begin - offset, 0);
         }
         if (fetchedIds.indexOf(this.units.uIds[end - 1]) === -1) {
-          end = Math.min(end + offset + 1, this.units.total);
+          end = Math.min(end + offset + 1, this.units.uIds.length);
         }
       }
 
@@ -1262,26 +1275,18 @@ PTL.editor = {
       cache: false,
       success: function (data) {
         if (data.uIds) {
-          // Clear old data and add new results
+          // Clear old data and add the new window of results
           PTL.editor.units.reset();
 
           PTL.editor.units.uIds = data.uIds;
-          PTL.editor.units.total = data.uIds.length;
+          PTL.editor.units.total = data.total;
+          PTL.editor.units.offset = data.offset;
+          PTL.editor.units.cursors = data.cursors;
         }
 
         // Store view units in the client
         if (data.unitGroups.length) {
-          var i, unitGroup;
-          for (i=0; i<data.unitGroups.length; i++) {
-            unitGroup = data.unitGroups[i];
-            $.each(unitGroup, function (pootlePath, group) {
-              var storeData = $.extend({pootlePath: pootlePath}, group.meta),
-                  units = _.map(group.units, function (unit) {
-                    return $.extend(unit, {store: storeData});
-                  });
-              PTL.editor.units.set(units, {remove: false});
-            });
-          }
+          PTL.editor.storeUnitGroups(data.unitGroups);
 
           if (opts.success && $.isFunction(opts.success)) {
             opts.success();
@@ -1294,13 +1299,71 @@ PTL.editor = {
     });
   },
 
+  /* Fetches the window of unit ids right before or after the current
+   * one, if there is any */
+  fetchWindow: function (direction) {
+    var units = this.units,
+        reqData = {
+          path: this.settings.pootlePath
+        };
+
+    if (!units.cursors[direction] || units.fetchingWindow[direction]) {
+      return;
+    }
+
+    reqData[direction] = units.cursors[direction];
+    $.extend(reqData, this.getReqData());
+    units.fetchingWindow[direction] = true;
+
+    $.ajax({
+      url: l('/xhr/units/'),
+      data: reqData,
+      dataType: 'json',
+      cache: false,
+      success: function (data) {
+        if (direction === 'after') {
+          units.uIds = units.uIds.concat(data.uIds);
+        } else {
+          units.uIds = data.uIds.concat(units.uIds);
+          units.offset -= data.uIds.length;
+        }
+        units.cursors[direction] = data.cursors[direction];
+
+        PTL.editor.storeUnitGroups(data.unitGroups);
+        units.sort();
+        PTL.editor.updateNavButtons();
+        PTL.editor.updateNav();
+      },
+      complete: function () {
+        units.fetchingWindow[direction] = false;
+      },
+      error: PTL.editor.error
+    });
+  },
+
+  /* Stores the units in `unitGroups` in the client */
+  storeUnitGroups: function (unitGroups) {
+    var i, unitGroup;
+    for (i=0; i<unitGroups.length; i++) {
+      unitGroup = unitGroups[i];
+      $.each(unitGroup, function (pootlePath, group) {
+        var storeData = $.extend({pootlePath: pootlePath}, group.meta),
+            units = _.map(group.units, function (unit) {
+              return $.extend(unit, {store: storeData});
+            });
+        PTL.editor.units.set(units, {remove: false});
+      });
+    }
+  },
+
   /* Updates the navigation controls */
   updateNav: function () {
     $("#items-count").text(this.units.total);
 
     var currentUnit = PTL.editor.units.getCurrent();
     if (currentUnit !== undefined) {
-      var uIndex = this.units.uIds.indexOf(currentUnit.id) + 1;
+      var uIndex = (this.units.offset +
+                    this.units.uIds.indexOf(currentUnit.id) + 1);
       $('.js-unit-index').text(uIndex);
     }
 
@@ -1580,9 +1643,22 @@ PTL.editor = {
 
       if (index && !isNaN(index) && index > 0 &&
           index <= this.units.total) {
-        var uId = this.units.uIds[index-1],
-            newHash = utils.updateHashPart('unit', uId);
-        $.history.load(newHash);
+        var units = this.units,
+            uId = units.uIds[index - 1 - units.offset];
+
+        if (uId !== undefined) {
+          $.history.load(utils.updateHashPart('unit', uId));
+        } else {
+          // The unit is out of the current window of ids
+          this.fetchUnits({
+            initial: true,
+            index: index - 1,
+            success: function () {
+              uId = units.uIds[index - 1 - units.offset];
+              $.history.load(utils.updateHashPart('unit', uId));
+            }
+          });
+        }
       }
     }
   },
@@ -11,10 +11,10 @@
     cookieName: "apertium_pairs",
     cookieOptions: {path: '/', expires: 15},
 
-    init: function (apiKey) {
+    init: function () {
       var _this = PTL.editor.mt.apertium;
-      /* Load Apertium library */
-      _this.url = apiKey == undefined ? _this.url : _this.url + '?key=' + apiKey;
+      /* Load Apertium library, only used to list the supported language
+       * pairs: translations are requested by Pootle, with its API key */
       $.getScript(_this.url, function () {
         /* Init variables */
         var _this = PTL.editor.mt.apertium;
@@ -42,17 +42,22 @@
 
     translate: function () {
       PTL.editor.translate(this, function(sourceText, langFrom, langTo, resultCallback) {
-        var content = new Object()
-        content.text = sourceText;
-        content.type = "txt";
-        apertium.translate(content, langFrom, langTo, function (result) {
-          if (result.translation) {
+        /* Requests go through Pootle, which caches translations */
+        $.ajax({
+          url: l('/xhr/mt/apertium/'),
+          data: {q: sourceText, source: langFrom, target: langTo},
+          traditional: true,
+          dataType: 'json',
+          success: function (r) {
             resultCallback({
-              translation: result.translation
+              translation: r.translations[0]
             });
-          } else {
+          },
+          error: function (xhr) {
+            var data = $.parseJSON(xhr.responseText || 'null');
             resultCallback({
-              msg: "Apertium Error: " + result.error.message
+              msg: "Apertium Error: " +
+                   (data && data.msg ? data.msg : xhr.statusText)
             });
           }
         });
@@ -7,9 +7,6 @@
     hint: "Google Translate",
     validatePair: false,
 
-    /* using Google Translate API v2 */
-    url: "https://www.googleapis.com/language/translate/v2",
-
     /* For a list of currently supported languages:
      * https://developers.google.com/translate/v2/using_rest#language-params
      *
@@ -27,7 +24,7 @@
       'sl','es','sw','sv','ta','te','th','tr','uk','ur','vi','cy','yi'
     ],
 
-    init: function (apiKey) {
+    init: function () {
       /* Init variables */
       this.pairs = [];
       for (var i=0; i<this.supportedLanguages.length; i++) {
@@ -37,10 +34,6 @@
         });
       };
 
-      /* Prepare URL for requests. */
-      this.url += "?callback=?";
-      /* Set API key */
-      this.apiKey = apiKey;
       /* Bind event handler */
       $(document).on("click", ".google-translate", this.translate);
     },
@@ -51,30 +44,24 @@
 
     translate: function () {
       PTL.editor.translate(this, function(sourceText, langFrom, langTo, resultCallback) {
-        var transData = {key: PTL.editor.mt.google_translate.apiKey,
-                         q: sourceText,
-                         source: langFrom,
-                         target: langTo};
-        $.jsonp({
-          url: PTL.editor.mt.google_translate.url,
-          data: transData,
+        /* Requests go through Pootle, which caches translations */
+        $.ajax({
+          url: l('/xhr/mt/google_translate/'),
+          data: {q: sourceText, source: langFrom, target: langTo},
+          traditional: true,
+          dataType: 'json',
           success: function (r) {
-            if (r.data && r.data.translations) {
-              resultCallback({
-                translation: r.data.translations[0].translatedText,
-                storeResult: true
-              });
-            } else {
-              if (r.error && r.error.message) {
-                resultCallback({
-                  msg: "Google Translate Error: " + r.error.message
-                });
-              } else {
-                resultCallback({
-                  msg: "Malformed response from Google Translate API"
-                });
-              }
-            }
+            resultCallback({
+              translation: r.translations[0],
+              storeResult: true
+            });
+          },
+          error: function (xhr) {
+            var data = $.parseJSON(xhr.responseText || 'null');
+            resultCallback({
+              msg: "Google Translate Error: " +
+                   (data && data.msg ? data.msg : xhr.statusText)
+            });
           }
         });
       });
@@ -0,0 +1,51 @@
+(function ($) {
+  window.PTL.editor.mt = window.PTL.editor.mt || {};
+
+  PTL.editor.mt.stub = {
+
+    buttonClassName: "stub-mt",
+    hint: "Stub MT",
+    validatePair: false,
+
+    init: function () {
+      /* Bind event handler */
+      $(document).on("click", ".stub-mt", this.translate);
+    },
+
+    ready: function () {
+      /* Any language pair is supported */
+      var targetLang = PTL.editor.settings.targetLang;
+      PTL.editor.mt.stub.pairs = $('.source-language .translation-text').map(function () {
+        return {
+          source: PTL.editor.normalizeCode($(this).attr('lang')),
+          target: targetLang
+        };
+      }).get();
+      PTL.editor.addMTButtons(PTL.editor.mt.stub);
+    },
+
+    translate: function () {
+      PTL.editor.translate(this, function(sourceText, langFrom, langTo, resultCallback) {
+        $.ajax({
+          url: l('/xhr/mt/stub/'),
+          data: {q: sourceText, source: langFrom, target: langTo},
+          traditional: true,
+          dataType: 'json',
+          success: function (r) {
+            resultCallback({
+              translation: r.translations[0],
+              storeResult: true
+            });
+          },
+          error: function (xhr) {
+            var data = $.parseJSON(xhr.responseText || 'null');
+            resultCallback({
+              msg: "Stub MT Error: " +
+                   (data && data.msg ? data.msg : xhr.statusText)
+            });
+          }
+        });
+      });
+    }
+  };
+})(jQuery);
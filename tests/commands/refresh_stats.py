@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+
+def _get_checks(store):
+    from pootle_store.models import QualityCheck
+
+    return set(QualityCheck.objects.filter(unit__store=store)
+                                   .values_list('unit', 'name', 'category'))
+
+
+def _get_check_flags(store):
+    return set(store.unit_set.values_list('id', 'check_categories',
+                                          'has_critical_check'))
+
+
+@pytest.mark.django_db
+def test_calculate_checks(af_tutorial_po):
+    """Tests bulk calculated checks match the ones calculated unit by unit,
+    and untranslated units lose all their checks.
+    """
+    from pootle_app.management.commands.refresh_stats import Command
+    from pootle_store.models import QualityCheck
+
+    af_tutorial_po.require_units()
+    tp = af_tutorial_po.translation_project
+    for unit in af_tutorial_po.unit_set.exclude(source_f='fish'):
+        if unit.hasplural():
+            unit.target = [u'vis', u'visse']
+        else:
+            unit.target = u' rest'
+        unit.save()
+        unit.update_qualitychecks()
+        unit.update_check_flags()
+
+    expected_checks = _get_checks(af_tutorial_po)
+    expected_flags = _get_check_flags(af_tutorial_po)
+    assert expected_checks
+
+    untranslated = af_tutorial_po.unit_set.get(source_f='fish')
+    QualityCheck.objects.filter(unit__store=af_tutorial_po).delete()
+    QualityCheck.objects.create(unit=untranslated, name='printf',
+                                category=0, message='')
+
+    def calculate_checks(check_names):
+        Command().calculate_checks(
+            check_names,
+            unit_fk_filter={'unit__store__translation_project': tp},
+            store_fk_filter={'store__translation_project': tp},
+            store_filter={'translation_project': tp},
+        )
+
+    # Checks outside the recalculated ones are dropped for untranslated
+    # units too
+    calculate_checks(['whitespace'])
+    assert not untranslated.qualitycheck_set.exists()
+
+    calculate_checks([])
+    assert _get_checks(af_tutorial_po) == expected_checks
+    assert _get_check_flags(af_tutorial_po) == expected_flags
+
+
+@pytest.mark.django_db
+def test_calculate_wordcount(af_tutorial_po):
+    """Tests wrong source wordcounts are fixed."""
+    from pootle_app.management.commands.refresh_stats import Command
+    from pootle_store.models import Store, Unit
+
+    af_tutorial_po.require_units()
+    unit = af_tutorial_po.unit_set.get(source_f='test')
+    assert unit.source_wordcount == 1
+    Unit.simple_objects.filter(id=unit.id).update(source_wordcount=5)
+
+    Command().calculate_wordcount(Store.objects.filter(id=af_tutorial_po.id))
+
+    assert Unit.simple_objects.get(id=unit.id).source_wordcount == 1
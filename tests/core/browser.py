@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from pootle.core.browser import (get_children, make_directory_item,
+                                 make_store_item)
+
+
+@pytest.mark.django_db
+def test_get_children(af_tutorial_po):
+    """Tests the rows of the children of a directory match the rows built
+    out of each child, and are refreshed when a child is added.
+    """
+    from pootle_app.models import Directory
+    from pootle_store.models import Store
+
+    tp = af_tutorial_po.translation_project
+    directory = tp.directory
+    Directory.objects.create(name=u'sub dir', parent=directory)
+
+    def get_expected():
+        return (
+            [make_directory_item(child)
+             for child in directory.child_dirs.all()] +
+            [make_store_item(child)
+             for child in directory.child_stores.all()]
+        )
+
+    assert get_children(directory) == get_expected()
+
+    Store.objects.create(parent=directory, translation_project=tp,
+                         name=u'new file.po')
+    assert get_children(directory) == get_expected()
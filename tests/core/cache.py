@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from django.core.cache import cache
+
+from pootle.core.cache import (acquire_lock, bump_cache_version,
+                               clear_request_cache, get_local_or_compute,
+                               get_or_compute, get_request_or_compute,
+                               release_lock, start_request_cache)
+
+
+def test_get_or_compute():
+    """Tests values are computed once, and stale values are served while
+    another process holds the lock to recompute them.
+    """
+    key = 'test:get_or_compute'
+    cache.delete(key)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert get_or_compute(key, compute, 60) == 1
+    assert get_or_compute(key, compute, 60) == 1
+    assert len(calls) == 1
+
+    # Make the value stale
+    value, stale_at = cache.get(key)
+    cache.set(key, (value, time.time() - 1), 60)
+
+    assert acquire_lock(key)
+    assert get_or_compute(key, compute, 60) == 1
+    assert len(calls) == 1
+
+    release_lock(key)
+    assert get_or_compute(key, compute, 60) == 2
+    assert get_or_compute(key, compute, 60) == 2
+    assert len(calls) == 2
+
+
+def test_get_or_compute_legacy_values():
+    """Tests values cached before `get_or_compute()` handled their keys are
+    recomputed rather than unpacked.
+    """
+    key = 'test:get_or_compute:legacy'
+
+    for legacy_value in ({'users': 1}, [('admin', 10)], (1, 2, 3),
+                         ('value', 'not a timestamp')):
+        cache.set(key, legacy_value, 60)
+        assert get_or_compute(key, lambda: 'fresh', 60) == 'fresh'
+        assert get_or_compute(key, lambda: 'other', 60) == 'fresh'
+
+
+def test_get_local_or_compute():
+    """Tests values are served from process memory until their cache
+    family is invalidated.
+    """
+    namespace = 'test:get_local_or_compute'
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    bump_cache_version(namespace)
+    assert get_local_or_compute(namespace, 'key', compute, 60) == 1
+    assert get_local_or_compute(namespace, 'key', compute, 60) == 1
+    assert len(calls) == 1
+
+    bump_cache_version(namespace)
+    assert get_local_or_compute(namespace, 'key', compute, 60) == 2
+    assert get_local_or_compute(namespace, 'key', compute, 60) == 2
+    assert len(calls) == 2
+
+
+def test_get_request_or_compute():
+    """Tests values are memoized within requests only, until their cache
+    families are invalidated.
+    """
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    key = 'test:get_request_or_compute'
+    assert get_request_or_compute(key, compute) == 1
+    assert get_request_or_compute(key, compute) == 2
+
+    start_request_cache()
+    try:
+        assert get_request_or_compute(key, compute) == 3
+        assert get_request_or_compute(key, compute) == 3
+
+        bump_cache_version(key)
+        assert get_request_or_compute(key, compute) == 4
+        assert get_request_or_compute(key, compute) == 4
+    finally:
+        clear_request_cache()
+
+    assert get_request_or_compute(key, compute) == 5
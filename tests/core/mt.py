@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+
+from django.core.urlresolvers import reverse
+
+from pootle.core import mt
+
+
+XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+@pytest.fixture
+def stub_mt(settings, monkeypatch):
+    settings.MT_BACKENDS = [('STUB', '')]
+    settings.MT_RATE_LIMIT = 0
+    monkeypatch.setattr(mt, '_backends', {})
+
+    for key in mt.cache.keys('pootle:mt:*'):
+        mt.cache.delete(key)
+
+    calls = []
+    translate = mt.StubBackend.translate
+
+    def counted_translate(self, source_lang, target_lang, texts):
+        calls.append(texts)
+        return translate(self, source_lang, target_lang, texts)
+
+    monkeypatch.setattr(mt.StubBackend, 'translate', counted_translate)
+    return calls
+
+
+def test_mt_translate_cache(stub_mt):
+    assert mt.translate('STUB', 'en', 'af', [u'File', u'Edit']) == [
+        u'[af] File',
+        u'[af] Edit',
+    ]
+    assert len(stub_mt) == 1
+
+    # Only texts missing from the cache are sent to the service
+    assert mt.translate('STUB', 'en', 'af', [u'Edit', u'View']) == [
+        u'[af] Edit',
+        u'[af] View',
+    ]
+    assert stub_mt[1:] == [[u'View']]
+
+    assert mt.translate('STUB', 'en', 'ar', [u'Edit']) == [u'[ar] Edit']
+    assert len(stub_mt) == 3
+
+
+def test_mt_rate_limit(stub_mt, settings):
+    settings.MT_RATE_LIMIT = 1
+
+    mt.translate('STUB', 'en', 'af', [u'File'])
+    with pytest.raises(mt.MTRateLimitExceeded):
+        mt.translate('STUB', 'en', 'af', [u'Edit'])
+
+    # Cached translations don't count
+    assert mt.translate('STUB', 'en', 'af', [u'File']) == [u'[af] File']
+
+
+def test_mt_translate_missing_translations(stub_mt, monkeypatch):
+    monkeypatch.setattr(mt.StubBackend, 'translate',
+                        lambda self, source_lang, target_lang, texts: [])
+
+    with pytest.raises(mt.MTError):
+        mt.translate('STUB', 'en', 'af', [u'File'])
+
+
+@pytest.mark.django_db
+def test_get_mt_translations(stub_mt, client, admin):
+    url = reverse('pootle-xhr-mt', args=['stub'])
+    params = {'source': 'en', 'target': 'af', 'q': [u'File', u'Edit']}
+
+    response = client.get(url, params, **XHR)
+    assert response.status_code == 403
+
+    client.login(username=admin.username, password='admin')
+    response = client.get(url, params, **XHR)
+    assert response.status_code == 200
+    assert json.loads(response.content) == {
+        'translations': [u'[af] File', u'[af] Edit'],
+    }
+
+    response = client.get(reverse('pootle-xhr-mt', args=['apertium']),
+                          params, **XHR)
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_translation_context_mt_keys(rf, admin, settings):
+    """Tests MT API keys are left out of the editor's context."""
+    from pootle.core.helpers import get_translation_context
+
+    settings.MT_BACKENDS = [('GOOGLE_TRANSLATE', 'secret-key')]
+    request = rf.get('/')
+    request.user = request.profile = admin
+    request.pootle_path = request.ctx_path = '/'
+
+    ctx = get_translation_context(request)
+    assert ctx['MT_BACKENDS'] == ['GOOGLE_TRANSLATE']
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from pootle.core.paginator import (CursorPaginator, InvalidCursor,
+                                   delta_decode, delta_encode)
+
+
+def test_delta_encode():
+    ids = [5, 6, 7, 100, 3, 3000]
+    assert delta_encode(ids) == '5,1,1,93,-97,2997'
+    assert delta_decode(delta_encode(ids)) == ids
+    assert delta_decode(delta_encode([])) == []
+
+
+def _walk(paginator, size):
+    """Collects all ids by following `after` cursors from the start."""
+    windows = [paginator.first(size)]
+    while windows[-1].after is not None:
+        windows.append(paginator.after(windows[-1].after, size))
+
+    return windows
+
+
+def _check_paginator(paginator, expected):
+    for size in (1, 2, len(expected), len(expected) + 1):
+        windows = _walk(paginator, size)
+        assert sum([window.ids for window in windows], []) == expected
+        assert windows[0].before is None
+
+        # Walking backwards yields the same windows
+        for i in range(len(windows) - 1, 0, -1):
+            assert windows[i].before is not None
+            window = paginator.before(windows[i].before, size)
+            assert window.ids == windows[i - 1].ids
+
+    for index, pk in enumerate(expected):
+        window = paginator.around(pk, 1)
+        assert window.ids == expected[max(index - 1, 0):index + 2]
+        assert window.offset == max(index - 1, 0)
+
+        window = paginator.at(index, 1)
+        assert window.ids == expected[max(index - 1, 0):index + 2]
+        assert window.offset == max(index - 1, 0)
+        assert (window.after is None) == (index + 2 >= len(expected))
+
+
+@pytest.mark.django_db
+def test_cursor_paginator_keyset(af_tutorial_po, af_tutorial_subdir_po):
+    from pootle_store.models import Unit
+
+    af_tutorial_po.require_units()
+    af_tutorial_subdir_po.require_units()
+    units = Unit.objects.filter(store__translation_project=
+                                af_tutorial_po.translation_project)
+    expected = list(units.values_list('id', flat=True))
+    assert len(expected) > 2
+
+    keys = ('store__pootle_path', 'index', 'id')
+    _check_paginator(CursorPaginator(units, keys=keys), expected)
+
+
+@pytest.mark.django_db
+def test_cursor_paginator_sorted(af_tutorial_po, af_tutorial_subdir_po):
+    """Tests custom sorts, which can be descending and have ties and
+    `NULL` values.
+    """
+    from django.db.models import Max
+    from django.utils import timezone
+
+    from pootle_store.models import Unit
+
+    af_tutorial_po.require_units()
+    af_tutorial_subdir_po.require_units()
+    units = Unit.objects.filter(store__translation_project=
+                                af_tutorial_po.translation_project)
+    unit_ids = list(units.values_list('id', flat=True))
+    now = timezone.now()
+    Unit.simple_objects.filter(id__in=unit_ids[::2]).update(submitted_on=now)
+    Unit.simple_objects.filter(id=unit_ids[1]).update(submitted_on=None)
+
+    for keys in (('submitted_on', 'id'), ('-submitted_on', 'id')):
+        expected = list(units.order_by(*keys).values_list('id', flat=True))
+        _check_paginator(CursorPaginator(units, keys=keys), expected)
+
+    units = units.annotate(sort_by_field=Max('submitted_on'))
+    for keys in (('sort_by_field', 'id'), ('-sort_by_field', 'id')):
+        rows = units.order_by(*keys).values('id', 'sort_by_field')
+        expected = [row['id'] for row in rows]
+        _check_paginator(CursorPaginator(units, keys=keys), expected)
+
+
+@pytest.mark.django_db
+def test_cursor_paginator_errors(af_tutorial_po):
+    paginator = CursorPaginator(af_tutorial_po.units,
+                                keys=('store__pootle_path', 'index', 'id'))
+
+    with pytest.raises(InvalidCursor):
+        paginator.after('not a cursor', 2)
+
+    with pytest.raises(af_tutorial_po.units.model.DoesNotExist):
+        paginator.around(-1, 2)
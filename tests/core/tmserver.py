@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+
+import pytest
+
+from pootle.core.tmserver import (LocalTMBackend, get_unit_results,
+                                  normalize_source)
+
+
+def _tm_entry(uid, source, target):
+    return {
+        'id': uid,
+        'revision': uid,
+        'project': u'Tutorial',
+        'path': u'/af/tutorial/tutorial.po',
+        'source': source,
+        'target': target,
+        'username': u'',
+        'fullname': u'',
+        'email_md5': u'',
+    }
+
+
+def _search(backend, unit):
+    hits = backend.get_hits('af', normalize_source(unit.source))
+    return get_unit_results(unit, hits)
+
+
+@pytest.mark.django_db
+def test_local_tm_search(af_tutorial_po):
+    backend = LocalTMBackend({'MIN_SIMILARITY': 75, 'MAX_LENGTH': 100})
+    backend.update('af', _tm_entry(100001, u'Open the file', u'Open die lêer'))
+    backend.update('af', _tm_entry(100002, u'Open the files',
+                                   u'Open die lêers'))
+    backend.update('af', _tm_entry(100003, u'Close the window',
+                                   u'Maak die venster toe'))
+    backend.update('ar', _tm_entry(100004, u'Open the file', u'افتح الملف'))
+
+    unit = af_tutorial_po.units[0]
+    unit.source = u'Open the file'
+    results = _search(backend, unit)
+    assert [result['target'] for result in results] == [
+        u'Open die lêer',
+        u'Open die lêers',
+    ]
+    assert results[0]['unit_id'] == 100001
+    assert results[0]['count'] == 1
+
+    # Updating an entry replaces its indexed source
+    backend.update('af', _tm_entry(100002, u'Save the files',
+                                   u'Stoor die lêers'))
+    results = _search(backend, unit)
+    assert [result['target'] for result in results] == [u'Open die lêer']
+
+    unit.source = u'Open the file' * 10
+    assert _search(backend, unit) == []
+
+
+@pytest.mark.django_db
+def test_update_tmserver_command(settings, monkeypatch, af_tutorial_po):
+    from django.core.management import call_command
+
+    from pootle.core import tmserver
+    from pootle_store.models import TMEntry
+
+    settings.POOTLE_TM_SERVER = {
+        'default': {'ENGINE': 'pootle.core.tmserver.LocalTMBackend'},
+    }
+    monkeypatch.setattr(tmserver, '_backend', None)
+
+    call_command('update_tmserver', batch_size=1)
+    translated = af_tutorial_po.units.filter(state=200)
+    assert sorted(TMEntry.objects.values_list('unit_id', flat=True)) == \
+        sorted(translated.values_list('id', flat=True))
+    assert TMEntry.objects.get(source=u'test').target == u'rest'
+
+    # Nothing changed after the last revision
+    TMEntry.objects.all().delete()
+    last_revision = max(translated.values_list('revision', flat=True))
+    call_command('update_tmserver', after_revision=last_revision)
+    assert not TMEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_tm_search_cache(settings, monkeypatch, af_tutorial_po):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from pootle.core import tmserver
+
+    settings.POOTLE_TM_SERVER = {
+        'default': {'ENGINE': 'pootle.core.tmserver.LocalTMBackend'},
+    }
+    monkeypatch.setattr(tmserver, '_backend', None)
+    tmserver.update('af', _tm_entry(100001, u'Open the file',
+                                    u'Open die lêer'))
+
+    unit = af_tutorial_po.units[0]
+    unit.source = u'Open the file'
+    # Load the related objects the cache key is built from
+    assert unit.store.translation_project.project.source_language
+    cache.clear()
+    results = tmserver.search(unit)
+    assert [result['target'] for result in results] == [u'Open die lêer']
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert tmserver.search(unit) == results
+    assert len(ctx.captured_queries) == 0
+
+    # The unit's own translation is left out of the cached hits
+    unit.id = 100001
+    assert tmserver.search(unit) == []
+
+    # New translations for the language invalidate the cached hits
+    unit.id = af_tutorial_po.units[0].id
+    tmserver.update('af', _tm_entry(100002, u'Open the files',
+                                    u'Open die lêers'))
+    results = tmserver.search(unit)
+    assert [result['target'] for result in results] == [
+        u'Open die lêer',
+        u'Open die lêers',
+    ]
+
+    # ...but at most once every REVISION_INTERVAL seconds
+    now = time.time()
+    monkeypatch.setattr(tmserver.time, 'time', lambda: now)
+    tmserver.delete('af', 100002)
+    assert tmserver.search(unit) == results
+
+    # Changes made meanwhile are picked up once the interval is over
+    monkeypatch.setattr(tmserver.time, 'time',
+                        lambda: now + tmserver.TM_REVISION_INTERVAL)
+    results = tmserver.search(unit)
+    assert [result['target'] for result in results] == [u'Open die lêer']
+
+
+@pytest.mark.django_db
+def test_tm_search_many(settings, monkeypatch, af_tutorial_po):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from pootle.core import tmserver
+
+    settings.POOTLE_TM_SERVER = {
+        'default': {'ENGINE': 'pootle.core.tmserver.LocalTMBackend'},
+    }
+    monkeypatch.setattr(tmserver, '_backend', None)
+    tmserver.update('af', _tm_entry(100001, u'Open the file',
+                                    u'Open die lêer'))
+
+    units = list(af_tutorial_po.units.select_related(
+        'store__translation_project__project__source_language',
+        'store__translation_project__language',
+    ))
+    units[0].source = u'Open the file'
+    units[1].source = u'Open the files'
+
+    cache.clear()
+    results = tmserver.search_many(units)
+    assert sorted(results.keys()) == sorted(unit.id for unit in units)
+    for unit in units:
+        assert results[unit.id] == tmserver.search(unit)
+    assert [result['target'] for result in results[units[0].id]] == \
+        [u'Open die lêer']
+
+    # Cached hits are fetched without querying the TM server
+    with CaptureQueriesContext(connection) as ctx:
+        assert tmserver.search_many(units) == results
+    assert len(ctx.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_local_tm_candidates():
+    """Tests entries sharing too few trigrams with the searched text aren't
+    ranked.
+    """
+    backend = LocalTMBackend({'MIN_SIMILARITY': 75, 'MAX_LENGTH': 100})
+    backend.update('af', _tm_entry(100001, u'Open the selected files',
+                                   u'Open die gekose lêers'))
+    # Same length, but only a few trigrams in common
+    backend.update('af', _tm_entry(100002, u'Close all the windows!',
+                                   u'Maak al die vensters toe!'))
+    # Too long to be similar enough
+    backend.update('af', _tm_entry(100003,
+                                   u'Open the selected file in a new tab',
+                                   u'Open die gekose lêer in ’n nuwe oortjie'))
+
+    candidates = backend.get_candidates('af', u'Open the selected file')
+    assert [entry.unit_id for entry in candidates] == [100001]
+
+
+@pytest.mark.django_db
+def test_local_tm_update(af_tutorial_po):
+    from pootle_store.models import TMEntry, TMTrigram
+
+    backend = LocalTMBackend({})
+    backend.update('af', _tm_entry(100001, u'Open the file', u'Open die lêer'))
+    trigram_ids = set(TMTrigram.objects.values_list('id', flat=True))
+    assert trigram_ids
+
+    # Translation changes keep the trigrams of the unchanged source
+    backend.update('af', _tm_entry(100001, u'Open the file', u'Maak oop'))
+    assert TMEntry.objects.get(unit_id=100001).target == u'Maak oop'
+    assert set(TMTrigram.objects.values_list('id', flat=True)) == trigram_ids
+
+    backend.bulk_update('af', [
+        _tm_entry(100001, u'Open the file', u'Open die lêer'),
+        _tm_entry(100002, u'Close the file', u'Maak die lêer toe'),
+    ])
+    assert TMEntry.objects.get(unit_id=100001).target == u'Open die lêer'
+    assert set(TMTrigram.objects.filter(entry__unit_id=100001)
+                                .values_list('id', flat=True)) == trigram_ids
+
+    # Entries stored concurrently are replaced
+    backend.store_entry('af', _tm_entry(100002, u'Save the file',
+                                        u'Stoor die lêer'))
+    assert TMEntry.objects.filter(unit_id=100002).count() == 1
+    unit = af_tutorial_po.units[0]
+    unit.source = u'Save the file'
+    assert [result['target'] for result in _search(backend, unit)] == \
+        [u'Stoor die lêer']
+
+    backend.delete('af', 100002)
+    assert not TMEntry.objects.filter(unit_id=100002).exists()
+    assert _search(backend, unit) == []
+
+
+@pytest.mark.django_db
+def test_unit_tm_entry(settings, monkeypatch, af_tutorial_po):
+    from pootle.core import tmserver
+    from pootle_store.models import TMEntry
+
+    settings.POOTLE_TM_SERVER = {
+        'default': {'ENGINE': 'pootle.core.tmserver.LocalTMBackend'},
+    }
+    monkeypatch.setattr(tmserver, '_backend', None)
+
+    af_tutorial_po.require_units()
+    unit = af_tutorial_po.units[0]
+    unit.target = u'Nuwe vertaling'
+    unit.save()
+    assert TMEntry.objects.get(unit_id=unit.id).target == u'Nuwe vertaling'
+
+    # Units which are no longer translated leave the TM
+    unit.markfuzzy()
+    unit.save()
+    assert not TMEntry.objects.filter(unit_id=unit.id).exists()
+
+    unit.markfuzzy(False)
+    unit.save()
+    assert TMEntry.objects.filter(unit_id=unit.id).exists()
+
+    unit.makeobsolete()
+    unit.save()
+    assert not TMEntry.objects.filter(unit_id=unit.id).exists()
+
+
+@pytest.mark.django_db
+def test_unit_tm_entry_untranslated(settings, monkeypatch, af_tutorial_po):
+    """Tests units which never were translated don't reach the TM server
+    when they change.
+    """
+    from pootle.core import tmserver
+    from pootle_store import models
+    from pootle_store.util import UNTRANSLATED
+
+    settings.POOTLE_TM_SERVER = {
+        'default': {'ENGINE': 'pootle.core.tmserver.LocalTMBackend'},
+    }
+    monkeypatch.setattr(tmserver, '_backend', None)
+
+    af_tutorial_po.require_units()
+    unit = models.Unit.objects.filter(store=af_tutorial_po,
+                                      state=UNTRANSLATED)[0]
+    deleted = []
+    monkeypatch.setattr(models, 'delete_from_tmserver',
+                        lambda language, unit_id: deleted.append(unit_id))
+
+    unit.source = u'Changed source'
+    unit.save()
+    assert deleted == []
+
+    unit.makeobsolete()
+    unit.save()
+    assert deleted == [unit.id]
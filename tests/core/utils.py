@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import re
+import threading
+
+from pootle.core.utils import (WordCounter, _count_words, find_placeholders,
+                               hanging_symbols_regex, placeholder_regexes,
+                               wordcount)
+
+
+WORDCOUNT_STRINGS = [
+    u'',
+    u'Hello',
+    u'Hello World',
+    u'Hello\nWorld',
+    u'Save &as...',
+    u'Open <b>file</b> now',
+    u'&lt;b&gt;bold&lt;/b&gt; and &amp; more',
+    u'%s files, %(count)d items and %1$s',
+    u'%<1d> edge case',
+    u'{0} of {count} in ${PLACEHOLDER} and $name$',
+    u'%1 of %2 and %NAME% too',
+    u'Escaped \\n and \\t sequences',
+    u'Evernote Web and Evernote for Windows',
+    u'Ctrl+Shift+S',
+    u'Press Alt+F4 to quit',
+    u'Updated on 12 March 2014',
+    u'-- ... ?!',
+    u'"Quoted" text. End.',
+    u'Saved %@ in @title@',
+    # Placeholders overlapping ones of patterns taking precedence
+    u'a%b%1$s',
+    # Anchored patterns matching between placeholders
+    u'<b>Hello</b>',
+    u'Press Ctrl+S<br/>now',
+]
+
+
+def _sequential_wordcount(string):
+    """Reference implementation stripping placeholders chunk by chunk."""
+    string = re.sub('\n', '{\\n}', string)
+    chunks = [{'translate': 1, 'string': u'%s' % string}]
+    for regex in placeholder_regexes:
+        find_placeholders(chunks, regex)
+    find_placeholders(chunks, hanging_symbols_regex, 'dont-count')
+
+    return _count_words(chunks)
+
+
+def test_wordcount_matches_sequential():
+    counter = WordCounter()
+    for string in WORDCOUNT_STRINGS:
+        assert counter.count(string) == _sequential_wordcount(string)
+        assert wordcount(string) == _sequential_wordcount(string)
+
+
+def test_wordcount_cache_is_bounded():
+    counter = WordCounter(maxsize=2)
+    assert counter(u'Hello World') == 2
+    assert counter(u'one two three') == 3
+    # Touch the oldest entry so the second one gets evicted
+    assert counter(u'Hello World') == 2
+    assert counter(u'four') == 1
+
+    assert len(counter._cache) == 2
+    assert u'Hello World' in counter._cache
+    assert u'one two three' not in counter._cache
+
+
+def test_wordcount_cache_threads():
+    """Tests the cache can be shared by threads."""
+    counter = WordCounter(maxsize=10)
+    strings = [u'word ' * i for i in range(1, 30)]
+    errors = []
+
+    def count():
+        try:
+            for i in range(20):
+                for n, string in enumerate(strings, 1):
+                    assert counter(string) == n
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=count) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(counter._cache) == 10
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from pootle_misc.match import Matcher, Term
+
+
+def test_matcher():
+    matcher = Matcher([
+        Term(u'file', u'lêer'),
+        Term(u'file (noun)', u'dossier'),
+        Term(u'open file', u'oop lêer'),
+        Term(u'window', u'venster'),
+        Term(u'save', u'stoor'),
+        Term(u'ok', u'goed'),
+    ])
+
+    # Longest terms win, inflected words still match
+    assert matcher.matches(u'Open files in a new Window') == [
+        Term(u'open file', u'oop lêer'),
+        Term(u'window', u'venster'),
+    ]
+
+    # All translations of a term are returned
+    assert matcher.matches(u'Save the file.') == [
+        Term(u'save', u'stoor'),
+        Term(u'file', u'lêer'),
+        Term(u'file', u'dossier'),
+    ]
+
+    # Terms shorter than 3 characters are ignored
+    assert matcher.matches(u'OK') == []
+    assert matcher.matches(u'No terms here') == []
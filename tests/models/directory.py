@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+
+import pytest
+
+
+@pytest.mark.django_db
+def test_directory_closure(af_tutorial_po):
+    """Tests directories are linked to all their ancestors as they are
+    created, and subtrees and trails are looked up through these links.
+    """
+    from pootle_store.models import Store
+
+    tp = af_tutorial_po.translation_project
+    tp_dir = tp.directory
+    subdir = tp_dir.get_or_make_subdir('sub')
+    subsubdir = subdir.get_or_make_subdir('subsub')
+    store = Store.objects.create(parent=subsubdir, translation_project=tp,
+                                 name='deep.po')
+
+    assert list(subsubdir.ancestors.order_by('pootle_path')) == [
+        tp_dir.parent.parent, tp_dir.parent, tp_dir, subdir, subsubdir,
+    ]
+    assert list(subsubdir.trail()) == [subdir, subsubdir]
+    assert len(subsubdir.trail(only_dirs=False)) == 5
+
+    assert subsubdir in tp_dir.descendants
+    assert subdir.stores.get() == store
+    assert af_tutorial_po in tp_dir.stores
+    assert subsubdir.translation_project == tp
+
+
+@pytest.mark.django_db
+def test_get_by_path(af_tutorial_po):
+    """Tests directories are looked up once per request."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from pootle.core.cache import clear_request_cache, start_request_cache
+    from pootle_app.models import Directory
+
+    pootle_path = af_tutorial_po.parent.pootle_path
+
+    start_request_cache()
+    try:
+        directory = Directory.objects.get_by_path(pootle_path)
+        with CaptureQueriesContext(connection) as queries:
+            assert Directory.objects.get_by_path(pootle_path) is directory
+        assert len(queries) == 0
+    finally:
+        clear_request_cache()
+
+    assert Directory.objects.get_by_path(pootle_path) is not directory
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def _add_permission_set(user, directory, positive_permissions):
+    from pootle_app.models.permissions import PermissionSet
+
+    permission_set = PermissionSet.objects.create(user=user,
+                                                  directory=directory)
+    permission_set.positive_permissions = positive_permissions
+    return permission_set
+
+
+@pytest.mark.django_db
+def test_filter_paths_by_permission(nobody_ps, default_ps, afrikaans_tutorial,
+                                    arabic_tutorial_disabled, view, suggest,
+                                    translate, pootle_content_type):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import Permission
+
+    from pootle_app.models.permissions import (check_user_permission,
+                                               filter_paths_by_permission,
+                                               get_matching_permissions)
+
+    review = Permission.objects.create(codename='review',
+                                       name='Can review translations',
+                                       content_type=pootle_content_type)
+    member = get_user_model().objects.create(username='member')
+    member_ps = _add_permission_set(member, afrikaans_tutorial.directory,
+                                    [view, review])
+    _add_permission_set(member, arabic_tutorial_disabled.language.directory,
+                        [view])
+    _add_permission_set(member, afrikaans_tutorial.project.directory, [view])
+
+    directories = [
+        afrikaans_tutorial.directory,
+        afrikaans_tutorial.language.directory,
+        arabic_tutorial_disabled.directory,
+        afrikaans_tutorial.project.directory,
+    ]
+    paths = [directory.pootle_path for directory in directories]
+
+    for user in (member, nobody_ps.user, AnonymousUser()):
+        for codename in ('review', 'translate', 'suggest'):
+            with CaptureQueriesContext(connection) as ctx:
+                allowed = filter_paths_by_permission(user, codename, paths)
+            assert len(ctx.captured_queries) == 1
+            assert allowed == set(
+                directory.pootle_path for directory in directories
+                if check_user_permission(user, codename, directory)
+            )
+
+    assert filter_paths_by_permission(member, 'review', paths) == \
+        set(['/af/tutorial/'])
+    # Language level permissions are overridden by project ones
+    assert 'translate' not in get_matching_permissions(
+        member, arabic_tutorial_disabled.directory)
+    assert filter_paths_by_permission(member, 'translate', paths) == \
+        set(['/af/'])
+
+    # Changes to permission sets are reflected right away
+    member_ps.positive_permissions.remove(review)
+    assert filter_paths_by_permission(member, 'review', paths) == set()
+    assert not check_user_permission(member, 'review',
+                                     afrikaans_tutorial.directory)
+
+
+@pytest.mark.django_db
+def test_nav_admin_entries(rf, nobody_ps, default_ps, afrikaans,
+                           administrate, translate):
+    """Tests non-superuser admins get the admin entries of navigation menus.
+    """
+    from django.contrib.auth import get_user_model
+    from django.template.loader import render_to_string
+
+    from pootle_app.models.permissions import get_matching_permissions
+
+    def render_nav(user):
+        request = rf.get('/')
+        request.user = user
+        request.permissions = get_matching_permissions(user,
+                                                       afrikaans.directory)
+        return render_to_string('languages/_nav.html', {
+            'request': request,
+            'user': user,
+            'language': afrikaans,
+        })
+
+    User = get_user_model()
+    member = User.objects.create(username='member')
+    _add_permission_set(member, afrikaans.directory, [translate])
+    assert 'admin-permissions' not in render_nav(member)
+
+    language_admin = User.objects.create(username='language_admin')
+    _add_permission_set(language_admin, afrikaans.directory, [administrate])
+    assert 'admin-permissions' in render_nav(language_admin)
+
+
+@pytest.mark.django_db
+def test_effective_permissions_reverse_changes(afrikaans_tutorial, view,
+                                               pootle_content_type):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import Permission
+
+    from pootle_app.models.permissions import (EffectivePermission,
+                                               filter_paths_by_permission)
+
+    review = Permission.objects.create(codename='review',
+                                       name='Can review translations',
+                                       content_type=pootle_content_type)
+    member = get_user_model().objects.create(username='member')
+    member_ps = _add_permission_set(member, afrikaans_tutorial.directory,
+                                    [view, review])
+    paths = [afrikaans_tutorial.pootle_path]
+
+    def codenames():
+        return EffectivePermission.objects.get(
+            permission_set=member_ps,
+        ).codenames
+
+    assert codenames() == u'review view'
+
+    review.permission_sets_positive.remove(member_ps)
+    assert codenames() == u'view'
+    assert filter_paths_by_permission(member, 'review', paths) == set()
+
+    review.permission_sets_positive.add(member_ps)
+    assert codenames() == u'review view'
+    assert filter_paths_by_permission(member, 'review', paths) == set(paths)
+
+    review.permission_sets_positive.clear()
+    assert codenames() == u'view'
+    assert filter_paths_by_permission(member, 'review', paths) == set()
+
+
+@pytest.mark.django_db
+def test_get_for_path_project_access(nobody_ps, default_ps, af_tutorial_po,
+                                     translate):
+    """Tests `view` access to units is granted at the project level, like
+    `check_permission('view')` does.
+    """
+    from django.contrib.auth import get_user_model
+
+    from pootle_store.models import Unit
+
+    member = get_user_model().objects.create(username='member')
+    units_count = len(af_tutorial_po.units)
+    assert units_count > 0
+
+    # Translation project permission sets without `view` don't hide units
+    _add_permission_set(member, af_tutorial_po.translation_project.directory,
+                        [translate])
+    assert Unit.objects.get_for_path('/af/', member).count() == units_count
+    assert Unit.objects.get_for_path('/projects/tutorial/',
+                                     member).count() == units_count
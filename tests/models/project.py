@@ -191,3 +191,24 @@ def test_root_hide_permissions(nobody, default, admin, hide, view,
     assert items_equal(Project.accessible_by_user(nobody), ALL_PROJECTS)
     assert items_equal(Project.accessible_by_user(foo_user), ALL_PROJECTS)
     assert items_equal(Project.accessible_by_user(bar_user), ALL_PROJECTS)
+
+
+@pytest.mark.django_db
+def test_accessible_projects_cache_version(default, view, project_foo, root):
+    """Tests saving permissions invalidates the cached projects of all users
+    by bumping the version of their cache family.
+    """
+    from pootle.core.cache import make_versioned_key
+    from pootle_project.models import ACCESSIBLE_PROJECTS_NAMESPACE
+
+    foo_user = UserFactory.create(username='foo')
+    key = make_versioned_key(ACCESSIBLE_PROJECTS_NAMESPACE, foo_user.username)
+
+    assert items_equal(Project.accessible_by_user(foo_user), [])
+
+    _require_permission_set(default, root, [view])
+
+    assert make_versioned_key(ACCESSIBLE_PROJECTS_NAMESPACE,
+                              foo_user.username) != key
+    assert items_equal(Project.accessible_by_user(foo_user),
+                       [project_foo.code])
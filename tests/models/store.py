@@ -54,3 +54,34 @@ def test_delete_mark_obsolete(af_tutorial_subdir_po):
     store_units = Unit.objects.filter(store=updated_store)
     for unit in store_units:
         assert unit.isobsolete()
+
+
+@pytest.mark.django_db
+def test_path_parts(af_tutorial_po, admin):
+    """Tests stores and directories keep the parts of their paths, which
+    project resources are looked up by.
+    """
+    from pootle_app.models import Directory
+    from pootle_store.models import Unit
+
+    tp = af_tutorial_po.translation_project
+    subdir = Directory.objects.create(name='other', parent=tp.directory)
+
+    assert af_tutorial_po.language_code == 'af'
+    assert af_tutorial_po.project_code == 'tutorial'
+    assert af_tutorial_po.tp_path == 'tutorial.po'
+
+    assert subdir.language_code == 'af'
+    assert subdir.project_code == 'tutorial'
+    assert subdir.tp_path == 'other/'
+
+    assert tp.directory.tp_path == ''
+    assert tp.language.directory.language_code == 'af'
+    assert tp.language.directory.tp_path is None
+
+    assert 'tutorial.po' in tp.project.resources
+    assert 'other/' in tp.project.resources
+
+    af_tutorial_po.update(overwrite=False, only_newer=False)
+    units = Unit.objects.get_for_path('/projects/tutorial/tutorial.po', admin)
+    assert units.count() == af_tutorial_po.units.count() > 0
@@ -214,3 +214,151 @@ def test_add_suggestion(af_tutorial_po, system):
     assert sugg is not None
     assert added
     assert len(untranslated_unit.get_suggestions()) == 1
+
+
+@pytest.mark.django_db
+def test_trigram_search(af_tutorial_po):
+    """Tests the trigram search backend finds the same units as plain
+    database searches."""
+    from pootle_store.search import DBSearchBackend, TrigramSearchBackend
+
+    db_backend = DBSearchBackend()
+    trigram_backend = TrigramSearchBackend()
+    units = af_tutorial_po.units
+    trigram_backend.index(units)
+
+    def _assert_same_units(text, fields, exact=False):
+        expected = set(db_backend.search(units, text, fields, exact))
+        assert set(trigram_backend.search(units, text, fields, exact)) == \
+            expected
+        return expected
+
+    all_fields = ['source', 'target', 'notes', 'locations']
+    assert len(_assert_same_units(u'fish', all_fields)) == 2
+    assert len(_assert_same_units(u'FISHIES %d', ['source'])) == 1
+    _assert_same_units(u'FISHIES', ['source'], exact=True)
+    assert _assert_same_units(u'rest', ['target'])
+    assert not _assert_same_units(u'rest', ['source', 'notes'])
+    assert not _assert_same_units(u'no such text', all_fields)
+    assert _assert_same_units(u'h', all_fields)
+    assert _assert_same_units(u'fish.c', ['locations'])
+
+    # Index is kept up to date after changing a unit
+    unit = units[0]
+    _update_translation(af_tutorial_po, 0, {'target': u'Nuwe vertaling'},
+                        sync=False)
+    trigram_backend.update(unit.__class__.objects.get(id=unit.id))
+    assert _assert_same_units(u'nuwe', ['target'])
+    assert _assert_same_units(u'Nuwe vertaling', ['target'], exact=True)
+
+
+@pytest.mark.django_db
+def test_save_updates_search_index(af_tutorial_po, monkeypatch):
+    """Tests units are only reindexed when their searched columns change."""
+    from pootle_store.search import get_search_backend
+
+    af_tutorial_po.require_units()
+    unit = af_tutorial_po.units[0]
+
+    updated = []
+    monkeypatch.setattr(get_search_backend(), 'update', updated.append)
+
+    unit.save()
+    assert updated == []
+
+    unit.target = u'Nuwe vertaling'
+    unit.save()
+    assert updated == [unit]
+
+    unit.translator_comment = u'Nota'
+    unit._comment_updated = True
+    unit.save()
+    assert updated == [unit, unit]
+
+
+@pytest.mark.django_db
+def test_unit_filter_flags(af_tutorial_po, system):
+    """Tests denormalized filter flags follow suggestions and checks."""
+    from translate.filters.decorators import Category
+
+    from pootle_misc.checks import category_bits
+    from pootle_store.models import Unit
+
+    def _get_unit(unit):
+        return Unit.objects.get(id=unit.id)
+
+    unit = af_tutorial_po.getitem(0)
+    assert not unit.has_pending_suggestion
+
+    sugg, added = unit.add_suggestion(u'vis', touch=False)
+    assert _get_unit(unit).has_pending_suggestion
+
+    tp = unit.store.translation_project
+    unit.reject_suggestion(sugg, tp, system)
+    assert not _get_unit(unit).has_pending_suggestion
+
+    # Failing a critical check
+    unit = _update_translation(af_tutorial_po, 0, {'target': u'%s vis'},
+                               sync=False)
+    unit = _get_unit(unit)
+    assert unit.has_critical_check
+    assert unit.check_categories & category_bits[Category.CRITICAL]
+
+    checks = unit.qualitycheck_set.filter(category=Category.CRITICAL)
+    for check in checks:
+        unit.toggle_qualitycheck(check.id, True, system)
+    assert not _get_unit(unit).has_critical_check
+
+    unit.toggle_qualitycheck(checks[0].id, False, system)
+    assert _get_unit(unit).has_critical_check
+
+    unit = _update_translation(af_tutorial_po, 0, {'target': u'vis'},
+                               sync=False)
+    unit = _get_unit(unit)
+    assert not unit.has_critical_check
+    assert unit.check_categories == 0
+
+
+@pytest.mark.django_db
+def test_unit_save_keeps_filter_flags(af_tutorial_po, system):
+    """Tests saving units neither reads nor overwrites their flags."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from pootle_store.models import Unit
+
+    unit = af_tutorial_po.getitem(0)
+    stale_unit = Unit.objects.get(id=unit.id)
+    unit.add_suggestion(u'vis', touch=False)
+
+    with CaptureQueriesContext(connection) as ctx:
+        stale_unit.save()
+    queries = u' '.join(query['sql'] for query in ctx.captured_queries)
+    assert 'pootle_store_suggestion' not in queries
+    assert 'pootle_store_qualitycheck' not in queries
+    assert Unit.objects.get(id=unit.id).has_pending_suggestion
+
+
+@pytest.mark.django_db
+def test_find_altsrcs_for_units(af_tutorial_po, arabic_tutorial_disabled):
+    from pootle_store.models import Store
+    from pootle_store.util import find_altsrcs, find_altsrcs_for_units
+
+    ar_tutorial_po = Store.objects.get(
+        parent=arabic_tutorial_disabled.directory,
+        name='tutorial.po',
+    )
+    ar_tutorial_po.require_units()
+
+    units = list(af_tutorial_po.units)
+    project = af_tutorial_po.translation_project.project
+    alt_src_langs = [arabic_tutorial_disabled.language]
+
+    altsrcs = find_altsrcs_for_units(units, alt_src_langs, project)
+    assert sorted(altsrcs.keys()) == sorted(unit.id for unit in units)
+    for unit in units:
+        assert altsrcs[unit.id] == list(find_altsrcs(unit, alt_src_langs))
+
+    # Only the translated unit has an alternative source
+    test_unit = af_tutorial_po.findid('test')
+    assert [altsrc.target for altsrc in altsrcs[test_unit.id]] == [u'rest']
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+@pytest.mark.django_db
+def test_get_edit_units(admin_client, af_tutorial_po):
+    """Tests the batch of editing widgets matches single unit requests."""
+    uids = [unit.id for unit in af_tutorial_po.units]
+
+    response = admin_client.get(reverse('pootle-xhr-units-edit-batch'),
+                                {'uids': ','.join(map(str, uids))}, **XHR)
+    assert response.status_code == 200
+    units = json.loads(response.content)['units']
+    assert sorted(map(int, units)) == sorted(uids)
+
+    for uid in uids:
+        response = admin_client.get(
+            reverse('pootle-xhr-units-edit', args=[uid]), **XHR
+        )
+        assert units[str(uid)] == json.loads(response.content)
+
+
+@pytest.mark.django_db
+def test_get_edit_units_project_access(client, nobody_ps, default_ps,
+                                       af_tutorial_po, translate):
+    """Tests translation project permission sets without `view` don't deny
+    access to units in projects the user can access.
+    """
+    from django.contrib.auth import get_user_model
+
+    from pootle_app.models.permissions import PermissionSet
+
+    member = get_user_model().objects.create(username='member')
+    member.set_password('member')
+    member.save()
+    permission_set = PermissionSet.objects.create(
+        user=member, directory=af_tutorial_po.translation_project.directory,
+    )
+    permission_set.positive_permissions = [translate]
+
+    uids = [unit.id for unit in af_tutorial_po.units]
+    client.login(username='member', password='member')
+    response = client.get(reverse('pootle-xhr-units-edit-batch'),
+                          {'uids': ','.join(map(str, uids))}, **XHR)
+    assert response.status_code == 200
+    units = json.loads(response.content)['units']
+    assert sorted(map(int, units)) == sorted(uids)
+
+
+@pytest.mark.django_db
+def test_get_edit_units_queries(admin_client, af_tutorial_po):
+    """Tests the number of queries doesn't grow with the number of units."""
+    uids = [unit.id for unit in af_tutorial_po.units]
+    assert len(uids) > 1
+
+    def _count_queries(uids):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = admin_client.get(
+                reverse('pootle-xhr-units-edit-batch'),
+                {'uids': ','.join(map(str, uids))}, **XHR
+            )
+        assert response.status_code == 200
+        return len(ctx.captured_queries)
+
+    # Warm up the caches which aren't related to the units
+    _count_queries(uids)
+    assert _count_queries(uids[:1]) == _count_queries(uids)
+
+
+@pytest.mark.django_db
+def test_get_edit_units_missing_uids(admin_client):
+    response = admin_client.get(reverse('pootle-xhr-units-edit-batch'),
+                                **XHR)
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_timeline_cache(af_tutorial_po, system):
+    """Tests cached timelines match freshly rendered ones."""
+    from pootle_statistics.models import Submission, SubmissionFields
+    from pootle_store.views import get_timeline_entries
+
+    unit = af_tutorial_po.units[0]
+    cache.clear()
+    entries = get_timeline_entries(unit)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert get_timeline_entries(unit) == entries
+    assert len(queries) == 0
+
+    unit.target = u'Nuwe vertaling'
+    unit.save()
+    Submission.objects.create(
+        creation_time=timezone.now(),
+        translation_project=af_tutorial_po.translation_project,
+        submitter=system, unit=unit, store=af_tutorial_po,
+        field=SubmissionFields.TARGET, old_value=u'', new_value=unit.target,
+    )
+    entries = get_timeline_entries(unit)
+    assert u'Nuwe vertaling' in entries[0]
+
+    cache.clear()
+    assert get_timeline_entries(unit) == entries
+
+
+@pytest.mark.django_db
+def test_get_units_serialization(admin_client, af_tutorial_po):
+    """Tests units serialized from their values match model instances."""
+    from pootle_store.models import Unit
+    from pootle_store.views import _prepare_unit
+
+    units = af_tutorial_po.units
+    response = admin_client.get(reverse('pootle-xhr-units'), {
+        'path': af_tutorial_po.pootle_path,
+        'initial': 'true',
+    }, **XHR)
+    assert response.status_code == 200
+    unit_groups = json.loads(response.content)['unitGroups']
+
+    assert unit_groups[0].keys() == [af_tutorial_po.pootle_path]
+    serialized = unit_groups[0][af_tutorial_po.pootle_path]['units']
+    assert [unit['id'] for unit in serialized] == [unit.id for unit in units]
+    for data in serialized:
+        unit = Unit.objects.get(id=data['id'])
+        assert data == json.loads(json.dumps(_prepare_unit(unit)))
+
+
+@pytest.mark.django_db
+def test_get_units_cursor(admin_client, af_tutorial_po, system):
+    """Tests cursor paging yields the same units as the whole list, for
+    the default ordering and custom sorts.
+    """
+    from pootle_statistics.models import Submission, SubmissionTypes
+
+    units = list(af_tutorial_po.units)
+    now = timezone.now()
+    for i, unit in enumerate(units[:2]):
+        Submission.objects.create(
+            creation_time=now - timezone.timedelta(days=i),
+            translation_project=af_tutorial_po.translation_project,
+            submitter=system, unit=unit, store=af_tutorial_po,
+            type=SubmissionTypes.NORMAL,
+        )
+
+    def get_units(params):
+        params = dict(params, path=af_tutorial_po.pootle_path, count=1)
+        response = admin_client.get(reverse('pootle-xhr-units'), params,
+                                    **XHR)
+        assert response.status_code == 200
+        return json.loads(response.content)
+
+    for params in ({},
+                   {'filter': 'all', 'sort': 'newest'},
+                   {'filter': 'user-submissions', 'user': 'system',
+                    'sort': 'oldest'}):
+        expected = get_units(dict(params, initial='true'))['uIds']
+        assert expected
+
+        data = get_units(dict(params, initial='true', paging='cursor'))
+        assert data['total'] == len(expected)
+        assert data['offset'] == 0
+        uids = data['uIds']
+        while data['cursors']['after'] is not None:
+            data = get_units(dict(params, after=data['cursors']['after']))
+            uids.extend(data['uIds'])
+        assert uids == expected
+
+        for index, uid in enumerate(expected):
+            data = get_units(dict(params, initial='true', paging='cursor',
+                                  uids=uid))
+            assert data['offset'] == max(index - 1, 0)
+            assert data['uIds'] == expected[max(index - 1, 0):index + 2]
+
+            data = get_units(dict(params, initial='true', paging='cursor',
+                                  index=index))
+            assert data['uIds'] == expected[max(index - 1, 0):index + 2]
+
+
+@pytest.mark.django_db
+def test_get_overview_stats_etag(admin_client, af_tutorial_po):
+    """Tests unchanged stats are not sent again."""
+    from pootle.core.mixins.treeitem import CachedMethods
+
+    url = reverse('pootle-xhr-stats-overview')
+    params = {'path': af_tutorial_po.pootle_path}
+
+    response = admin_client.get(url, params, **XHR)
+    assert response.status_code == 200
+    etag = response['ETag']
+
+    response = admin_client.get(url, params, HTTP_IF_NONE_MATCH=etag, **XHR)
+    assert response.status_code == 304
+
+    unit = af_tutorial_po.units[0]
+    unit.target = u'Nuwe vertaling'
+    unit.save()
+    # What the RQ worker runs to process the pending update
+    af_tutorial_po._update_cache(CachedMethods.get_all())
+
+    response = admin_client.get(url, params, HTTP_IF_NONE_MATCH=etag, **XHR)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_get_overview_stats_etag_update_cache(admin_client, af_tutorial_po,
+                                              system):
+    """Tests stats updates which don't change unit revisions change the
+    ETag once they are processed."""
+    from pootle.core.mixins.treeitem import CachedMethods
+
+    url = reverse('pootle-xhr-stats-overview')
+    params = {'path': af_tutorial_po.pootle_path}
+
+    response = admin_client.get(url, params, **XHR)
+    etag = response['ETag']
+    is_dirty = af_tutorial_po.is_dirty()
+
+    unit = af_tutorial_po.units[0]
+    unit.add_suggestion(u'Ander vertaling', user=system, touch=False)
+    # What the RQ worker runs to process the pending update
+    af_tutorial_po._update_cache([CachedMethods.SUGGESTIONS])
+    assert af_tutorial_po.is_dirty() == is_dirty
+
+    response = admin_client.get(url, params, HTTP_IF_NONE_MATCH=etag, **XHR)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert json.loads(response.content)['suggestions'] == 1
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2015 Evernote Corporation
+#
+# This file is part of Pootle.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+
+
+@pytest.mark.django_db
+def test_save_termunits(settings, monkeypatch, af_tutorial_po):
+    from pootle.core import tmserver
+    from pootle_statistics.models import Submission, SubmissionTypes
+    from pootle_store.models import Store, TMEntry
+    from pootle_store.util import TRANSLATED, UNTRANSLATED
+    from pootle_terminology.util import create_termunit, save_termunits
+
+    settings.POOTLE_TM_SERVER = {
+        'default': {'ENGINE': 'pootle.core.tmserver.LocalTMBackend'},
+    }
+    monkeypatch.setattr(tmserver, '_backend', None)
+
+    tp = af_tutorial_po.translation_project
+    store = Store.objects.create(parent=tp.directory, translation_project=tp,
+                                 name='pootle-terminology.po')
+    save_termunits(store, [
+        create_termunit(u'window', None, {u'venster': 1}, [u'main.c:1'],
+                        [], [], {u'main.c': 2}),
+        create_termunit(u'file', None, {}, [], [], [], {}),
+    ])
+
+    units = list(store.units)
+    assert [unit.source for unit in units] == [u'window', u'file']
+    assert [unit.state for unit in units] == [UNTRANSLATED, UNTRANSLATED]
+    assert units[0].getlocations() == [u'main.c:1']
+    assert units[0].has_pending_suggestion
+    assert [s.target for s in units[0].get_suggestions()] == [u'venster']
+    assert Submission.objects.filter(
+        unit=units[0], type=SubmissionTypes.SUGG_ADD,
+    ).count() == 1
+    assert not units[1].has_pending_suggestion
+
+    # Extraction replaces the previous glossary
+    unit = create_termunit(u'window', None, {}, [], [], [], {})
+    unit.target = u' venster'
+    store.units.delete()
+    save_termunits(store, [unit])
+    assert [(unit.target, unit.state) for unit in store.units] == [
+        (u' venster', TRANSLATED),
+    ]
+
+    # Side effects of saving units are carried out in bulk
+    unit = store.units[0]
+    assert Submission.objects.filter(
+        unit=unit, type=SubmissionTypes.UNIT_CREATE,
+    ).count() == 1
+    assert TMEntry.objects.get(unit_id=unit.id).target == u' venster'
+
+    checks = set(unit.qualitycheck_set.values_list('name', 'category'))
+    assert checks
+    assert unit.check_categories
+    unit.qualitycheck_set.all().delete()
+    unit.update_qualitychecks()
+    assert set(unit.qualitycheck_set.values_list('name', 'category')) == \
+        checks
+
+
+@pytest.mark.django_db
+def test_extract_terminology_job(admin_client, af_tutorial_po):
+    from pootle_terminology.util import EXTRACT_JOB_KEY, extract_terminology
+    from pootle_terminology.views import get_extract_job
+
+    tp = af_tutorial_po.translation_project
+    url = reverse('pootle-terminology-extract', args=['af', 'tutorial'])
+    job_key = EXTRACT_JOB_KEY % tp.pootle_path
+
+    response = admin_client.post(url, {'extract': 'Extract'})
+    assert response.status_code == 302
+    job_id = cache.get(job_key)
+    assert job_id is not None
+
+    job = get_extract_job(tp)
+    try:
+        assert job.id == job_id
+        assert job.get_status() == 'queued'
+
+        # Run the job as a worker would
+        assert extract_terminology(tp.id) == 0
+        assert tp.stores.filter(name='pootle-terminology.po').exists()
+
+        job.set_status('finished')
+        response = admin_client.get(url)
+        assert response.status_code == 302
+        assert cache.get(job_key) is None
+    finally:
+        # Don't leave the job for actual workers to run
+        job.delete()